@@ -0,0 +1,360 @@
+"""
+압축 바이너리 이벤트 로그 (.rlog)
+
+JSON Lines 로그와 같은 이벤트(timestamp, message, event_type, details)를
+고정 폭 레코드 헤더 + 가변 길이 본문으로 저장합니다.
+- timestamp: ISO 문자열 대신 float64 epoch 초
+- event_type 과 자주 쓰는 details 값(from, to, state, template)은 문자열 테이블 id (u16) 로 intern
+- message 는 UTF-8, 나머지 details 는 공백 없는 JSON
+- writer 의 flush 한 번(또는 변환기의 BLOCK_EVENTS 개)이 zlib 블록 하나
+
+파일 구조 (little endian)
+  파일 헤더   "RLOG" + u16 버전   (이어 쓰기로 중간에 다시 나오면 문자열 테이블 초기화)
+  블록       u8 tag=3, u32 압축 길이, u32 원래 길이, zlib(레코드들)
+블록 안의 레코드
+  문자열 정의 u8 tag=1, u16 id, u16 길이, UTF-8
+  이벤트     u8 tag=2, f64 ts, u16 event_type, u16 from, u16 to, u16 state, u16 template,
+             u32 message 길이, u32 details 길이, message, details
+id 0 은 "값 없음" 이고, 문자열 테이블은 블록이 바뀌어도 이어집니다.
+"""
+
+import json
+import math
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+MAGIC = b"RLOG"
+VERSION = 1
+SUFFIX = ".rlog"
+
+FILE_HEADER = struct.Struct("<4sH")
+STRING_HEADER = struct.Struct("<BHH")
+EVENT_HEADER = struct.Struct("<BdHHHHHII")
+BLOCK_HEADER = struct.Struct("<BII")
+
+TAG_STRING = 1
+TAG_EVENT = 2
+TAG_BLOCK = 3
+
+# 변환기에서 블록 하나에 묶는 이벤트 수 / zlib 레벨 (writer 는 flush 단위)
+BLOCK_EVENTS = 1000
+COMPRESS_LEVEL = 6
+
+# 같은 details 본문 디코드 결과 재사용 (반복되는 box/position 등)
+DETAILS_CACHE_SIZE = 4096
+
+# intern 해서 고정 헤더에 넣는 details 키 (헤더 슬롯 순서)
+SLOT_KEYS = ("from", "to", "state", "template")
+MAX_STRINGS = 0xFFFF
+
+
+class BinaryEncoder:
+    """이벤트 -> 바이트 (처음 보는 문자열은 정의 레코드를 먼저 내보냄)"""
+
+    def __init__(self):
+        self.ids = {}
+
+    def header(self) -> bytes:
+        self.ids = {}
+        return FILE_HEADER.pack(MAGIC, VERSION)
+
+    def _intern(self, value, out):
+        if not isinstance(value, str) or not value:
+            return 0
+        string_id = self.ids.get(value)
+        if string_id is None:
+            if len(self.ids) >= MAX_STRINGS - 1:
+                return None
+            data = value.encode("utf-8")
+            if len(data) > 0xFFFF:
+                return None
+            string_id = self.ids[value] = len(self.ids) + 1
+            out.append(STRING_HEADER.pack(TAG_STRING, string_id, len(data)))
+            out.append(data)
+        return string_id
+
+    def encode(self, ts, message: str, event_type: str, details: dict) -> bytes:
+        out = []
+        details = dict(details or {})
+        slots = []
+        for key in SLOT_KEYS:
+            string_id = self._intern(details.get(key), out)
+            if string_id:
+                # 헤더로 옮긴 값은 본문에서 뺌 (문자열이 아니거나 intern 못 한 값은 본문에 그대로)
+                del details[key]
+            slots.append(string_id or 0)
+        type_id = self._intern(event_type, out) or 0
+
+        body = b""
+        if details:
+            body = json.dumps(details, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        msg = (message or "").encode("utf-8")
+        ts = float("nan") if ts is None else float(ts)
+        out.append(EVENT_HEADER.pack(TAG_EVENT, ts, type_id, *slots, len(msg), len(body)))
+        out.append(msg)
+        out.append(body)
+        return b"".join(out)
+
+    def pack(self, records) -> bytes:
+        """encode() 결과들 -> 압축 블록 하나"""
+        raw = b"".join(records)
+        if not raw:
+            return b""
+        data = zlib.compress(raw, COMPRESS_LEVEL)
+        return BLOCK_HEADER.pack(TAG_BLOCK, len(data), len(raw)) + data
+
+
+def is_binary(path) -> bool:
+    path = Path(path)
+    if path.suffix == SUFFIX:
+        return True
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def iter_blocks(data):
+    """
+    파일 내용 -> (블록별 레코드 바이트, 다음 블록 위치)
+
+    헤더가 다시 나오면 블록 대신 None (문자열 테이블 초기화).
+    끝이 잘린 블록(쓰는 중/비정상 종료)에서 멈춤
+    """
+    pos = 0
+    end = len(data)
+    block_size = BLOCK_HEADER.size
+    while pos < end:
+        if data[pos] == TAG_BLOCK:
+            if pos + block_size > end:
+                return
+            _, length, _ = BLOCK_HEADER.unpack_from(data, pos)
+            start = pos + block_size
+            if start + length > end:
+                return
+            try:
+                block = zlib.decompress(data[start:start + length])
+            except zlib.error:
+                return
+            pos = start + length
+            yield block, pos
+        elif data[pos:pos + len(MAGIC)] == MAGIC:
+            if pos + FILE_HEADER.size > end:
+                return
+            pos += FILE_HEADER.size
+            yield None, pos
+        else:
+            raise ValueError(f"bad block tag {data[pos]} at {pos}")
+
+
+class RecordReader:
+    """
+    .rlog 디코더 (문자열 테이블/본문 캐시 유지)
+
+    read_new() 는 지난번에 읽은 위치 이후의 완전한 블록만 읽으므로 쓰는 중인 로그를 이어 읽을 수 있음.
+    details 는 같은 본문끼리 바깥 dict 만 새로 만들고 안쪽 list/dict 는 공유하므로 읽기 전용으로 다룰 것
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.strings = [None]
+        self.cache = {}
+        self.decode = json.JSONDecoder().decode
+
+    def read_new(self):
+        """offset 이후 새로 쓰인 레코드 목록"""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        return list(self.records(data))
+
+    def records(self, data):
+        """data(offset 위치부터의 파일 내용) -> (ts, message, event_type, details), 블록마다 offset 갱신"""
+        base = self.offset
+        for block, next_pos in iter_blocks(data):
+            if block is None:
+                self.strings = [None]
+            else:
+                yield from self._decode_block(block)
+            self.offset = base + next_pos
+
+    def _decode_block(self, block):
+        strings = self.strings
+        cache = self.cache
+        event_size = EVENT_HEADER.size
+        string_size = STRING_HEADER.size
+        unpack_event = EVENT_HEADER.unpack_from
+        pos = 0
+        end = len(block)
+        while pos < end:
+            tag = block[pos]
+            if tag == TAG_EVENT:
+                _, ts, type_id, from_id, to_id, state_id, template_id, msg_len, body_len = unpack_event(block, pos)
+                pos += event_size
+                message = block[pos:pos + msg_len].decode("utf-8")
+                pos += msg_len
+                if body_len:
+                    body = block[pos:pos + body_len]
+                    pos += body_len
+                    parsed = cache.get(body)
+                    if parsed is None:
+                        if len(cache) >= DETAILS_CACHE_SIZE:
+                            cache.clear()
+                        parsed = cache[body] = self.decode(body.decode("utf-8"))
+                    details = dict(parsed)
+                else:
+                    details = {}
+                if from_id:
+                    details["from"] = strings[from_id]
+                if to_id:
+                    details["to"] = strings[to_id]
+                if state_id:
+                    details["state"] = strings[state_id]
+                if template_id:
+                    details["template"] = strings[template_id]
+                yield (None if ts != ts else ts), message, strings[type_id], details
+            elif tag == TAG_STRING:
+                _, string_id, length = STRING_HEADER.unpack_from(block, pos)
+                pos += string_size
+                value = block[pos:pos + length].decode("utf-8")
+                pos += length
+                if string_id >= len(strings):
+                    strings.extend([None] * (string_id + 1 - len(strings)))
+                strings[string_id] = value
+            else:
+                raise ValueError(f"{self.path}: bad record tag {tag} at {pos}")
+
+
+def iter_records(path):
+    """
+    .rlog -> (ts, message, event_type, details) 순서대로
+
+    끝이 잘린 마지막 블록은 건너뜀 (details 는 읽기 전용, RecordReader 참고)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    yield from RecordReader(path).records(data)
+
+
+_second_cache = {}
+
+
+def format_timestamp(ts):
+    """epoch 초 -> datetime.fromtimestamp(ts).isoformat() 과 같은 문자열 (초 단위 부분은 캐시)"""
+    if ts is None:
+        return None
+    frac, whole = math.modf(ts)
+    micro = round(frac * 1e6)
+    if micro >= 1000000:
+        whole += 1
+        micro -= 1000000
+    elif micro < 0:
+        whole -= 1
+        micro += 1000000
+    whole = int(whole)
+    base = _second_cache.get(whole)
+    if base is None:
+        if len(_second_cache) >= DETAILS_CACHE_SIZE:
+            _second_cache.clear()
+        base = _second_cache[whole] = datetime.fromtimestamp(whole).isoformat()
+    return f"{base}.{micro:06d}" if micro else base
+
+
+def parse_timestamp(text):
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def find_logs(log_dir):
+    """
+    로그 디렉토리의 JSONL(.json) + 바이너리(.rlog) 로그
+
+    convert_log.py 로 변환해서 같은 이름의 .json 과 .rlog 가 함께 있으면 같은 실행이므로
+    최근에 수정된 쪽 하나만 (실행이 두 번 집계되지 않도록)
+    """
+    log_dir = Path(log_dir)
+    by_stem = {}
+    for path in list(log_dir.glob("*.json")) + list(log_dir.glob(f"*{SUFFIX}")):
+        other = by_stem.get(path.stem)
+        if other is None or path.stat().st_mtime_ns > other.stat().st_mtime_ns:
+            by_stem[path.stem] = path
+    return list(by_stem.values())
+
+
+def iter_events(path):
+    """
+    JSONL / .rlog 로그 -> JSONL 과 같은 모양의 dict
+
+    {"timestamp": ISO 문자열, "message", "event_type", "details"}
+    """
+    if is_binary(path):
+        for ts, message, event_type, details in iter_records(path):
+            yield {
+                "timestamp": format_timestamp(ts),
+                "message": message,
+                "event_type": event_type,
+                "details": details,
+            }
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_tuples(path):
+    """
+    JSONL / .rlog 로그 -> (ts, message, event_type, details), ts 는 epoch 초 float
+
+    .rlog 는 ISO 문자열로 바꾸지 않고 그대로, JSONL 은 timestamp 를 파싱해서
+    """
+    if is_binary(path):
+        yield from iter_records(path)
+        return
+
+    for entry in iter_events(path):
+        yield (
+            parse_timestamp(entry.get("timestamp")), entry.get("message"),
+            entry.get("event_type"), entry.get("details") or {},
+        )
+
+
+def write_binary(events, path):
+    """dict 이벤트들 -> .rlog (변환기용)"""
+    encoder = BinaryEncoder()
+    count = 0
+    records = []
+    with open(path, "wb") as f:
+        f.write(encoder.header())
+        for entry in events:
+            records.append(encoder.encode(
+                parse_timestamp(entry.get("timestamp")), entry.get("message"),
+                entry.get("event_type"), entry.get("details"),
+            ))
+            count += 1
+            if len(records) >= BLOCK_EVENTS:
+                f.write(encoder.pack(records))
+                records = []
+        f.write(encoder.pack(records))
+    return count
+
+
+def write_jsonl(events, path):
+    """dict 이벤트들 -> JSONL (변환기용)"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in events:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,391 @@
+"""
+화면 캡처
+
+캡처 백엔드 (모두 BGR ndarray 반환, region 은 이미지 좌표)
+- pyautogui: 기존 pyautogui.screenshot() 경로
+- mss: 네이티브 grabber (Linux 에서는 X11 직접 캡처, pyautogui 보다 빠름)
+- replay: 디렉토리의 이미지 또는 동영상 파일에서 프레임 재생 (화면 없이 테스트/벤치마크)
+
+백그라운드 캡처
+캡처 전용 스레드가 크기가 제한된 ring buffer 에 (timestamp, frame) 으로 쌓고,
+상태 머신은 항상 가장 최신 프레임으로 매칭합니다.
+다음 프레임은 소비자의 요청 간격(스캔 스케줄러/변화 감지가 정함)에 맞춰 미리 캡처해 두므로
+캡처가 매칭/대기와 겹쳐 실행되고, 요청이 뜸하면 캡처도 뜸해집니다 (여러 흐름이 같은 프레임을 공유).
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BACKENDS = ("pyautogui", "mss", "replay")
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def crop_region(image, region):
+    if region is None:
+        return image
+    x, y, w, h = region
+    return image[y:y + h, x:x + w]
+
+
+class CaptureBackend:
+    """캡처 백엔드 공통 인터페이스"""
+
+    name = "base"
+
+    def grab(self, region=None):
+        """1프레임 캡처 -> BGR ndarray"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(CaptureBackend):
+    name = "pyautogui"
+
+    def grab(self, region=None):
+        import pyautogui
+
+        shot = pyautogui.screenshot(region=region)
+        return cv2.cvtColor(np.asarray(shot), cv2.COLOR_RGB2BGR)
+
+
+class MSSBackend(CaptureBackend):
+    """mss 기반 네이티브 캡처 (mss 인스턴스는 스레드마다 따로 생성)"""
+
+    name = "mss"
+
+    def __init__(self, monitor: int = 1):
+        import mss  # noqa: F401  (없으면 여기서 ImportError)
+
+        self.monitor = monitor
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def grab(self, region=None):
+        sct = self._sct()
+        shot = sct.grab(sct.monitors[self.monitor])
+        # BGRA -> BGR (view 가 아닌 연속 배열로)
+        image = np.asarray(shot)[:, :, :3]
+        return np.ascontiguousarray(crop_region(image, region))
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    녹화된 프레임 재생
+
+    source: 이미지 디렉토리(파일명 순서) 또는 동영상 파일
+    - clock 없음: grab() 할 때마다 다음 프레임
+    - clock 있음: 첫 grab() 이후 경과 시간에 해당하는 프레임 (가상 시계로 빠르게 재생 가능)
+      이미지 디렉토리에 frames.jsonl({"file": ..., "t": 초}) 이 있으면 그 시각을,
+      없으면 frame_interval 간격을 사용합니다. 각 프레임은 다음 프레임 시각까지 유지됩니다.
+    loop=False 면 마지막 프레임 이후 EOFError
+    """
+
+    name = "replay"
+
+    def __init__(self, source, loop: bool = True, clock=None, frame_interval: float = 0.5):
+        self.source = Path(source)
+        self.loop = loop
+        self.clock = clock
+        self.frame_interval = frame_interval
+        self.index = 0
+        self._origin = None
+        self._cached = (None, None)
+        self._lock = threading.Lock()
+        self._video = None
+        self._video_pos = 0
+        self._files = []
+        if self.source.is_dir():
+            self._files, self.timestamps = self._load_manifest()
+            if not self._files:
+                raise FileNotFoundError(f"no frames in {self.source}")
+        elif self.source.exists():
+            self._video = cv2.VideoCapture(str(self.source))
+            if not self._video.isOpened():
+                raise IOError(f"cannot open video: {self.source}")
+            fps = self._video.get(cv2.CAP_PROP_FPS) or (1.0 / frame_interval)
+            self.frame_interval = 1.0 / fps
+            self.timestamps = [i * self.frame_interval for i in range(len(self))]
+        else:
+            raise FileNotFoundError(f"replay source not found: {self.source}")
+        self.duration = (self.timestamps[-1] if self.timestamps else 0.0) + self.frame_interval
+
+    def _load_manifest(self):
+        manifest = self.source / "frames.jsonl"
+        if manifest.exists():
+            files, timestamps = [], []
+            with open(manifest, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    files.append(self.source / item["file"])
+                    timestamps.append(float(item["t"]))
+            return files, timestamps
+
+        files = sorted(p for p in self.source.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        return files, [i * self.frame_interval for i in range(len(files))]
+
+    def __len__(self):
+        if self._video is not None:
+            return int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+        return len(self._files)
+
+    def _read_file(self, index: int):
+        image = cv2.imread(str(self._files[index]), cv2.IMREAD_COLOR)
+        if image is None:
+            raise IOError(f"cannot read frame: {self._files[index]}")
+        return image
+
+    def _read_video(self, index: int):
+        if index < self._video_pos:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._video_pos = index
+        image = None
+        while self._video_pos <= index:
+            ok, image = self._video.read()
+            if not ok:
+                raise EOFError(f"end of replay: {self.source}")
+            self._video_pos += 1
+        return image
+
+    def _frame(self, index: int):
+        # 같은 프레임이 유지되는 동안은 디코드하지 않고 같은 배열을 돌려줌
+        cached_index, image = self._cached
+        if cached_index != index:
+            image = self._read_video(index) if self._video is not None else self._read_file(index)
+            self._cached = (index, image)
+        return image
+
+    def _next_index(self):
+        if self.clock is not None:
+            now = self.clock.time()
+            if self._origin is None:
+                self._origin = now
+            elapsed = now - self._origin
+            if elapsed >= self.duration:
+                if not self.loop:
+                    raise EOFError(f"end of replay: {self.source}")
+                elapsed %= self.duration
+            return max(0, bisect.bisect_right(self.timestamps, elapsed) - 1)
+
+        if self.index >= len(self):
+            if not self.loop:
+                raise EOFError(f"end of replay: {self.source}")
+            self.index = 0
+        index = self.index
+        self.index += 1
+        return index
+
+    def grab(self, region=None):
+        with self._lock:
+            image = self._frame(self._next_index())
+        return crop_region(image, region)
+
+    def close(self):
+        if self._video is not None:
+            self._video.release()
+
+
+def get_backend(name: str = "pyautogui", source=None, clock=None, loop: bool = True,
+                frame_interval: float = 0.5) -> CaptureBackend:
+    """이름으로 캡처 백엔드 생성 (replay 는 source 필요, clock 을 주면 시각 기준 재생)"""
+    if name == "pyautogui":
+        return PyAutoGUIBackend()
+    if name == "mss":
+        return MSSBackend()
+    if name == "replay":
+        if source is None:
+            raise ValueError("replay backend needs a source directory or video file")
+        return ReplayBackend(source, loop=loop, clock=clock, frame_interval=frame_interval)
+    raise ValueError(f"unknown capture backend: {name} (choose from {BACKENDS})")
+
+
+class SharedFrame:
+    """
+    캡처 스레드 없이 여러 소비자(흐름)가 프레임 하나를 나눠 쓰기
+
+    소비자는 마지막으로 받은 프레임 번호를 넘기고, 이미 본 프레임을 다시 요청할 때만 새로 캡처합니다.
+    """
+
+    def __init__(self, grab):
+        self.grab = grab
+        self.seq = 0
+        self.frame = None
+        self.captured = 0
+        self._lock = threading.Lock()
+
+    def get(self, seen: int = 0):
+        """(프레임 번호, frame)"""
+        with self._lock:
+            if self.frame is None or seen >= self.seq:
+                self.frame = self.grab()
+                self.seq += 1
+                self.captured += 1
+            return self.seq, self.frame
+
+
+class CaptureThread:
+    """
+    캡처 producer 스레드 + 최신 프레임 ring buffer
+
+    프레임을 넘겨줄 때마다 직전 요청과의 간격으로 다음 요청 시각을 예상해서, 그 시각보다
+    캡처 시간 2배만큼 먼저 다음 프레임을 캡처해 둡니다 (소비자가 매칭/대기하는 동안 캡처). 요청 간격은 스캔
+    스케줄러와 변화 감지가 정하므로 캡처 주기도 그대로 따라갑니다.
+    예상보다 일찍 요청하거나 미리 캡처한 프레임이 max_age 초보다 오래되면 그 자리에서 캡처합니다.
+    """
+
+    def __init__(self, grab, capacity: int = 3, interval: float = 0.0, clock=None,
+                 max_age: float = None):
+        self.grab = grab
+        # 캡처 사이 최소 간격 (요청이 몰려도 이보다 자주 캡처하지 않음)
+        self.interval = interval
+        self.clock = clock
+        self.max_age = max_age
+        self.frames = deque(maxlen=capacity)
+        self.captured = 0
+        self.prefetched = 0  # 기다리지 않고 미리 캡처한 프레임을 넘긴 횟수
+        self.error = None
+        self._wanted = False
+        self._grabbing = False
+        # 실제 시간 기준 (time.monotonic): 다음 미리 캡처 시각, 마지막 요청 시각, 최신 프레임 캡처 시각
+        self._next_grab = None
+        self._requested_at = None
+        self._handed = None
+        self._latest_at = None
+        self._grab_time = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    def _wait_turn(self) -> bool:
+        """캡처 요청 또는 미리 캡처 시각까지 대기 (lock 안에서, 종료면 False)"""
+        while not self._stop.is_set():
+            if self._wanted:
+                break
+            if self._next_grab is None:
+                self._cond.wait()
+                continue
+            remaining = self._next_grab - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        if self._stop.is_set():
+            return False
+        self._wanted = False
+        self._next_grab = None
+        self._grabbing = True
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._wait_turn():
+                    return
+
+            started = self._now()
+            began = time.monotonic()
+            try:
+                frame = self.grab()
+            except Exception as e:
+                with self._cond:
+                    self._grabbing = False
+                    self.error = e
+                    self._cond.notify_all()
+                self._stop.wait(self.interval or 0.1)
+                continue
+
+            with self._cond:
+                if self.frames and started <= self.frames[-1][0]:
+                    # 가상 시계는 sleep 없이 시각이 그대로일 수 있음: 캡처 순서는 유지
+                    started = self.frames[-1][0] + 1e-6
+                self.frames.append((started, frame))
+                self.captured += 1
+                self.error = None
+                self._grabbing = False
+                self._latest_at = time.monotonic()
+                self._grab_time = self._latest_at - began
+                self._cond.notify_all()
+
+            remaining = self.interval - (time.monotonic() - began)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def _fresh(self, newer_than: float) -> bool:
+        if not self.frames or self.frames[-1][0] <= newer_than:
+            return False
+        return self.max_age is None or time.monotonic() - self._latest_at <= self.max_age
+
+    def _hand_out(self, stamp: float, requested: float):
+        """다음 요청 예상 시각(직전 요청 간격 기준)에 프레임이 준비되도록 미리 캡처 예약"""
+        if stamp == self._handed:
+            # 같은 프레임을 다른 흐름에 넘김: 요청 간격으로 보지 않음
+            return
+        if self._requested_at is not None:
+            expected = requested + (requested - self._requested_at)
+            self._next_grab = max(time.monotonic() + self.interval, expected - 2 * self._grab_time)
+            self._cond.notify_all()
+        self._requested_at = requested
+        self._handed = stamp
+
+    def latest(self):
+        """가장 최신 (timestamp, frame) (아직 없으면 None)"""
+        with self._cond:
+            return self.frames[-1] if self.frames else None
+
+    def get(self, newer_than: float = 0.0, timeout: float = 5.0):
+        """
+        캡처 시작 시각이 newer_than 보다 늦은 최신 프레임
+
+        미리 캡처한 프레임이 있으면 바로, 없으면(또는 max_age 초과) 캡처를 요청하고 대기합니다.
+        timeout 안에 새 프레임이 없으면 마지막 캡처 에러(또는 TimeoutError)를 올립니다.
+        """
+        requested = time.monotonic()
+        deadline = requested + timeout
+        waited = False
+        with self._cond:
+            while not self._fresh(newer_than):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    if self.error is not None:
+                        raise self.error
+                    raise TimeoutError("no new frame from capture thread")
+                if not self._wanted and not self._grabbing:
+                    self._wanted = True
+                    self._cond.notify_all()
+                waited = True
+                self._cond.wait(remaining)
+            if not waited:
+                self.prefetched += 1
+            stamp, frame = self.frames[-1]
+            self._hand_out(stamp, requested)
+            return stamp, frame
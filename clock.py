@@ -0,0 +1,90 @@
+"""
+시계 추상화
+
+runner 는 time.time()/time.sleep() 대신 CLOCK 을 통해 시간을 다룹니다.
+- SystemClock: 실제 시간
+- VirtualClock: sleep 하면 즉시 시간만 앞으로 감 (오프라인 리플레이용)
+asyncio runner 는 sleep 대신 await clock.asleep() 을 사용하고,
+tick 루프마다 join()/leave() 로 참여를 알립니다.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class SystemClock:
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def asleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds))
+
+    def join(self):
+        pass
+
+    def leave(self):
+        pass
+
+
+class VirtualClock:
+    """가상 시계: sleep(s) 는 기다리지 않고 현재 시각만 s 만큼 증가"""
+
+    def __init__(self, start: float = 0.0):
+        self.start = start
+        self.now = start
+        self.slept = 0.0
+        # asyncio: 참여 중인 루프 수와 깨어날 시각 대기열 (deadline, 순번, future)
+        self.active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+            self.slept += seconds
+
+    async def asleep(self, seconds: float):
+        """
+        참여 중인 루프가 모두 asleep 에 들어왔을 때 가장 이른 deadline 으로 시간을 옮겨 깨움
+        (루프 여러 개가 각자 시간을 앞당기지 않고 같은 가상 시간을 공유)
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self.now + max(0.0, seconds), next(self._seq), future))
+        self._wake()
+        await future
+
+    def join(self):
+        self.active += 1
+
+    def leave(self):
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        waiters = self._waiters
+        while waiters and waiters[0][2].done():
+            heapq.heappop(waiters)
+        if sum(not waiter[2].done() for waiter in waiters) < max(1, self.active):
+            return
+        deadline = waiters[0][0]
+        if deadline > self.now:
+            self.sleep(deadline - self.now)
+        while waiters and waiters[0][0] <= deadline:
+            future = heapq.heappop(waiters)[2]
+            if not future.done():
+                future.set_result(None)
+
+    def advance(self, seconds: float):
+        self.sleep(seconds)
+
+    def elapsed(self) -> float:
+        return self.now - self.start
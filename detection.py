@@ -0,0 +1,608 @@
+"""
+프레임 단위 템플릿 감지
+
+scan tick 마다 화면을 한 번만 캡처하고, 그 프레임 하나로
+현재 상태에 필요한 모든 템플릿을 매칭합니다.
+(locateOnScreen 은 템플릿마다 전체 화면을 새로 캡처함)
+
+프레임 캡처는 capture 모듈의 백엔드가 담당합니다.
+템플릿은 templates.TemplateRegistry 에서 미리 로드된 Template 을 사용합니다.
+region 은 모두 이미지(캡처) 좌표 기준입니다.
+논리 좌표 -> 이미지 좌표 변환은 runner.to_image_region() 에서 처리합니다.
+
+매칭 모드
+- FULL: 원본 해상도 전체 영역 NCC (TM_CCOEFF_NORMED)
+- PYRAMID: 축소본에서 후보 위치를 찾고, 후보 주변만 원본 해상도로 재검사
+
+match_* 는 miss 여도 최고 점수와 위치를 MatchResult 로 돌려주고,
+locate_* 는 confidence 이상일 때의 Box(없으면 None)만 돌려줍니다.
+"""
+
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from pyscreeze import Box
+
+MATCH_MODES = ("FULL", "PYRAMID")
+
+# PYRAMID 모드에서 축소 템플릿이 이보다 작으면 FULL 로 처리
+PYRAMID_MIN_TEMPLATE = 8
+
+# 병렬 매칭에서 region 이 이 픽셀 수 이상이면 가로 띠(tile)로 나눠 매칭
+TILE_MIN_PIXELS = 2_000_000
+
+# 점수 분포 버킷 폭 (0.0~1.0, 음수 점수는 첫 버킷)
+SCORE_BUCKET = 0.05
+
+
+class MatchResult:
+    """
+    매칭 결과 (miss 여도 최고 점수 위치를 채움)
+
+    score: 원본 해상도 최고 NCC 점수 (매칭할 수 없거나 PYRAMID 재검사 후보가 없으면 -1.0)
+    box: 최고 점수 위치 (score 가 -1.0 이면 None, ScoreStats 도 기록하지 않음)
+    found: confidence 이상이면 box, 아니면 None
+    """
+
+    __slots__ = ("score", "box", "confidence")
+
+    def __init__(self, score: float, box, confidence: float):
+        self.score = float(score)
+        self.box = box
+        self.confidence = confidence
+
+    @property
+    def hit(self) -> bool:
+        return self.box is not None and self.score >= self.confidence
+
+    @property
+    def found(self):
+        return self.box if self.hit else None
+
+    def __repr__(self):
+        return f"MatchResult(score={self.score:.3f}, box={self.box}, hit={self.hit})"
+
+
+def crop(frame, region):
+    """region 으로 프레임 자르기 -> (sub_image, left, top)"""
+    if region is None:
+        return frame, 0, 0
+    fh, fw = frame.shape[:2]
+    x, y, w, h = region
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(fw, x + w), min(fh, y + h)
+    return frame[y0:y1, x0:x1], x0, y0
+
+
+def best_match(image, needle, mask=None):
+    """image 안에서 needle 의 최고 점수와 위치 -> (score, (x, y))"""
+    nh, nw = needle.shape[:2]
+    if image.shape[0] < nh or image.shape[1] < nw:
+        return -1.0, (0, 0)
+    result = cv2.matchTemplate(image, needle, cv2.TM_CCOEFF_NORMED, mask=mask)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if not np.isfinite(max_val):
+        return -1.0, (0, 0)
+    return max_val, max_loc
+
+
+def match_in(frame, template, region=None, confidence: float = 0.88):
+    """캡처된 프레임에서 템플릿 최고 점수 위치 -> MatchResult"""
+    image, left, top = crop(frame, region)
+    nh, nw = template.bgr.shape[:2]
+    if image.shape[0] < nh or image.shape[1] < nw:
+        return MatchResult(-1.0, None, confidence)
+    score, (x, y) = best_match(image, template.bgr, template.mask)
+    tw, th = template.size
+    return MatchResult(score, Box(left + x, top + y, tw, th), confidence)
+
+
+def locate_in(frame, template, region=None, confidence: float = 0.88):
+    """캡처된 프레임에서 템플릿 위치 탐색 (최고 점수 위치, 없으면 None)"""
+    if template is None:
+        return None
+    return match_in(frame, template, region=region, confidence=confidence).found
+
+
+def match_tiled(frame, template, region=None, confidence: float = 0.88, executor=None, tiles: int = 4):
+    """
+    region 을 가로 띠 tiles 개로 나눠 병렬 매칭 (FULL 과 같은 결과)
+
+    띠끼리 템플릿 높이-1 만큼 겹치게 잘라서 경계에 걸친 위치도 빠짐없이 검사합니다.
+    띠는 모두 frame 의 view 라서 복사가 없습니다.
+    """
+    image, left, top = crop(frame, region)
+    ih = image.shape[0]
+    tw, th = template.size
+    positions = ih - th + 1
+    if executor is None or tiles < 2 or positions < tiles * 2:
+        return match_in(frame, template, region=region, confidence=confidence)
+
+    step = int(math.ceil(positions / tiles))
+    bands = [(y, image[y:min(ih, y + step + th - 1)]) for y in range(0, positions, step)]
+    futures = [
+        (y, executor.submit(best_match, band, template.bgr, template.mask)) for y, band in bands
+    ]
+    best_score, best_loc = -1.0, None
+    for y, future in futures:
+        score, (x, by) = future.result()
+        if score > best_score:
+            best_score, best_loc = score, (x, y + by)
+
+    if best_loc is None:
+        return MatchResult(-1.0, None, confidence)
+    return MatchResult(best_score, Box(left + best_loc[0], top + best_loc[1], tw, th), confidence)
+
+
+def locate_tiled(frame, template, region=None, confidence: float = 0.88, executor=None, tiles: int = 4):
+    if template is None:
+        return None
+    return match_tiled(
+        frame, template, region=region, confidence=confidence, executor=executor, tiles=tiles
+    ).found
+
+
+class FramePyramid:
+    """프레임 축소본 캐시 (같은 프레임을 여러 템플릿이 공유)"""
+
+    def __init__(self):
+        self._ref = None
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def level(self, frame, factor: float):
+        # 병렬 매칭 시 같은 프레임을 두 번 축소하지 않도록 lock
+        with self._lock:
+            if self._ref is None or self._ref() is not frame:
+                self._ref = weakref.ref(frame)
+                self._levels = {}
+            if factor not in self._levels:
+                self._levels[factor] = cv2.resize(
+                    frame, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+                )
+            return self._levels[factor]
+
+
+def match_pyramid(frame, template, region=None, confidence: float = 0.88,
+                  factor: float = 0.25, margin: float = 0.35, candidates: int = 3,
+                  pyramid: FramePyramid = None):
+    """
+    coarse-to-fine 매칭
+
+    1) 프레임/템플릿 축소본에서 NCC -> 점수 상위 후보(confidence - margin 이상)
+    2) 후보 주변 작은 창에서만 원본 해상도 NCC -> 최고 점수 위치
+    후보가 하나도 없으면 원본 점수가 없으므로 (-1.0, box 없음) miss 를 돌려줍니다
+    (축소본 점수는 원본 점수와 분포가 달라 점수 통계에 섞지 않음).
+    """
+    tw, th = template.size
+    coarse_bgr, coarse_mask = template.level(factor)
+    ch, cw = coarse_bgr.shape[:2]
+    if min(cw, ch) < PYRAMID_MIN_TEMPLATE:
+        return match_in(frame, template, region=region, confidence=confidence)
+
+    image, left, top = crop(frame, region)
+    ih, iw = image.shape[:2]
+    if ih < th or iw < tw:
+        return MatchResult(-1.0, None, confidence)
+
+    small_frame = (pyramid or FramePyramid()).level(frame, factor)
+    sx0, sy0 = int(left * factor), int(top * factor)
+    # 끝은 올림 (내림하면 프레임/region 가장자리의 축소본 마지막 줄이 빠져 가장자리 템플릿을 놓침)
+    sx1 = min(small_frame.shape[1], int(math.ceil((left + iw) * factor)))
+    sy1 = min(small_frame.shape[0], int(math.ceil((top + ih) * factor)))
+    small = small_frame[sy0:sy1, sx0:sx1]
+    if small.shape[0] < ch or small.shape[1] < cw:
+        return match_in(frame, template, region=region, confidence=confidence)
+
+    result = cv2.matchTemplate(small, coarse_bgr, cv2.TM_CCOEFF_NORMED, mask=coarse_mask)
+    result[~np.isfinite(result)] = -1.0
+
+    # 축소 좌표 1칸 = 원본 1/factor 칸 -> 반올림 오차까지 포함한 재검사 여유
+    pad = int(math.ceil(1.0 / factor)) + 2
+    best_score, best_loc = -1.0, None
+    for _ in range(candidates):
+        _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(result)
+        if coarse_val < confidence - margin:
+            break
+        # 후보 위치 (image 좌표)
+        x = int(round((sx0 + cx) / factor)) - left
+        y = int(round((sy0 + cy) / factor)) - top
+
+        # 후보 주변 창
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(iw, x + tw + pad), min(ih, y + th + pad)
+        score, (fx, fy) = best_match(image[y0:y1, x0:x1], template.bgr, template.mask)
+        if score > best_score:
+            best_score, best_loc = score, (x0 + fx, y0 + fy)
+
+        # 같은 봉우리 재선택 방지
+        result[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -1.0
+
+    if best_loc is None:
+        return MatchResult(-1.0, None, confidence)
+    return MatchResult(best_score, Box(left + best_loc[0], top + best_loc[1], tw, th), confidence)
+
+
+def locate_pyramid(frame, template, region=None, confidence: float = 0.88,
+                   factor: float = 0.25, margin: float = 0.35, candidates: int = 3,
+                   pyramid: FramePyramid = None):
+    if template is None:
+        return None
+    return match_pyramid(
+        frame, template, region=region, confidence=confidence, factor=factor,
+        margin=margin, candidates=candidates, pyramid=pyramid,
+    ).found
+
+
+class LocationTracker:
+    """
+    템플릿별 마지막 감지 위치 기억
+
+    다음 탐색은 마지막 Box 주변 margin 만큼의 작은 창에서 먼저 하고,
+    창에서 못 찾았을 때만 원래 region 전체를 탐색합니다.
+    """
+
+    def __init__(self, margin: int = 40):
+        self.margin = margin
+        self.last = {}
+        self.roi_hits = 0
+        self.roi_misses = 0
+        self._lock = threading.Lock()
+
+    def window(self, name: str, region=None):
+        """마지막 위치 주변 탐색 창 (region 과 교집합, 없으면 None)"""
+        box = self.last.get(name)
+        if box is None:
+            return None
+        x0, y0 = box.left - self.margin, box.top - self.margin
+        x1 = box.left + box.width + self.margin
+        y1 = box.top + box.height + self.margin
+        if region is not None:
+            rx, ry, rw, rh = region
+            x0, y0 = max(x0, rx), max(y0, ry)
+            x1, y1 = min(x1, rx + rw), min(y1, ry + rh)
+        if x1 - x0 < box.width or y1 - y0 < box.height:
+            return None
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def update(self, name: str, box):
+        self.last[name] = box
+
+    def record(self, hit: bool):
+        """ROI 창 탐색 결과 집계 (병렬 매칭 스레드에서도 호출됨)"""
+        with self._lock:
+            if hit:
+                self.roi_hits += 1
+            else:
+                self.roi_misses += 1
+
+    def forget(self, name: str):
+        self.last.pop(name, None)
+
+    def stats(self):
+        total = self.roi_hits + self.roi_misses
+        return {
+            "roi_hits": self.roi_hits,
+            "roi_misses": self.roi_misses,
+            "roi_hit_ratio": self.roi_hits / total if total else 0.0,
+            "tracked": sorted(self.last),
+        }
+
+
+class ChangeDetector:
+    """
+    프레임 변화 감지 (매칭 생략 판단)
+
+    region 의 gray 이미지를 step x step 블록 평균(INTER_AREA)으로 줄인 축소본을 마지막으로
+    실제 매칭했던 시점의 축소본과 비교합니다. 블록 평균 차가 pixel_threshold 를 넘는 블록이
+    min_changed 미만이면 "변화 없음". 점 샘플링과 달리 얇은 선/글자만 바뀌어도 블록 평균에 남습니다.
+    직전 tick 이 아니라 마지막 매칭 시점과 비교하므로 느린 변화도 누적되면 감지됩니다.
+    연속 생략은 max_skips 회, 마지막 매칭 이후 max_age 초(clock 기준)를 넘지 않습니다.
+    """
+
+    def __init__(self, step: int = 8, pixel_threshold: int = 8, min_changed: int = 4,
+                 max_skips: int = 20, max_age: float = None, clock=None):
+        self.step = step
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_skips = max_skips
+        self.max_age = max_age
+        self.clock = clock
+        self.refs = {}
+        self.ref_times = {}
+        self.streaks = {}
+        self.checks = {}
+        self.skips = {}
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    def sample(self, frame, region):
+        image, _, _ = crop(frame, region)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        size = (max(1, w // self.step), max(1, h // self.step))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def unchanged(self, key, sample) -> bool:
+        """마지막 매칭 이후 변화가 없으면 True (매칭 생략 가능)"""
+        name = key[0]
+        self.checks[name] = self.checks.get(name, 0) + 1
+        ref = self.refs.get(key)
+        if ref is None or ref.shape != sample.shape:
+            return False
+        if self.streaks.get(key, 0) >= self.max_skips:
+            return False
+        if self.max_age is not None and self._now() - self.ref_times.get(key, 0.0) >= self.max_age:
+            return False
+        diff = cv2.absdiff(sample, ref)
+        if cv2.countNonZero(cv2.compare(diff, self.pixel_threshold, cv2.CMP_GT)) >= self.min_changed:
+            return False
+        self.streaks[key] = self.streaks.get(key, 0) + 1
+        self.skips[name] = self.skips.get(name, 0) + 1
+        return True
+
+    def remember(self, key, sample):
+        self.refs[key] = sample
+        self.ref_times[key] = self._now()
+        self.streaks[key] = 0
+
+    def stats(self):
+        total_checks = sum(self.checks.values())
+        total_skips = sum(self.skips.values())
+        return {
+            "checks": total_checks,
+            "skips": total_skips,
+            "skip_ratio": total_skips / total_checks if total_checks else 0.0,
+            "per_template": {
+                name: {
+                    "checks": checks,
+                    "skips": self.skips.get(name, 0),
+                    "skip_ratio": self.skips.get(name, 0) / checks,
+                }
+                for name, checks in sorted(self.checks.items())
+            },
+        }
+
+
+class ScoreHistogram:
+    """템플릿 하나의 점수 분포 (SCORE_BUCKET 폭 버킷 + hit/miss/near miss)"""
+
+    __slots__ = (
+        "counts", "count", "hits", "near_misses", "total", "min", "max", "min_hit", "best_miss",
+        "confidence",
+    )
+
+    def __init__(self):
+        self.counts = [0] * (int(round(1.0 / SCORE_BUCKET)) + 1)
+        self.count = 0
+        self.hits = 0
+        self.near_misses = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.min_hit = None
+        self.best_miss = None
+        self.confidence = None
+
+    def add(self, score: float, hit: bool, confidence: float, near: float):
+        index = min(len(self.counts) - 1, max(0, int(score / SCORE_BUCKET)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += score
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        self.confidence = confidence
+        if hit:
+            self.hits += 1
+            if self.min_hit is None or score < self.min_hit:
+                self.min_hit = score
+            return
+        if self.best_miss is None or score > self.best_miss:
+            self.best_miss = score
+        if score >= confidence - near:
+            self.near_misses += 1
+
+    def summary(self):
+        def rounded(value):
+            return None if value is None else round(value, 3)
+
+        return {
+            "count": self.count,
+            "hits": self.hits,
+            "misses": self.count - self.hits,
+            "near_misses": self.near_misses,
+            "confidence": self.confidence,
+            "min": rounded(self.min),
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "max": rounded(self.max),
+            "min_hit": rounded(self.min_hit),
+            "best_miss": rounded(self.best_miss),
+            # 버킷 하한 -> 횟수 (0 인 버킷은 생략)
+            "buckets": {
+                f"{idx * SCORE_BUCKET:.2f}": n for idx, n in enumerate(self.counts) if n
+            },
+        }
+
+
+class ScoreStats:
+    """
+    템플릿별 매칭 점수 분포
+
+    near: miss 중 confidence - near 이상이면 near miss (threshold 를 조금만 낮추면 잡혔을 감지)
+    """
+
+    def __init__(self, near: float = 0.05):
+        self.near = near
+        self.templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, result: MatchResult):
+        if result.box is None:
+            return
+        # 병렬 매칭 스레드에서도 호출되므로 lock
+        with self._lock:
+            hist = self.templates.get(name)
+            if hist is None:
+                hist = self.templates[name] = ScoreHistogram()
+            hist.add(result.score, result.hit, result.confidence, self.near)
+
+    def summary(self):
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self.templates.items())}
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+class Matcher:
+    """
+    매칭 엔진 선택 (FULL | PYRAMID) + 프레임 단위 다중 템플릿 매칭
+
+    workers > 1 이면 스레드 풀에서 병렬 매칭합니다 (cv2.matchTemplate 는 GIL 을 놓음).
+    - 템플릿 여러 개: 템플릿 단위로 분배
+    - 템플릿 1개 + 큰 region(FULL): 가로 띠 단위로 분배
+    perf(PerfRecorder) 를 주면 템플릿별 매칭 시간을 "match.<이름>" span 으로 기록
+    scores(ScoreStats) 를 주면 실제로 매칭한 결과의 점수를 템플릿별로 기록
+    (gating 재사용 결과와 PYRAMID 에서 원본 재검사 후보가 없던 결과는 제외)
+    pyramid_scales: {템플릿 이름: 축소 배율} (calibrate.py 결과, 없는 템플릿은 pyramid_scale)
+    """
+
+    def __init__(self, mode: str = "FULL", pyramid_scale: float = 0.25,
+                 pyramid_margin: float = 0.35, pyramid_candidates: int = 3,
+                 tracker: LocationTracker = None, gate: ChangeDetector = None,
+                 workers: int = 1, perf=None, scores: ScoreStats = None,
+                 pyramid_scales: dict = None):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"unknown match mode: {mode}")
+        self.mode = mode
+        self.pyramid_scale = pyramid_scale
+        self.pyramid_scales = dict(pyramid_scales or {})
+        self.pyramid_margin = pyramid_margin
+        self.pyramid_candidates = pyramid_candidates
+        self.pyramid = FramePyramid()
+        self.tracker = tracker
+        self.gate = gate
+        self.perf = perf
+        self.scores = scores
+        self.results = {}
+        self.workers = workers if workers > 0 else default_workers()
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="match")
+
+    def scale_for(self, name: str) -> float:
+        """템플릿의 PYRAMID 축소 배율"""
+        return self.pyramid_scales.get(name, self.pyramid_scale)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def locate(self, frame, template, region=None, confidence: float = 0.88,
+               gated: bool = False, tiled: bool = True):
+        """
+        gated=True 면 region 이 마지막 매칭 이후 그대로일 때 이전 결과를 재사용
+        tiled=False 면 띠 분할 병렬 매칭을 하지 않음 (이미 풀 안에서 실행 중일 때)
+        """
+        if template is None:
+            return None
+        return self.match(frame, template, region, confidence, gated, tiled).found
+
+    def match(self, frame, template, region=None, confidence: float = 0.88,
+              gated: bool = False, tiled: bool = True):
+        """locate 와 같지만 miss 여도 최고 점수/위치를 담은 MatchResult 반환"""
+        if template is None:
+            return MatchResult(-1.0, None, confidence)
+        if self.perf is None:
+            return self._match_gated(frame, template, region, confidence, gated, tiled)
+        with self.perf.span("match." + template.name):
+            return self._match_gated(frame, template, region, confidence, gated, tiled)
+
+    def _match_gated(self, frame, template, region, confidence, gated, tiled):
+        gate = self.gate if gated else None
+        if gate is None:
+            return self._match_tracked(frame, template, region, confidence, tiled)
+
+        key = (template.name, region)
+        sample = gate.sample(frame, region)
+        if key in self.results and gate.unchanged(key, sample):
+            return self.results[key]
+        result = self._match_tracked(frame, template, region, confidence, tiled)
+        gate.remember(key, sample)
+        self.results[key] = result
+        return result
+
+    def _match_tracked(self, frame, template, region, confidence, tiled):
+        result = self._match_roi(frame, template, region, confidence, tiled)
+        if self.scores is not None:
+            self.scores.record(template.name, result)
+        return result
+
+    def _match_roi(self, frame, template, region, confidence, tiled):
+        tracker = self.tracker
+        # 같은 템플릿을 화면의 여러 영역(흐름)에서 찾으므로 region 별로 따로 기억
+        key = template.name if region is None else f"{template.name}@{region}"
+        if tracker is not None:
+            window = tracker.window(key, region)
+            if window is not None:
+                # 작은 창은 원본 해상도로 바로 매칭하는 쪽이 가장 빠름
+                result = match_in(frame, template, region=window, confidence=confidence)
+                tracker.record(result.hit)
+                if result.hit:
+                    tracker.update(key, result.box)
+                    return result
+
+        result = self._match_region(frame, template, region, confidence, tiled)
+        if result.hit and tracker is not None:
+            tracker.update(key, result.box)
+        return result
+
+    def _match_region(self, frame, template, region, confidence, tiled):
+        if self.mode == "PYRAMID":
+            return match_pyramid(
+                frame, template, region=region, confidence=confidence,
+                factor=self.scale_for(template.name), margin=self.pyramid_margin,
+                candidates=self.pyramid_candidates, pyramid=self.pyramid,
+            )
+        if tiled and self.executor is not None:
+            image, _, _ = crop(frame, region)
+            if image.shape[0] * image.shape[1] >= TILE_MIN_PIXELS:
+                return match_tiled(
+                    frame, template, region=region, confidence=confidence,
+                    executor=self.executor, tiles=self.workers,
+                )
+        return match_in(frame, template, region=region, confidence=confidence)
+
+    def scan(self, frame, specs, gated: bool = False):
+        """
+        같은 프레임에 여러 템플릿을 매칭
+
+        specs: {name: (template, region, confidence)}
+        반환: {name: box 또는 None}
+        """
+        return {name: result.found for name, result in self.scan_results(frame, specs, gated).items()}
+
+    def scan_results(self, frame, specs, gated: bool = False):
+        """scan 과 같지만 {name: MatchResult} 반환"""
+        if self.executor is None or len(specs) < 2:
+            return {
+                name: self.match(frame, template, region=region, confidence=confidence, gated=gated)
+                for name, (template, region, confidence) in specs.items()
+            }
+
+        futures = {
+            name: self.executor.submit(
+                self.match, frame, template, region, confidence, gated, False
+            )
+            for name, (template, region, confidence) in specs.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,64 @@
+"""
+입력(마우스/키보드) 추상화
+
+runner 는 pyautogui 를 직접 부르지 않고 INPUT 을 통해 클릭/키 입력을 보냅니다.
+- PyAutoGUIInput: 실제 입력 (pyautogui 는 처음 쓸 때 import -> 화면 없는 환경에서도 runner import 가능)
+- RecordingInput: 입력을 보내지 않고 (시각, 동작) 을 기록만 함 (오프라인 리플레이용)
+"""
+
+from collections import namedtuple
+
+Action = namedtuple("Action", ["time", "kind", "args"])
+
+
+class PyAutoGUIInput:
+    def __init__(self):
+        import pyautogui
+
+        self._gui = pyautogui
+
+    def enable_failsafe(self):
+        self._gui.FAILSAFE = True
+
+    def size(self):
+        w, h = self._gui.size()
+        return int(w), int(h)
+
+    def move_to(self, x: int, y: int, duration: float = 0.0):
+        self._gui.moveTo(x, y, duration=duration)
+
+    def click(self):
+        self._gui.click()
+
+    def press(self, key: str):
+        self._gui.press(key)
+
+
+class RecordingInput:
+    """입력 기록용 가짜 입력 장치 (move_to 의 duration 은 clock 으로 흘려보냄)"""
+
+    def __init__(self, clock, screen_size=(1920, 1080)):
+        self.clock = clock
+        self.screen_size = tuple(screen_size)
+        self.actions = []
+        self.position = (0, 0)
+
+    def enable_failsafe(self):
+        pass
+
+    def size(self):
+        return self.screen_size
+
+    def move_to(self, x: int, y: int, duration: float = 0.0):
+        self.clock.sleep(duration)
+        self.position = (x, y)
+        self.actions.append(Action(self.clock.time(), "move", (x, y)))
+
+    def click(self):
+        self.actions.append(Action(self.clock.time(), "click", self.position))
+
+    def press(self, key: str):
+        self.actions.append(Action(self.clock.time(), "press", (key,)))
+
+    def count(self, kind: str) -> int:
+        return sum(1 for action in self.actions if action.kind == kind)
@@ -0,0 +1,200 @@
+"""
+백그라운드 JSON 로그 writer
+
+log() 는 항목을 큐에 넣기만 하고, 직렬화(timestamp 포맷 포함)/파일 쓰기/fsync 는 전용 스레드가 합니다.
+- 형식: "jsonl" (JSON Lines) | "binary" (binlog 의 .rlog)
+- 파일은 한 번 열어 두고 계속 이어 씀 (flush 마다 다시 열지 않음)
+- flush: 쌓인 줄이 flush_size 이상 / 마지막 flush 후 flush_interval 경과 / urgent 항목
+- fsync: "none" | "urgent" (urgent 항목이 포함된 flush 만) | "always" (flush 마다)
+- 큐가 가득 차면 일반 항목은 버리고 개수만 남기며 (tick 을 막지 않음),
+  urgent 항목(에러 등)은 자리가 날 때까지 기다려서 넣음
+- close() 는 큐에 남은 항목을 모두 쓰고 반환. atexit 에도 등록되어 정상 종료 시 항상 drain
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from binlog import BinaryEncoder
+
+FSYNC_POLICIES = ("none", "urgent", "always")
+LOG_FORMATS = ("jsonl", "binary")
+
+_CLOSE = object()
+_FLUSH = object()
+
+# urgent 항목/종료 요청이 큐 자리를 기다리는 최대 시간(초)
+PUT_TIMEOUT = 5.0
+
+
+class JsonlEncoder:
+    """이벤트 -> JSON 한 줄 (기존 로그 형식)"""
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, ts, message: str, event_type: str, details: dict) -> bytes:
+        entry = {
+            "timestamp": None if ts is None else datetime.fromtimestamp(ts).isoformat(),
+            "message": message,
+            "event_type": event_type,
+            "details": details or {}
+        }
+        # 직렬화 안 되는 값(numpy 수 등) 때문에 writer 스레드가 죽지 않도록 문자열로
+        return (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def pack(self, records) -> bytes:
+        return b"".join(records)
+
+
+class LogWriter:
+    """이벤트 로그 파일 전용 writer 스레드"""
+
+    def __init__(self, path, max_queue: int = 10000, flush_interval: float = 1.0,
+                 flush_size: int = 100, fsync: str = "urgent", fmt: str = "jsonl"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"unknown log format: {fmt}")
+        self.path = path
+        self.encoder = BinaryEncoder() if fmt == "binary" else JsonlEncoder()
+        self.flush_interval = flush_interval
+        self.flush_size = max(1, flush_size)
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self._reported_drops = 0
+        self._last_timestamp = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, ts: float, message: str, event_type: str, details: dict = None, urgent: bool = False):
+        """항목 추가 (일반 항목은 큐가 가득 차도 기다리지 않음)"""
+        entry = (ts, message, event_type, details)
+        if self._closed or not self._thread.is_alive():
+            return
+        try:
+            if urgent:
+                # 장애 직전 이벤트는 잃지 않도록 자리가 날 때까지 대기
+                self.queue.put((entry, True), timeout=PUT_TIMEOUT)
+            else:
+                self.queue.put_nowait((entry, False))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """쌓인 항목을 곧바로 쓰도록 요청 (기다리지 않음)"""
+        if not self._closed:
+            try:
+                self.queue.put_nowait(_FLUSH)
+            except queue.Full:
+                pass
+
+    def close(self, timeout: float = 10.0):
+        """남은 항목을 모두 쓰고 파일을 닫음 (여러 번 호출해도 됨)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self.queue.put(_CLOSE, timeout=PUT_TIMEOUT)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "fsyncs": self.fsyncs,
+            "fsync": self.fsync,
+        }
+
+    def _run(self):
+        pending = []
+        urgent = False
+        last_flush = time.monotonic()
+        f = None
+        try:
+            f = open(self.path, "ab")
+            f.write(self.encoder.header())
+            while True:
+                wait = max(0.0, last_flush + self.flush_interval - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=wait if pending else None)
+                except queue.Empty:
+                    item = _FLUSH
+
+                if item is _CLOSE:
+                    # 큐에 남은 항목까지 모두 모아서 마지막 flush
+                    while True:
+                        try:
+                            item = self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _CLOSE and item is not _FLUSH:
+                            pending.append(self._encode(item[0]))
+                            urgent = urgent or item[1]
+                    self._flush(f, pending, urgent)
+                    return
+
+                if item is not _FLUSH:
+                    entry, is_urgent = item
+                    pending.append(self._encode(entry))
+                    urgent = urgent or is_urgent
+                    if not urgent and len(pending) < self.flush_size and (
+                            time.monotonic() - last_flush < self.flush_interval):
+                        continue
+
+                if pending:
+                    if self._flush(f, pending, urgent):
+                        pending = []
+                        urgent = False
+                last_flush = time.monotonic()
+        except OSError as e:
+            print(f"[ERROR] Failed to open log: {e}", file=sys.stderr)
+        finally:
+            if f is not None:
+                f.close()
+
+    def _encode(self, entry) -> bytes:
+        self._last_timestamp = entry[0]
+        return self.encoder.encode(*entry)
+
+    def _flush(self, f, pending, urgent: bool) -> bool:
+        """pending 을 파일에 쓰고 policy 에 따라 fsync (실패하면 False, 다음 flush 에서 재시도)"""
+        if self.dropped > self._reported_drops:
+            # 버린 항목 수를 로그에 남김 (분석 스크립트에서 구간 누락 확인용)
+            pending.append(self._encode((
+                self._last_timestamp,
+                f"[LOG] dropped {self.dropped - self._reported_drops} entries (queue full)",
+                "log_dropped",
+                {"dropped": self.dropped - self._reported_drops, "total_dropped": self.dropped},
+            )))
+            self._reported_drops = self.dropped
+        if not pending:
+            return True
+        try:
+            f.write(self.encoder.pack(pending))
+            f.flush()
+            if self.fsync == "always" or (self.fsync == "urgent" and urgent):
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+        except OSError as e:
+            print(f"[ERROR] Failed to write log: {e}", file=sys.stderr)
+            return False
+        self.written += len(pending)
+        self.flushes += 1
+        return True
@@ -0,0 +1,113 @@
+"""
+hot path 성능 계측
+
+tick 안의 구간(capture, 템플릿별 match, input, log)을 span 으로 재서
+메모리 안의 히스토그램에 누적합니다. 호출마다 로그를 남기지 않고
+runner 가 주기적으로 요약(event_type: "perf")만 기록하므로 운영 중에도 켜둘 수 있습니다.
+"""
+
+import bisect
+import threading
+import time
+
+# 히스토그램 버킷 상한(ms). 마지막 버킷은 그 이상 전부
+BUCKET_BOUNDS_MS = (
+    0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+)
+
+
+class Histogram:
+    """고정 로그 스케일 버킷 히스토그램 (백분위수는 버킷 상한으로 근사)"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                bound = BUCKET_BOUNDS_MS[idx] if idx < len(BUCKET_BOUNDS_MS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class Span:
+    """with perf.span("name"): ... 구간 측정"""
+
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class PerfRecorder:
+    """구간별 히스토그램 (주기 요약용 window + 전체 누적 total)"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.window = {}
+        self.total = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        return Span(self, name)
+
+    def record(self, name: str, ms: float):
+        if not self.enabled:
+            return
+        # 병렬 매칭 스레드에서도 호출되므로 lock
+        with self._lock:
+            for hists in (self.window, self.total):
+                hist = hists.get(name)
+                if hist is None:
+                    hist = hists[name] = Histogram()
+                hist.add(ms)
+
+    def window_summary(self, reset: bool = True):
+        """마지막 요약 이후 구간별 통계"""
+        with self._lock:
+            summary = {name: hist.summary() for name, hist in sorted(self.window.items())}
+            if reset:
+                self.window = {}
+        return summary
+
+    def total_summary(self):
+        """실행 전체 구간별 통계"""
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self.total.items())}
@@ -1,12 +1,28 @@
+import asyncio
 import time
 import json
-import sys
+import os
+import signal
+import threading
+import traceback
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
-import pyautogui
-import pyscreeze
+import cv2
+
+import binlog
+from capture import CaptureThread, SharedFrame, get_backend
+from clock import SystemClock
+from detection import ChangeDetector, LocationTracker, Matcher, ScoreStats
+from inputs import PyAutoGUIInput
+from logwriter import LogWriter
+from perf import PerfRecorder
+from scheduler import ScanScheduler
+from statemachine import AsyncStateMachine, State, StateMachine
+from templates import TemplateRegistry
 
 # 템플릿 경로
 IMG_POPUP1 = "assets/IMG_POPUP1.png"
@@ -15,9 +31,48 @@ IMG_EXIT = "assets/IMG_EXIT.png"
 IMG_START = "assets/IMG_START.png"
 IMG_PLAYER = "assets/IMG_PLAYER.png"  # 선택: 없으면 FIXED 클릭 fallback
 
+TEMPLATES = {
+    "POPUP1": IMG_POPUP1,
+    "POPUP2": IMG_POPUP2,
+    "EXIT": IMG_EXIT,
+    "START": IMG_START,
+    "PLAYER": IMG_PLAYER,
+}
+
+# 템플릿을 캡처한 디스플레이 배율 (None: 현재 SCALE_X 와 동일 -> 원본 크기로 매칭)
+TEMPLATE_SCALE = None
+
+# 프레임당 매칭 정책: True 면 상태와 무관하게 모든 템플릿을 같은 프레임에서 검사
+SCAN_ALL_TEMPLATES = False
+
 # 매칭 민감도
 CONFIDENCE = 0.88
 PLAYER_CONFIDENCE = 0.88
+# scripts/calibrate.py 결과 (템플릿별 confidence / PYRAMID 축소 배율). 파일이 있으면 위 값보다 우선
+CALIBRATION_FILE = Path(os.environ.get("RUNNER_CALIBRATION", "calibration.json"))
+CALIBRATION = {}
+
+# 매칭 엔진: FULL(원본 해상도 전체 탐색) | PYRAMID(축소본 후보 탐색 -> 원본 재검사)
+MATCH_MODE = "FULL"
+PYRAMID_SCALE = 0.25
+PYRAMID_MARGIN = 0.35
+
+# 병렬 매칭 스레드 수 (1: 순차, 0: CPU 코어 수)
+MATCH_WORKERS = int(os.environ.get("RUNNER_MATCH_WORKERS", "1"))
+# OpenCV 내부 스레드 수 (0: OpenCV 기본값). 한 호스트에 세션 여러 개면 세션당 코어 수로 제한
+CV_THREADS = int(os.environ.get("RUNNER_CV_THREADS", "0"))
+
+# 마지막 감지 위치 주변(ROI)을 먼저 탐색, 못 찾으면 전체 region 탐색
+ROI_TRACKING = True
+ROI_MARGIN = 40  # 이미지 좌표(px)
+
+# 화면 변화 게이팅: 해당 상태에서 탐색 영역이 그대로면 매칭 생략 (이전 결과 재사용)
+CHANGE_GATING = True
+CHANGE_GATING_STATES = ("S2_WATCHING_WAIT_POPUP1", "S4_WAIT_EXIT")
+CHANGE_SAMPLE_STEP = 8  # 이미지 px 블록 평균으로 축소
+CHANGE_PIXEL_THRESHOLD = 8  # 블록 평균 밝기 차 (0~255, 1px 선 하나가 지나가는 블록도 잡히도록 낮게)
+CHANGE_MAX_SKIPS = 20  # 연속 생략 상한 (이후 강제 재매칭)
+CHANGE_MAX_AGE = 2.0  # 마지막 매칭 이후 생략 상한(초, CLOCK 기준)
 
 # START 탐색 정책
 START_SEARCH_POLICY = "LEFT_ONLY"
@@ -39,9 +94,35 @@ S0_TIMEOUT = 10.0
 S2_TIMEOUT = 60.0
 S4_TIMEOUT = 60.0
 
+# 캡처 백엔드: pyautogui | mss(네이티브, 빠름) | replay(녹화 프레임 재생, REPLAY_SOURCE 필요)
+CAPTURE_BACKEND = os.environ.get("RUNNER_CAPTURE_BACKEND", "pyautogui")
+REPLAY_SOURCE = None
+REPLAY_LOOP = True
+REPLAY_FRAME_INTERVAL = 0.5  # frames.jsonl 이 없을 때 프레임 간격(초)
+
+# 백그라운드 캡처 스레드: tick 요청 간격에 맞춰 다음 프레임을 미리 캡처 (False 면 tick 마다 직접 캡처)
+CAPTURE_THREAD = False
+CAPTURE_BUFFER_SIZE = 3
+CAPTURE_INTERVAL = 0.0  # 캡처 간 최소 간격(초)
+CAPTURE_MAX_AGE = 0.25  # 미리 캡처한 프레임을 그대로 쓸 수 있는 최대 나이(초), 넘으면 다시 캡처
+
 # 감지 안정화
 REQUIRE_HITS = 2
-SCAN_INTERVAL = 0.3
+SCAN_INTERVAL = 0.3  # SCAN_INTERVALS 에 없는 상태 / ADAPTIVE_SCAN=False 일 때의 고정 간격
+
+# 적응형 스캔: 상태별 간격 + 첫 hit 직후 burst 확인 + 대기 상태 back-off
+ADAPTIVE_SCAN = True
+SCAN_INTERVALS = {
+    "S0_LIST_WAIT_START": 0.3,
+    "S2_WATCHING_WAIT_POPUP1": 0.3,
+    "S3_WAIT_POPUP2": 0.15,  # 곧 나타나는 팝업
+    "S4_WAIT_EXIT": 0.3,
+}
+SCAN_BURST_INTERVAL = 0.05  # 첫 hit 이후 확인 스캔 간격(초)
+SCAN_BACKOFF = 1.25  # 연속 miss 마다 간격 배수
+SCAN_BACKOFF_AFTER = 10  # back-off 시작 전 허용 miss 횟수
+SCAN_MAX_INTERVAL = 0.6
+SCAN_BACKOFF_STATES = ("S2_WATCHING_WAIT_POPUP1", "S4_WAIT_EXIT")
 
 # 좌표(전체화면 기준)
 BASE_WIDTH = 1920
@@ -55,72 +136,229 @@ SCROLL_WAIT = 1.0
 SCALE_X = 1.0
 SCALE_Y = 1.0
 
+# 실행 방식: "sync" (tick 루프) | "async" (asyncio: 캡처/매칭/입력은 executor)
+RUNNER_MODE = "sync"
+
+# 화면 분할 실행: 창 여러 개를 타일로 띄우고 영역마다 S0~S4 흐름을 따로 실행 (캡처는 흐름끼리 공유)
+# FLOW_TILES: 논리 좌표 (x, y, w, h) 목록 / FLOW_GRID: (열, 행) 균등 분할 / 둘 다 없으면 전체 화면 1개
+# 흐름이 2개 이상이면 RUNNER_MODE 와 관계없이 async 로 실행
+FLOW_TILES = []
+FLOW_GRID = None
+
+# 성능 계측 (capture/템플릿별 match/input/log 구간 히스토그램)
+# 호출마다 기록하지 않고 PERF_SUMMARY_INTERVAL 마다 요약(event_type: "perf")만 남김
+PERF_ENABLED = True
+PERF_SUMMARY_INTERVAL = 60.0  # 초
+# 템플릿별 매칭 점수 분포 (hit/miss, confidence 바로 아래 near miss)
+# perf 요약과 같은 주기로 실행 시작부터의 누적값을 "scores" 이벤트로 기록
+SCORE_STATS = True
+SCORE_NEAR_MISS = 0.05
+
 # JSON 로깅 설정
 JSON_LOG_ENABLED = True
-LOG_DIR = Path("logs")
+LOG_DIR = Path(os.environ.get("RUNNER_LOG_DIR", "logs"))
+# 세션 이름 (supervisor 가 지정, 로그 파일명 run_<시각>_<세션>.json)
+SESSION_ID = os.environ.get("RUNNER_SESSION", "")
 CURRENT_LOG_FILE = None
-LOG_BUFFER = []
+# 파일 쓰기는 전용 writer 스레드가 담당 (log() 는 큐에 넣기만 함)
+LOG_QUEUE_SIZE = 10000  # 가득 차면 일반 로그는 버리고 개수만 기록 (LOG_URGENT_EVENTS 는 기다려서 넣음)
+LOG_FLUSH_INTERVAL = 1.0  # 초
+LOG_FLUSH_SIZE = 100  # 쌓인 줄 수
+LOG_FORMAT = os.environ.get("RUNNER_LOG_FORMAT", "jsonl")  # jsonl | binary (.rlog, scripts/convert_log.py 로 변환)
+LOG_FSYNC = "urgent"  # none | urgent(LOG_URGENT_EVENTS 가 포함된 flush 만) | always(flush 마다)
+LOG_URGENT_EVENTS = ("error", "timeout", "shutdown")  # 곧바로 flush (장애 직전 로그 보존)
+LOG_WRITER = None
+
+# 시간/입력 장치 (오프라인 리플레이에서는 VirtualClock/RecordingInput 으로 교체)
+CLOCK = SystemClock()
+INPUT = None
+
+BACKEND = None
+CAPTURE = None
+FRAMES = None  # 캡처 스레드가 없을 때 흐름끼리 공유하는 프레임
+FLOWS = []
+
+# 매칭 엔진/통계는 main() 의 init_matching() 에서 실행마다 새로 생성
+# (import 만으로 매칭 스레드 풀을 띄우지 않음, main() 전의 log() 는 기록 없는 PERF 사용)
+PERF = PerfRecorder(enabled=False)
+PERF_LAST_SUMMARY = 0.0
+
+REGISTRY = None
+TRACKER = None
+GATE = None
+SCORES = None
+MATCHER = None
+
+
+def log_file_path(started: float) -> Path:
+  """started(epoch 초)에 시작한 실행의 로그 경로 (세션 ID, LOG_FORMAT 확장자 포함)"""
+  timestamp = datetime.fromtimestamp(started).strftime("%Y%m%d_%H%M%S")
+  suffix = f"_{SESSION_ID}" if SESSION_ID else ""
+  extension = binlog.SUFFIX if LOG_FORMAT == "binary" else ".json"
+  return LOG_DIR / f"run_{timestamp}{suffix}{extension}"
 
 
 def init_json_log():
-  """JSON 로그 파일 초기화"""
-  global CURRENT_LOG_FILE
+  """JSON 로그 파일 초기화 + writer 스레드 시작"""
+  global CURRENT_LOG_FILE, LOG_WRITER
   if not JSON_LOG_ENABLED:
     return
 
-  LOG_DIR.mkdir(exist_ok=True)
-  timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-  CURRENT_LOG_FILE = LOG_DIR / f"run_{timestamp}.json"
+  LOG_DIR.mkdir(parents=True, exist_ok=True)
+  CURRENT_LOG_FILE = log_file_path(CLOCK.time())
+  if LOG_WRITER is not None:
+    LOG_WRITER.close()
+  LOG_WRITER = LogWriter(
+    CURRENT_LOG_FILE, max_queue=LOG_QUEUE_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+    flush_size=LOG_FLUSH_SIZE, fsync=LOG_FSYNC, fmt=LOG_FORMAT,
+  )
   return CURRENT_LOG_FILE
 
 
 def log(msg: str, event_type: str = "log", details: dict = None):
   """콘솔에 출력하고 JSON으로도 저장"""
-  print(msg)
+  with PERF.span("log"):
+    print(msg)
+
+    if not JSON_LOG_ENABLED or LOG_WRITER is None:
+      return
 
-  if not JSON_LOG_ENABLED or CURRENT_LOG_FILE is None:
+    # timestamp 포맷/직렬화는 writer 스레드에서
+    LOG_WRITER.write(CLOCK.time(), msg, event_type, details, urgent=event_type in LOG_URGENT_EVENTS)
+
+
+def log_perf_summary(final: bool = False):
+  """perf 요약 기록 (final=True 면 실행 전체, 아니면 직전 요약 이후 구간). 점수 분포도 함께 기록"""
+  global PERF_LAST_SUMMARY
+  now = CLOCK.time()
+  interval = now - PERF_LAST_SUMMARY if PERF_LAST_SUMMARY else None
+  PERF_LAST_SUMMARY = now
+  log_score_summary(final)
+  if not PERF_ENABLED:
+    return
+  spans = PERF.total_summary() if final else PERF.window_summary()
+  if not spans:
     return
 
-  log_entry = {
-    "timestamp": datetime.now().isoformat(),
-    "message": msg,
-    "event_type": event_type,
-    "details": details or {}
-  }
-  LOG_BUFFER.append(log_entry)
+  tick = spans.get("tick") or {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0}
+  scope = "total" if final else "window"
+  msg = f"[PERF] {scope} ticks={tick['count']} p50={tick['p50_ms']:.1f}ms p95={tick['p95_ms']:.1f}ms"
+  log(msg, event_type="perf", details={
+    "scope": scope,
+    "interval": None if final else interval,
+    "spans": spans
+  })
 
-  # 100개마다 플러시
-  if len(LOG_BUFFER) >= 100:
-    flush_json_log()
+
+def log_score_summary(final: bool = False):
+  """템플릿별 매칭 점수 분포 기록 (실행 시작부터 누적)"""
+  if SCORES is None:
+    return
+  templates = SCORES.summary()
+  if not templates:
+    return
+
+  parts = []
+  for name, stats in templates.items():
+    best_miss = "-" if stats["best_miss"] is None else f"{stats['best_miss']:.2f}"
+    parts.append(f"{name} hit={stats['hits']}/{stats['count']} max={stats['max']:.2f} best_miss={best_miss}")
+  log(f"[SCORE] {' | '.join(parts)}", event_type="scores", details={
+    "final": final,
+    "templates": templates
+  })
+
+
+def end_tick(tick_started: float):
+  """tick 작업 시간 기록 + 주기 perf/점수 요약"""
+  PERF.record("tick", (time.perf_counter() - tick_started) * 1000)
+  if (PERF_ENABLED or SCORES is not None) and CLOCK.time() - PERF_LAST_SUMMARY >= PERF_SUMMARY_INTERVAL:
+    log_perf_summary()
 
 
-def flush_json_log():
-  """JSON 로그를 파일에 저장"""
-  global LOG_BUFFER
-  if not LOG_BUFFER or CURRENT_LOG_FILE is None:
+def flush_json_log(final: bool = False):
+  """
+  JSON 로그 flush 요청
+
+  final=True 면 실행 전체 perf 요약을 마지막으로 추가하고, 큐에 남은 로그를 모두 쓴 뒤 writer 를 닫음
+  """
+  global LOG_WRITER
+  if LOG_WRITER is None:
+    return
+  if not final:
+    LOG_WRITER.flush()
     return
 
-  try:
-    with open(CURRENT_LOG_FILE, "a") as f:
-      for entry in LOG_BUFFER:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-    LOG_BUFFER = []
-  except Exception as e:
-    print(f"[ERROR] Failed to write log: {e}", file=sys.stderr)
+  log_perf_summary(final=True)
+  writer = LOG_WRITER
+  stats = writer.stats()
+  if stats["dropped"]:
+    log(f"[LOG] dropped={stats['dropped']} (queue full)", event_type="log_writer", details=stats)
+  writer.close()
+  LOG_WRITER = None
+
+
+def handle_terminate(signum, frame):
+  """SIGTERM 도 Ctrl+C 와 같은 종료 경로로 (로그 drain 보장)"""
+  raise KeyboardInterrupt
+
+
+def install_signal_handlers():
+  if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGTERM"):
+    signal.signal(signal.SIGTERM, handle_terminate)
 
 
-def scaled_point():
-    cur_w, cur_h = pyautogui.size()
+def new_scheduler():
+    if not ADAPTIVE_SCAN:
+        return ScanScheduler(SCAN_INTERVAL)
+    return ScanScheduler(
+        SCAN_INTERVAL, intervals=SCAN_INTERVALS, burst=SCAN_BURST_INTERVAL, backoff=SCAN_BACKOFF,
+        max_interval=SCAN_MAX_INTERVAL, backoff_after=SCAN_BACKOFF_AFTER, backoff_states=SCAN_BACKOFF_STATES,
+    )
+
+
+class Flow:
+    """화면 한 영역(tile, 논리 좌표)에서 도는 S0~S4 흐름 하나 (tile=None 이면 전체 화면)"""
+
+    def __init__(self, name: str = "", tile=None):
+        self.name = name
+        self.tile = tile
+        self.history = deque(maxlen=DEBUG_HISTORY_SIZE)
+        self.last_frame = 0.0  # 마지막으로 쓴 프레임 (캡처 시각 또는 공유 프레임 번호)
+        self.scheduler = new_scheduler()
+
+    def bounds(self):
+        if self.tile is not None:
+            return self.tile
+        w, h = INPUT.size()
+        return (0, 0, w, h)
+
+    def log(self, msg: str, event_type: str = "log", details: dict = None):
+        if not self.name:
+            log(msg, event_type=event_type, details=details)
+            return
+        details = dict(details or {})
+        details["flow"] = self.name
+        log(f"[{self.name}] {msg}", event_type=event_type, details=details)
+
+
+def flow_log(flow, msg: str, event_type: str = "log", details: dict = None):
+    if flow is None:
+        log(msg, event_type=event_type, details=details)
+    else:
+        flow.log(msg, event_type=event_type, details=details)
+
+
+def scaled_point(flow=None):
+    x, y, w, h = flow.bounds() if flow is not None else (0, 0) + tuple(INPUT.size())
     rx = BASE_X / BASE_WIDTH
     ry = BASE_Y / BASE_HEIGHT
-    return int(cur_w * rx), int(cur_h * ry)
+    return x + int(w * rx), y + int(h * ry)
 
 
 def detect_display_scale():
     global SCALE_X, SCALE_Y
-    sw, sh = pyautogui.size()
-    shot = pyautogui.screenshot()
-    iw, ih = shot.size
+    sw, sh = INPUT.size()
+    ih, iw = grab_frame().shape[:2]
     if sw > 0 and sh > 0:
         SCALE_X = iw / sw
         SCALE_Y = ih / sh
@@ -153,8 +391,12 @@ def to_logical_point(x: int, y: int):
     return lx, ly
 
 
+def box_center(box):
+    return box.left + int(box.width / 2), box.top + int(box.height / 2)
+
+
 def center_points(box):
-    cx_img, cy_img = pyautogui.center(box)
+    cx_img, cy_img = box_center(box)
     cx, cy = to_logical_point(int(cx_img), int(cy_img))
     return int(cx_img), int(cy_img), cx, cy
 
@@ -163,12 +405,12 @@ def box_to_tuple(box):
     return int(box.left), int(box.top), int(box.width), int(box.height)
 
 
-def log_start_event(box, hits: int):
+def log_start_event(box, hits: int, flow=None):
     _, _, cx, cy = center_points(box)
     left, top, w, h = box_to_tuple(box)
     cx_img, cy_img, cx_log, cy_log = center_points(box)
     msg = f"[S0] START hit {hits}/{REQUIRE_HITS} at ({cx_log},{cy_log})"
-    log(msg, event_type="detection", details={
+    flow_log(flow, msg, event_type="detection", details={
         "template": "START",
         "box": (left, top, w, h),
         "center_image": (cx_img, cy_img),
@@ -178,13 +420,13 @@ def log_start_event(box, hits: int):
     })
 
 
-def print_start_history(history):
+def print_start_history(history, flow=None):
     if not history:
-        log("[DEBUG] START history empty")
+        flow_log(flow, "[DEBUG] START history empty")
         return
-    log("[DEBUG] START recent detections:")
+    flow_log(flow, "[DEBUG] START recent detections:")
     for idx, item in enumerate(history, 1):
-        log(f"  {idx}. center={item['center_logical']} box={item['box']}")
+        flow_log(flow, f"  {idx}. center={item['center_logical']} box={item['box']}")
 
 
 def record_start_history(history, box):
@@ -192,255 +434,449 @@ def record_start_history(history, box):
     history.append({"center_logical": (cx, cy), "box": box_to_tuple(box)})
 
 
-def click_scaled(label: str):
-    x, y = scaled_point()
+def click_scaled(label: str, flow=None):
+    x, y = scaled_point(flow)
     msg = f"[CLICK] {label} ({x},{y})"
-    log(msg, event_type="click", details={
+    flow_log(flow, msg, event_type="click", details={
         "label": label,
         "position": (x, y),
         "method": "scaled"
     })
-    pyautogui.moveTo(x, y, duration=0.15)
-    pyautogui.click()
+    with PERF.span("input"):
+        INPUT.move_to(x, y, duration=0.15)
+        INPUT.click()
 
 
-def click_center(box, label: str):
+def click_center(box, label: str, flow=None):
     _, _, cx, cy = center_points(box)
     msg = f"[CLICK] {label} ({cx},{cy})"
-    log(msg, event_type="click", details={
+    flow_log(flow, msg, event_type="click", details={
         "label": label,
         "position": (cx, cy),
         "method": "center",
         "box": box_to_tuple(box)
     })
-    pyautogui.moveTo(cx, cy, duration=0.15)
-    pyautogui.click()
+    with PERF.span("input"):
+        INPUT.move_to(cx, cy, duration=0.15)
+        INPUT.click()
 
 
-def locate(path: str, region=None, confidence: float = CONFIDENCE):
+def press_key(key: str):
+    with PERF.span("input"):
+        INPUT.press(key)
+
+
+def template_scale():
+    if not TEMPLATE_SCALE:
+        return 1.0
+    return SCALE_X / TEMPLATE_SCALE
+
+
+def load_calibration():
+    """CALIBRATION_FILE 의 템플릿별 confidence / 축소 배율 적용 (파일이 없으면 상수 그대로)"""
+    global CALIBRATION
+    if not CALIBRATION_FILE.exists():
+        return
     try:
-        return pyautogui.locateOnScreen(
-            path, confidence=confidence, region=to_image_region(region)
-        )
-    except (pyautogui.ImageNotFoundException, pyscreeze.ImageNotFoundException):
-        return None
+        with open(CALIBRATION_FILE, "r") as f:
+            CALIBRATION = json.load(f).get("templates", {})
+    except (OSError, ValueError) as e:
+        log(f"[WARN] calibration load failed: {e}")
+        return
+
+    MATCHER.pyramid_scales = {
+        name: entry["pyramid_scale"] for name, entry in CALIBRATION.items() if entry.get("pyramid_scale")
+    }
+    confidences = {name: entry.get("confidence") for name, entry in CALIBRATION.items()}
+    log(f"[INIT] calibration {CALIBRATION_FILE} confidence={confidences}", event_type="init", details={
+        "calibration_file": str(CALIBRATION_FILE),
+        "confidence": confidences,
+        "pyramid_scales": MATCHER.pyramid_scales
+    })
+
+
+def template_confidence(name: str) -> float:
+    """템플릿 confidence (calibration 값이 있으면 우선)"""
+    calibrated = CALIBRATION.get(name, {}).get("confidence")
+    if calibrated is not None:
+        return calibrated
+    return PLAYER_CONFIDENCE if name == "PLAYER" else CONFIDENCE
+
+
+def load_templates():
+    """모든 템플릿을 현재 배율에 맞게 미리 로드 (없는 파일은 건너뜀)"""
+    started = time.perf_counter()
+    scale = template_scale()
+    pyramid = MATCH_MODE == "PYRAMID"
+    loaded = [
+        name for name, path in TEMPLATES.items()
+        if REGISTRY.load(name, path, scales=(scale,), pyramid=(MATCHER.scale_for(name),) if pyramid else ())
+    ]
+    missing = [name for name in TEMPLATES if name not in loaded]
+    log(f"[INIT] templates loaded={loaded} missing={missing} scale={scale:.3f}", event_type="init", details={
+        "loaded": loaded,
+        "missing": missing,
+        "template_scale": scale,
+        "match_mode": MATCH_MODE,
+        "elapsed": time.perf_counter() - started
+    })
+
+
+def init_matching():
+    """템플릿 레지스트리, 매칭 엔진(스레드 풀 포함)과 통계 객체 생성 (main() 의 finally 에서 close)"""
+    global PERF, REGISTRY, TRACKER, GATE, SCORES, MATCHER
+    PERF = PerfRecorder(enabled=PERF_ENABLED)
+    REGISTRY = TemplateRegistry()
+    TRACKER = LocationTracker(margin=ROI_MARGIN) if ROI_TRACKING else None
+    GATE = ChangeDetector(
+        step=CHANGE_SAMPLE_STEP, pixel_threshold=CHANGE_PIXEL_THRESHOLD, max_skips=CHANGE_MAX_SKIPS,
+        max_age=CHANGE_MAX_AGE, clock=CLOCK,
+    ) if CHANGE_GATING else None
+    SCORES = ScoreStats(near=SCORE_NEAR_MISS) if SCORE_STATS else None
+    MATCHER = Matcher(
+        MATCH_MODE, pyramid_scale=PYRAMID_SCALE, pyramid_margin=PYRAMID_MARGIN,
+        tracker=TRACKER, gate=GATE, workers=MATCH_WORKERS,
+        perf=PERF if PERF_ENABLED else None, scores=SCORES,
+    )
+
+
+def close_matching():
+    global MATCHER
+    if MATCHER is not None:
+        MATCHER.close()
+        MATCHER = None
+
+
+def grab_frame():
+    """현재 화면 1프레임 캡처 (BGR ndarray)"""
+    return BACKEND.grab()
+
+
+def init_backend():
+    global BACKEND
+    BACKEND = get_backend(
+        CAPTURE_BACKEND, source=REPLAY_SOURCE, clock=CLOCK, loop=REPLAY_LOOP,
+        frame_interval=REPLAY_FRAME_INTERVAL,
+    )
+    log(f"[INIT] capture backend={BACKEND.name}", event_type="init", details={
+        "capture_backend": BACKEND.name
+    })
+
+
+def start_capture():
+    global CAPTURE, FRAMES
+    if not CAPTURE_THREAD:
+        FRAMES = SharedFrame(grab_frame)
+        return
+    CAPTURE = CaptureThread(
+        grab_frame, capacity=CAPTURE_BUFFER_SIZE, interval=CAPTURE_INTERVAL, clock=CLOCK,
+        max_age=CAPTURE_MAX_AGE,
+    ).start()
+
+
+def stop_capture():
+    global CAPTURE, FRAMES
+    if FRAMES is not None:
+        log(f"[CAPTURE] shared frames={FRAMES.captured}", event_type="capture", details={
+            "frames": FRAMES.captured
+        })
+        FRAMES = None
+    if CAPTURE is None:
+        return
+    CAPTURE.stop()
+    log(f"[CAPTURE] stopped (frames={CAPTURE.captured} prefetched={CAPTURE.prefetched})", event_type="capture",
+        details={
+            "frames": CAPTURE.captured,
+            "prefetched": CAPTURE.prefetched
+        })
+    CAPTURE = None
+
+
+def next_frame(flow=None):
+    """
+    매칭용 프레임 (흐름마다 직전에 쓴 프레임 이후의 것)
+    - 캡처 스레드: 최신 프레임을 흐름끼리 공유
+    - 공유 프레임: 다른 흐름이 캡처한 프레임을 아직 안 썼으면 그대로, 아니면 새로 캡처
+    """
+    seen = flow.last_frame if flow is not None else 0.0
+    with PERF.span("capture"):
+        if CAPTURE is not None:
+            seen, frame = CAPTURE.get(newer_than=seen)
+        elif FRAMES is not None:
+            seen, frame = FRAMES.get(seen)
+        else:
+            return grab_frame()
+    if flow is not None:
+        flow.last_frame = seen
+    return frame
+
+
+def locate(name: str, region=None, confidence: float = None, frame=None, flow=None):
+    if frame is None:
+        frame = next_frame(flow)
+    if confidence is None:
+        confidence = template_confidence(name)
+    template = REGISTRY.get(name, template_scale())
+    return MATCHER.locate(frame, template, region=to_image_region(region), confidence=confidence)
+
+
+def template_spec(name: str, flow=None):
+    if name == "START":
+        region = resolve_start_region(flow)
+    else:
+        region = flow.tile if flow is not None else None
+    return REGISTRY.get(name, template_scale()), to_image_region(region), template_confidence(name)
+
+
+def match_specs(frame, specs, gated: bool = False):
+    """한 프레임에서 상태의 템플릿 spec 들을 한꺼번에 매칭"""
+    results = MATCHER.scan_results(frame, specs, gated=gated)
+    found = {name: result.found for name, result in results.items()}
+    if DEBUG_MODE and not SIMPLE_LOG:
+        visible = [name for name, box in found.items() if box]
+        scores = {name: round(result.score, 3) for name, result in results.items()}
+        log(f"[SCAN] visible={visible} scores={scores}", details={"scores": scores})
+    return found
+
+
+def log_tracker_stats():
+    if TRACKER is None:
+        return
+    stats = TRACKER.stats()
+    msg = f"[TRACK] roi hit={stats['roi_hits']} miss={stats['roi_misses']} ratio={stats['roi_hit_ratio']:.2f}"
+    log(msg, event_type="tracker", details=stats)
+
+
+def log_gating_stats():
+    if GATE is None:
+        return
+    stats = GATE.stats()
+    msg = f"[GATE] skip {stats['skips']}/{stats['checks']} ratio={stats['skip_ratio']:.2f}"
+    log(msg, event_type="gating", details=stats)
+
 
+def log_scheduler_stats():
+    for flow in FLOWS:
+        stats = flow.scheduler.stats()
+        msg = f"[SCHED] ticks={stats['ticks']} bursts={stats['bursts']} mean={stats['mean_interval']:.2f}s"
+        flow.log(msg, event_type="scheduler", details=stats)
 
-def left_half_region():
-    w, h = pyautogui.size()
-    return (0, 0, w // 2, h)
 
+def left_half_region(flow=None):
+    x, y, w, h = flow.bounds() if flow is not None else (0, 0) + tuple(INPUT.size())
+    return (x, y, w // 2, h)
 
-def resolve_start_region():
+
+def resolve_start_region(flow=None):
     if START_SEARCH_POLICY == "LEFT_ONLY":
-        return left_half_region()
+        return left_half_region(flow)
     log(f"[WARN] unknown policy={START_SEARCH_POLICY}, fallback LEFT_ONLY")
-    return left_half_region()
+    return left_half_region(flow)
 
 
-def should_abort_state(state_entered_at: float, timeout_sec: float, state: str, target: str):
-    elapsed = time.time() - state_entered_at
-    if elapsed < timeout_sec:
-        return False
-    log(
-        f"[ERROR] {state} timeout {elapsed:.1f}s: '{target}' not found -> exit",
-        event_type="error",
-        details={
-            "state": state,
-            "target": target,
-            "elapsed": elapsed,
-            "timeout": timeout_sec,
-        },
-    )
-    return True
+def on_start_hit(flow, box, hits: int):
+    log_start_event(box, hits, flow)
+    record_start_history(flow.history, box)
+
+
+def recover_start(flow):
+    """사전 확인에서 START 를 못 찾으면 End 로 목록 끝으로 이동 후 다시 확인"""
+    flow.log(f"[S0] START not found -> End (after {START_PRECHECK_TRIES} checks)")
+    if flow.tile is not None:
+        # 키 입력이 이 타일의 창으로 가도록 먼저 포커스
+        click_scaled("LIST_FOCUS", flow)
+    press_key("end")
+    CLOCK.sleep(SCROLL_WAIT)
+
+    box = locate("START", region=resolve_start_region(flow), flow=flow)
+    if not box:
+        flow.log("[S0] still not found after End")
+        if DEBUG_MODE and not SIMPLE_LOG:
+            print_start_history(flow.history, flow)
+    return box
+
+
+def click_start(flow, box, found):
+    click_center(box, "START", flow)
+
+
+def focus_player(flow, box, found):
+    if S1_CLICK_MODE == "TEMPLATE":
+        box_player = found.get("PLAYER")
+        if box_player:
+            click_center(box_player, "PLAYER(template)", flow)
+        else:
+            flow.log("[S1] PLAYER template miss -> fixed click")
+            click_scaled("PLAYER(fixed)", flow)
+    else:
+        click_scaled("PLAYER(fixed)", flow)
+
+
+def enter_action(label: str, template: str, flow):
+    def action(box, found):
+        flow.log(f"[{label}] {template} -> Enter", event_type="detection", details={
+            "template": template
+        })
+        if flow.tile is not None:
+            # 키 입력이 이 타일의 창으로 가도록 팝업을 눌러 포커스
+            click_center(box, f"{template}(focus)", flow)
+        press_key("enter")
+    return action
+
+
+def exit_to_list(flow, box, found):
+    click_center(box, "EXIT", flow)
+    click_scaled("LIST_FOCUS", flow)
+
+
+def build_states(flow):
+    """S0~S4 흐름 선언 (템플릿 로드 이후 호출)"""
+    extra = tuple(REGISTRY.names()) if SCAN_ALL_TEMPLATES else ()
+    player = ("PLAYER",) if S1_CLICK_MODE == "TEMPLATE" else ()
+    states = [
+        State(
+            "S0_LIST_WAIT_START", target="START", templates=extra, require_hits=REQUIRE_HITS,
+            retries=START_PRECHECK_TRIES, on_hit=partial(on_start_hit, flow),
+            on_miss=partial(recover_start, flow), action=partial(click_start, flow),
+            next_state="S1_PLAYER_FOCUS", cooldown=CLICK_COOLDOWN, timeout=S0_TIMEOUT,
+        ),
+        State(
+            "S1_PLAYER_FOCUS", templates=player + extra, action=partial(focus_player, flow),
+            next_state="S2_WATCHING_WAIT_POPUP1", cooldown=CLICK_COOLDOWN,
+        ),
+        State(
+            "S2_WATCHING_WAIT_POPUP1", target="POPUP1", templates=extra, require_hits=REQUIRE_HITS,
+            action=enter_action("S2", "POPUP1", flow), next_state="S3_WAIT_POPUP2",
+            cooldown=ENTER_COOLDOWN, timeout=S2_TIMEOUT,
+        ),
+        State(
+            "S3_WAIT_POPUP2", target="POPUP2", templates=extra, require_hits=REQUIRE_HITS,
+            action=enter_action("S3", "POPUP2", flow), next_state="S4_WAIT_EXIT",
+            cooldown=ENTER_COOLDOWN, timeout=S3_TIMEOUT, timeout_next="S4_WAIT_EXIT",
+        ),
+        State(
+            "S4_WAIT_EXIT", target="EXIT", templates=extra, require_hits=REQUIRE_HITS,
+            action=partial(exit_to_list, flow), next_state="S0_LIST_WAIT_START",
+            cooldown=CLICK_COOLDOWN, timeout=S4_TIMEOUT,
+        ),
+    ]
+    for state in states:
+        state.gated = state.name in CHANGE_GATING_STATES
+    return states
+
+
+def flow_tiles():
+    """FLOW_TILES / FLOW_GRID -> 타일 목록 (논리 좌표, 비어 있으면 전체 화면 1개)"""
+    if FLOW_TILES:
+        return [tuple(tile) for tile in FLOW_TILES]
+    if FLOW_GRID:
+        cols, rows = FLOW_GRID
+        w, h = INPUT.size()
+        tw, th = w // cols, h // rows
+        return [(c * tw, r * th, tw, th) for r in range(rows) for c in range(cols)]
+    return []
+
+
+def build_flows():
+    tiles = flow_tiles()
+    if not tiles:
+        return [Flow()]
+    flows = [Flow(f"F{i + 1}", tile) for i, tile in enumerate(tiles)]
+    log(f"[INIT] flows={len(flows)} tiles={tiles}", event_type="init", details={
+        "flows": [flow.name for flow in flows],
+        "tiles": tiles
+    })
+    return flows
+
+
+def build_machine(flow, input_executor=None):
+    if RUNNER_MODE not in ("sync", "async"):
+        raise ValueError(f"unknown RUNNER_MODE: {RUNNER_MODE}")
+    kwargs = {
+        "next_frame": partial(next_frame, flow), "match": match_specs, "clock": CLOCK,
+        "log": flow.log, "scheduler": flow.scheduler, "on_tick": end_tick,
+        "verbose": DEBUG_MODE and not SIMPLE_LOG,
+    }
+    if RUNNER_MODE == "async" or len(FLOWS) > 1:
+        machine = AsyncStateMachine(
+            build_states(flow), "S0_LIST_WAIT_START", input_executor=input_executor, **kwargs
+        )
+    else:
+        machine = StateMachine(build_states(flow), "S0_LIST_WAIT_START", **kwargs)
+    machine.prepare(partial(template_spec, flow=flow))
+    return machine
+
+
+async def run_async(flows):
+    """
+    흐름별 상태 머신 실행
+
+    흐름이 여러 개면 입력 스레드 1개를 공유해서 마우스/키 동작이 서로 끼어들지 않게 합니다.
+    """
+    input_executor = None
+    if len(flows) > 1:
+        input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="input")
+    machines = [build_machine(flow, input_executor) for flow in flows]
+
+    try:
+        return await asyncio.gather(*(machine.run_async() for machine in machines))
+    finally:
+        if input_executor is not None:
+            input_executor.shutdown(wait=True)
 
 
 def main():
+    global INPUT, PERF_LAST_SUMMARY, FLOWS
+    if INPUT is None:
+        INPUT = PyAutoGUIInput()
+    init_matching()
     init_json_log()
-    pyautogui.FAILSAFE = True
-    log("3초 후 runner 시작", event_type="init")
-    time.sleep(3)
+    install_signal_handlers()
+    if CV_THREADS:
+        cv2.setNumThreads(CV_THREADS)
+    INPUT.enable_failsafe()
+    log("3초 후 runner 시작", event_type="init", details={
+        "session": SESSION_ID,
+        "display": os.environ.get("DISPLAY"),
+        "pid": os.getpid()
+    })
+    CLOCK.sleep(3)
+    init_backend()
     detect_display_scale()
-
-    cooldown_until = 0.0
-    start_history = deque(maxlen=DEBUG_HISTORY_SIZE)
-    s3_entered_at = None
-    state_entered_at = time.time()
-
-    hits = {"POPUP1": 0, "POPUP2": 0, "EXIT": 0, "START": 0}
-    state = "S0_LIST_WAIT_START"
+    load_calibration()
+    load_templates()
+    start_capture()
+    PERF_LAST_SUMMARY = CLOCK.time()
 
     try:
-        while True:
-            now = time.time()
-            if now < cooldown_until:
-                time.sleep(SCAN_INTERVAL)
-                continue
-
-            if state == "S0_LIST_WAIT_START":
-                start_region = resolve_start_region()
-                box_start = None
-
-                for attempt in range(1, START_PRECHECK_TRIES + 1):
-                    box_start = locate(IMG_START, region=start_region)
-                    if box_start:
-                        hits["START"] += 1
-                        log_start_event(box_start, hits["START"])
-                        record_start_history(start_history, box_start)
-                        break
-                    hits["START"] = 0
-                    if DEBUG_MODE and not SIMPLE_LOG:
-                        log(f"[S0] precheck miss {attempt}/{START_PRECHECK_TRIES}")
-                    time.sleep(SCAN_INTERVAL)
-
-                if box_start and hits["START"] >= REQUIRE_HITS:
-                    click_center(box_start, "START")
-                    cooldown_until = time.time() + CLICK_COOLDOWN
-                    for k in hits:
-                        hits[k] = 0
-                    state = "S1_PLAYER_FOCUS"
-                    state_entered_at = time.time()
-                    log("[STATE] S0 -> S1", event_type="state_transition", details={
-                        "from": "S0_LIST_WAIT_START",
-                        "to": "S1_PLAYER_FOCUS"
-                    })
-                    time.sleep(SCAN_INTERVAL)
-                    continue
-
-                if not box_start:
-                    log(f"[S0] START not found -> End (after {START_PRECHECK_TRIES} checks)")
-                    pyautogui.press("end")
-                    time.sleep(SCROLL_WAIT)
-
-                    box_start2 = locate(IMG_START, region=start_region)
-                    if box_start2:
-                        hits["START"] = 1
-                        log_start_event(box_start2, hits["START"])
-                        record_start_history(start_history, box_start2)
-                    else:
-                        log("[S0] still not found after End")
-                        if DEBUG_MODE and not SIMPLE_LOG:
-                            print_start_history(start_history)
-
-                if should_abort_state(state_entered_at, S0_TIMEOUT, state, "START"):
-                    return
-
-            elif state == "S1_PLAYER_FOCUS":
-                if S1_CLICK_MODE == "TEMPLATE":
-                    box_player = locate(IMG_PLAYER, region=None, confidence=PLAYER_CONFIDENCE)
-                    if box_player:
-                        click_center(box_player, "PLAYER(template)")
-                    else:
-                        log("[S1] PLAYER template miss -> fixed click")
-                        click_scaled("PLAYER(fixed)")
-                else:
-                    click_scaled("PLAYER(fixed)")
-
-                cooldown_until = time.time() + CLICK_COOLDOWN
-                for k in hits:
-                    hits[k] = 0
-                state = "S2_WATCHING_WAIT_POPUP1"
-                state_entered_at = time.time()
-                log("[STATE] S1 -> S2", event_type="state_transition", details={
-                    "from": "S1_PLAYER_FOCUS",
-                    "to": "S2_WATCHING_WAIT_POPUP1"
-                })
-
-            elif state == "S2_WATCHING_WAIT_POPUP1":
-                if locate(IMG_POPUP1):
-                    hits["POPUP1"] += 1
-                else:
-                    hits["POPUP1"] = 0
-
-                if hits["POPUP1"] >= REQUIRE_HITS:
-                    log("[S2] POPUP1 -> Enter", event_type="detection", details={
-                        "template": "POPUP1"
-                    })
-                    pyautogui.press("enter")
-                    cooldown_until = time.time() + ENTER_COOLDOWN
-                    for k in hits:
-                        hits[k] = 0
-                    state = "S3_WAIT_POPUP2"
-                    s3_entered_at = time.time()
-                    state_entered_at = time.time()
-                    log("[STATE] S2 -> S3", event_type="state_transition", details={
-                        "from": "S2_WATCHING_WAIT_POPUP1",
-                        "to": "S3_WAIT_POPUP2"
-                    })
-                elif should_abort_state(state_entered_at, S2_TIMEOUT, state, "POPUP1"):
-                    return
-
-            elif state == "S3_WAIT_POPUP2":
-                if locate(IMG_POPUP2):
-                    hits["POPUP2"] += 1
-                else:
-                    hits["POPUP2"] = 0
-
-                if hits["POPUP2"] >= REQUIRE_HITS:
-                    log("[S3] POPUP2 -> Enter", event_type="detection", details={
-                        "template": "POPUP2"
-                    })
-                    pyautogui.press("enter")
-                    cooldown_until = time.time() + ENTER_COOLDOWN
-                    for k in hits:
-                        hits[k] = 0
-                    state = "S4_WAIT_EXIT"
-                    s3_entered_at = None
-                    state_entered_at = time.time()
-                    log("[STATE] S3 -> S4", event_type="state_transition", details={
-                        "from": "S3_WAIT_POPUP2",
-                        "to": "S4_WAIT_EXIT"
-                    })
-                elif s3_entered_at and (time.time() - s3_entered_at) >= S3_TIMEOUT:
-                    msg = f"[S3] POPUP2 timeout {S3_TIMEOUT:.0f}s -> skip to S4"
-                    log(msg, event_type="timeout", details={
-                        "timeout_duration": S3_TIMEOUT,
-                        "elapsed": time.time() - s3_entered_at
-                    })
-                    hits["POPUP2"] = 0
-                    state = "S4_WAIT_EXIT"
-                    s3_entered_at = None
-                    state_entered_at = time.time()
-                    log("[STATE] S3 -> S4 (skip)", event_type="state_transition", details={
-                        "from": "S3_WAIT_POPUP2",
-                        "to": "S4_WAIT_EXIT",
-                        "reason": "timeout"
-                    })
-
-            elif state == "S4_WAIT_EXIT":
-                box_exit = locate(IMG_EXIT)
-                if box_exit:
-                    hits["EXIT"] += 1
-                else:
-                    hits["EXIT"] = 0
-
-                if hits["EXIT"] >= REQUIRE_HITS:
-                    click_center(box_exit, "EXIT")
-                    cooldown_until = time.time() + CLICK_COOLDOWN
-                    click_scaled("LIST_FOCUS")
-                    cooldown_until = time.time() + CLICK_COOLDOWN
-                    for k in hits:
-                        hits[k] = 0
-                    state = "S0_LIST_WAIT_START"
-                    state_entered_at = time.time()
-                    log("[STATE] S4 -> S0", event_type="state_transition", details={
-                        "from": "S4_WAIT_EXIT",
-                        "to": "S0_LIST_WAIT_START"
-                    })
-                elif should_abort_state(state_entered_at, S4_TIMEOUT, state, "EXIT"):
-                    return
-
-            else:
-                log(f"[ERROR] Unknown state: {state}")
-                return
-
-            time.sleep(SCAN_INTERVAL)
+        FLOWS = build_flows()
+        if RUNNER_MODE == "async" or len(FLOWS) > 1:
+            asyncio.run(run_async(FLOWS))
+        else:
+            build_machine(FLOWS[0]).run()
 
     except KeyboardInterrupt:
         log("\nStopped (Ctrl+C)", event_type="shutdown")
-        flush_json_log()
+    except EOFError:
+        # 녹화 프레임 재생이 끝남 (replay 백엔드, REPLAY_LOOP=False)
+        log("[CAPTURE] frame source ended", event_type="shutdown")
+        raise
+    except Exception as e:
+        # 예외로 죽어도 원인은 로그에 남김 (urgent 이벤트라 곧바로 flush)
+        log(f"[ERROR] runner crashed: {e!r}", event_type="error", details={
+            "exception": type(e).__name__,
+            "traceback": traceback.format_exc()
+        })
+        raise
     finally:
-        flush_json_log()
+        stop_capture()
+        close_matching()
+        if BACKEND is not None:
+            BACKEND.close()
+        log_tracker_stats()
+        log_gating_stats()
+        log_scheduler_stats()
+        flush_json_log(final=True)
         if CURRENT_LOG_FILE and JSON_LOG_ENABLED:
             print(f"\n[LOG] JSON log saved to: {CURRENT_LOG_FILE}")
 
@@ -0,0 +1,71 @@
+"""
+적응형 스캔 스케줄러
+
+고정 SCAN_INTERVAL 대신 tick 마다 다음 스캔까지 쉴 시간을 정합니다.
+- 상태별 기본 간격 (곧 나타날 팝업은 자주, 오래 기다리는 화면은 드물게)
+- 첫 감지 직후 burst: REQUIRE_HITS 확인을 짧은 간격으로 빠르게 끝냄
+- back-off: 연속으로 아무것도 없으면 간격을 max_interval 까지 늘림
+"""
+
+
+class ScanScheduler:
+    """상태별 스캔 간격 결정 (burst / back-off)"""
+
+    def __init__(self, base: float = 0.3, intervals: dict = None, burst: float = None,
+                 backoff: float = 1.0, max_interval: float = None, backoff_after: int = 0,
+                 backoff_states=None):
+        self.base = base
+        self.intervals = dict(intervals or {})
+        self.burst = burst
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.backoff_after = backoff_after
+        # None 이면 모든 상태에서 back-off
+        self.backoff_states = None if backoff_states is None else set(backoff_states)
+        self.state = None
+        self.misses = 0
+        self.current = None
+        self.ticks = 0
+        self.bursts = 0
+        self.total_delay = 0.0
+
+    def interval(self, state: str) -> float:
+        """상태의 기본 스캔 간격"""
+        return self.intervals.get(state, self.base)
+
+    def next_delay(self, state: str, pending: bool = False) -> float:
+        """
+        이번 tick 이후 쉴 시간
+
+        pending: 감지 확인 중 (첫 hit 이후 REQUIRE_HITS 미달)
+        """
+        if state != self.state:
+            self.state = state
+            self.misses = 0
+            self.current = None
+
+        delay = self.interval(state)
+        if pending and self.burst is not None:
+            self.misses = 0
+            self.current = None
+            self.bursts += 1
+            delay = min(delay, self.burst)
+        elif not pending:
+            self.misses += 1
+            if self.backoff > 1.0 and self.misses > self.backoff_after and (
+                    self.backoff_states is None or state in self.backoff_states):
+                grown = (self.current or delay) * self.backoff
+                if self.max_interval is not None:
+                    grown = min(grown, max(self.max_interval, delay))
+                self.current = delay = grown
+
+        self.ticks += 1
+        self.total_delay += delay
+        return delay
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "bursts": self.bursts,
+            "mean_interval": self.total_delay / self.ticks if self.ticks else 0.0,
+        }
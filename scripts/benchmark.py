@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+템플릿 매칭 벤치마크
+
+runner 의 감지 경로를 단계별로 따로 측정합니다.
+- capture: 캡처 백엔드 1프레임 (기본: replay 백엔드의 PNG 디코드, --capture-backend 로 실제 화면)
+- decode: 템플릿 PNG 디코드+전처리 / 레지스트리 로드 (배율 + PYRAMID 축소본 포함)
+- match: 템플릿 x region(전체/왼쪽 절반) x 배율(1x/2x) x 매칭 모드 x confidence
+- box: Box -> 중심/논리 좌표 변환
+- parallel: 순차 vs 병렬 매칭 (1080p / 1440p Retina / 4K)
+
+합성 프레임과 녹화 프레임(--frames) 모두 사용하며, 케이스마다 p50/p95/p99(ms)와
+tracemalloc 기준 할당량(peak KB)을 출력하고 결과를 JSON 으로 저장합니다.
+(--compare 로 이전 결과와 p50 비교)
+
+사용법:
+  python scripts/benchmark.py [--sections match,box] [--frames DIR] [--repeat 20]
+                              [--out bench/result.json] [--compare bench/old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import runner  # noqa: E402
+from capture import get_backend  # noqa: E402
+from detection import FramePyramid, Matcher  # noqa: E402
+from pyscreeze import Box  # noqa: E402
+from templates import Template, TemplateRegistry, preprocess  # noqa: E402
+
+SECTIONS = ("capture", "decode", "match", "box", "parallel")
+
+RESOLUTIONS = {
+  "1080p": (1920, 1080),
+  "1440p-retina": (2560, 1440),
+  "4k": (3840, 2160),
+}
+
+# match 섹션용 논리 화면 (로그 기준 1920x1243) 과 배율
+SCREEN_SIZE = (1920, 1243)
+SCALES = (1.0, 2.0)
+CONFIDENCES = (0.88,)
+MATCH_MODES = ("FULL", "PYRAMID")
+
+TEMPLATE_SPECS = {
+  "START": ((200, 70), (60, 120, 220), "START"),
+  "POPUP1": ((420, 160), (245, 245, 245), "Continue?"),
+  "POPUP2": ((420, 160), (230, 240, 250), "Next lecture"),
+  "EXIT": ((120, 50), (40, 40, 200), "EXIT"),
+}
+
+
+def template_image(size, color, text: str) -> np.ndarray:
+  """단색 버튼 + 텍스트 템플릿 이미지"""
+  w, h = size
+  image = np.full((h, w, 3), color, np.uint8)
+  cv2.rectangle(image, (0, 0), (w - 1, h - 1), (90, 90, 90), 2)
+  cv2.putText(image, text, (12, h // 2 + 12), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+  return image
+
+
+def make_template(name: str, size, color, text: str, scale: float = 1.0) -> Template:
+  image = template_image(size, color, text)
+  return Template(name, f"<synthetic:{name}>", scale, *preprocess(image, scale))
+
+
+def make_templates(scale: float = 1.0):
+  return {name: make_template(name, *spec, scale=scale) for name, spec in TEMPLATE_SPECS.items()}
+
+
+def make_frame(width: int, height: int, templates, seed: int = 0) -> np.ndarray:
+  """강의 목록/플레이어 비슷한 합성 프레임 + START/EXIT 배치"""
+  rng = np.random.default_rng(seed)
+  frame = np.full((height, width, 3), 238, np.uint8)
+  for _ in range(width * height // 60000):
+    x, y = int(rng.integers(0, width - 320)), int(rng.integers(0, height - 110))
+    color = tuple(int(v) for v in rng.integers(0, 255, 3))
+    cv2.rectangle(frame, (x, y), (x + int(rng.integers(40, 320)), y + int(rng.integers(20, 110))), color, -1)
+    cv2.putText(frame, f"lecture {int(rng.integers(100))}", (x + 4, y + 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (30, 30, 30), 2)
+
+  for name in ("START", "EXIT"):
+    tpl = templates[name].bgr
+    th, tw = tpl.shape[:2]
+    x, y = int(rng.integers(0, width - tw)), int(rng.integers(0, height - th))
+    frame[y:y + th, x:x + tw] = tpl
+  return frame
+
+
+def percentile(sorted_samples, q: float) -> float:
+  """nearest-rank 백분위수"""
+  if not sorted_samples:
+    return 0.0
+  rank = max(1, int(round(q / 100.0 * len(sorted_samples))))
+  return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def measure(fn, repeat: int, warmup: int = 1):
+  """fn 실행 시간 분포(ms) + 1회 실행 할당량(KB)"""
+  for _ in range(warmup):
+    fn()
+
+  samples = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    fn()
+    samples.append((time.perf_counter() - started) * 1000)
+
+  tracemalloc.start()
+  fn()
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  samples.sort()
+  return {
+    "n": len(samples),
+    "p50_ms": percentile(samples, 50),
+    "p95_ms": percentile(samples, 95),
+    "p99_ms": percentile(samples, 99),
+    "mean_ms": statistics.fmean(samples) if samples else 0.0,
+    "alloc_peak_kb": peak / 1024,
+    "alloc_retained_kb": current / 1024,
+  }
+
+
+def load_recorded(frame_dir: Path):
+  """녹화 프레임 (PNG) -> [(이름, ndarray)]"""
+  frames = []
+  if frame_dir is None:
+    return frames
+  for path in sorted(frame_dir.glob("*.png")):
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is not None:
+      frames.append((f"recorded:{path.name}", image))
+  return frames
+
+
+def build_corpus(frame_dir: Path):
+  """(프레임 이름, 배율, 프레임, 템플릿 dict) 목록"""
+  corpus = []
+  for scale in SCALES:
+    templates = make_templates(scale)
+    w, h = int(SCREEN_SIZE[0] * scale), int(SCREEN_SIZE[1] * scale)
+    corpus.append((f"synthetic-{scale:g}x", scale, make_frame(w, h, templates), templates))
+
+  recorded = load_recorded(frame_dir)
+  if recorded:
+    # 녹화 프레임은 assets/ 템플릿으로 매칭 (배율은 프레임 폭 / 논리 폭)
+    registry = TemplateRegistry()
+    for name, path in runner.TEMPLATES.items():
+      registry.load(name, path)
+    templates = {name: registry.get(name) for name in registry.names()}
+    for name, frame in recorded:
+      corpus.append((name, frame.shape[1] / SCREEN_SIZE[0], frame, templates))
+  return corpus
+
+
+def bench_capture(args):
+  results = []
+  tmp = None
+  if args.capture_backend:
+    backend = get_backend(args.capture_backend)
+    label = args.capture_backend
+  else:
+    # 화면 없는 환경: 합성 프레임 PNG 를 replay 백엔드로 읽는 비용 (PNG 디코드 포함)
+    # 같은 프레임 연속 재생은 디코드를 생략하므로 서로 다른 프레임 2장을 번갈아 읽음
+    tmp = Path(tempfile.mkdtemp(prefix="bench_frames_"))
+    templates = make_templates(2.0)
+    for seed in range(2):
+      frame = make_frame(SCREEN_SIZE[0] * 2, SCREEN_SIZE[1] * 2, templates, seed=seed)
+      cv2.imwrite(str(tmp / f"frame_{seed}.png"), frame)
+    backend = get_backend("replay", source=tmp)
+    label = "replay-png"
+  try:
+    results.append({"case": label, **measure(backend.grab, args.repeat)})
+  finally:
+    backend.close()
+    if tmp is not None:
+      shutil.rmtree(tmp, ignore_errors=True)
+  return results
+
+
+def bench_decode(args):
+  """템플릿 로드: PNG 디코드+전처리 / 레지스트리 로드 (PYRAMID 축소본까지)"""
+  results = []
+  with tempfile.TemporaryDirectory(prefix="bench_templates_") as tmp:
+    for name, spec in TEMPLATE_SPECS.items():
+      path = Path(tmp) / f"IMG_{name}.png"
+      cv2.imwrite(str(path), template_image(*spec))
+
+      def load_png(path=path):
+        preprocess(cv2.imread(str(path), cv2.IMREAD_UNCHANGED), 2.0)
+
+      def load_registry(path=path, name=name):
+        TemplateRegistry().load(name, str(path), scales=(2.0,), pyramid=(0.5,))
+
+      results.append({"case": f"{name}:png", **measure(load_png, args.repeat)})
+      results.append({"case": f"{name}:registry", **measure(load_registry, args.repeat)})
+  return results
+
+
+def bench_match(args, corpus):
+  results = []
+  matchers = {mode: Matcher(mode) for mode in MATCH_MODES}
+  for frame_name, scale, frame, templates in corpus:
+    fh, fw = frame.shape[:2]
+    regions = {"full": None, "left_half": (0, 0, fw // 2, fh)}
+    for name, template in templates.items():
+      for region_name, region in regions.items():
+        for mode, matcher in matchers.items():
+          for confidence in args.confidences:
+            def run(matcher=matcher, template=template, region=region, confidence=confidence):
+              # PYRAMID 는 프레임 축소본을 캐시하므로 매번 비워서 축소 비용까지 포함
+              matcher.pyramid = FramePyramid()
+              matcher.locate(frame, template, region=region, confidence=confidence)
+
+            stats = measure(run, args.repeat)
+            results.append({
+              "case": f"{frame_name}/{name}/{region_name}/{mode}/{confidence}",
+              "frame": frame_name,
+              "scale": scale,
+              "template": name,
+              "region": region_name,
+              "mode": mode,
+              "confidence": confidence,
+              "hit": matcher.locate(frame, template, region=region, confidence=confidence) is not None,
+              **stats,
+            })
+  return results
+
+
+def bench_box(args):
+  """Box -> 중심(이미지/논리) 좌표 변환"""
+  runner.SCALE_X, runner.SCALE_Y = 2.0, 2.0
+  box = Box(1254, 2050, 200, 70)
+  loops = 1000
+
+  def convert():
+    for _ in range(loops):
+      runner.center_points(box)
+      runner.box_to_tuple(box)
+
+  stats = measure(convert, args.repeat)
+  # 1000 회 묶음 측정 -> 1회당 값으로 환산
+  for key in ("p50_ms", "p95_ms", "p99_ms", "mean_ms"):
+    stats[key] /= loops
+  return [{"case": "center_points+box_to_tuple", **stats}]
+
+
+def bench_parallel(args):
+  """해상도별 순차 vs 병렬 매칭"""
+  templates = make_templates()
+  serial = Matcher("FULL", workers=1)
+  parallel = Matcher("FULL", workers=args.workers)
+  results = []
+
+  try:
+    for label, (width, height) in RESOLUTIONS.items():
+      frame = make_frame(width, height, templates)
+      cases = {
+        "all-templates": {name: (tpl, None, 0.88) for name, tpl in templates.items()},
+        "single-START": {"START": (templates["START"], None, 0.88)},
+      }
+      for case, specs in cases.items():
+        t_serial = measure(lambda specs=specs: serial.scan(frame, specs), args.repeat)
+        t_parallel = measure(lambda specs=specs: parallel.scan(frame, specs), args.repeat)
+        if serial.scan(frame, specs) != parallel.scan(frame, specs):
+          raise AssertionError(f"serial/parallel 결과 불일치: {label} {case}")
+        results.append({
+          "case": f"{label}/{case}",
+          "size": [width, height],
+          "workers": parallel.workers,
+          "serial_p50_ms": t_serial["p50_ms"],
+          "parallel_p50_ms": t_parallel["p50_ms"],
+          "speedup": t_serial["p50_ms"] / t_parallel["p50_ms"] if t_parallel["p50_ms"] > 0 else 0.0,
+          **{f"parallel_{k}": v for k, v in t_parallel.items()},
+        })
+  finally:
+    parallel.close()
+
+  return results
+
+
+def print_section(title: str, results):
+  print(f"\n## {title}\n")
+  if not results:
+    print("(데이터 없음)")
+    return
+  if "speedup" in results[0]:
+    print("| 케이스 | 순차 p50(ms) | 병렬 p50(ms) | 속도 향상 |")
+    print("|--------|--------------|--------------|-----------|")
+    for r in results:
+      print(f"| `{r['case']}` | {r['serial_p50_ms']:.2f} | {r['parallel_p50_ms']:.2f} | x{r['speedup']:.2f} |")
+    return
+  print("| 케이스 | p50(ms) | p95(ms) | p99(ms) | 할당 peak(KB) |")
+  print("|--------|---------|---------|---------|---------------|")
+  for r in results:
+    print(f"| `{r['case']}` | {r['p50_ms']:.3f} | {r['p95_ms']:.3f} | {r['p99_ms']:.3f} | {r['alloc_peak_kb']:.1f} |")
+
+
+def print_compare(current, previous_file: Path):
+  """이전 결과 대비 p50 변화"""
+  previous = json.loads(previous_file.read_text())
+  print(f"\n## 📈 이전 결과 대비 ({previous_file.name}, {previous.get('created_at')})\n")
+  print("| 섹션 | 케이스 | 이전 p50(ms) | 현재 p50(ms) | 변화 |")
+  print("|------|--------|--------------|--------------|------|")
+  for section, results in current["sections"].items():
+    before = {r["case"]: r for r in previous.get("sections", {}).get(section, [])}
+    for r in results:
+      key = "p50_ms" if "p50_ms" in r else "parallel_p50_ms"
+      if r["case"] not in before or key not in before[r["case"]]:
+        continue
+      old, new = before[r["case"]][key], r[key]
+      change = (new - old) / old * 100 if old else 0.0
+      print(f"| {section} | `{r['case']}` | {old:.3f} | {new:.3f} | {change:+.1f}% |")
+
+
+def main():
+  parser = argparse.ArgumentParser(description="템플릿 매칭 벤치마크")
+  parser.add_argument("--sections", default=",".join(SECTIONS), help=f"측정 섹션 ({','.join(SECTIONS)})")
+  parser.add_argument("--frames", type=Path, help="녹화 프레임(PNG) 디렉토리 (assets/ 템플릿 사용)")
+  parser.add_argument("--repeat", type=int, default=10, help="케이스별 반복 횟수")
+  parser.add_argument("--confidences", type=lambda s: [float(v) for v in s.split(",")],
+                      default=list(CONFIDENCES), help="match 섹션 confidence 목록 (예: 0.85,0.88,0.93)")
+  parser.add_argument("--capture-backend", help="capture 섹션에서 실제 화면 캡처 백엔드 (pyautogui | mss)")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="병렬 매칭 스레드 수")
+  parser.add_argument("--out", type=Path, help="결과 JSON 경로 (기본: bench/benchmark_<시각>.json)")
+  parser.add_argument("--compare", type=Path, help="비교할 이전 결과 JSON")
+  args = parser.parse_args()
+
+  sections = [s.strip() for s in args.sections.split(",") if s.strip()]
+  unknown = [s for s in sections if s not in SECTIONS]
+  if unknown:
+    print(f"❌ 알 수 없는 섹션: {unknown}")
+    sys.exit(1)
+
+  report = {
+    "created_at": datetime.now().isoformat(),
+    "environment": {
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "cpu_count": os.cpu_count(),
+      "opencv": cv2.__version__,
+      "numpy": np.__version__,
+    },
+    "repeat": args.repeat,
+    "sections": {},
+  }
+
+  corpus = build_corpus(args.frames) if "match" in sections else []
+  titles = {
+    "capture": "📷 캡처",
+    "decode": "🗂️  템플릿 로드",
+    "match": "🔍 매칭",
+    "box": "📐 좌표 변환 (1회당)",
+    "parallel": f"⚡ 병렬 매칭 (workers={args.workers}, cpu={os.cpu_count()})",
+  }
+  for section in sections:
+    if section == "capture":
+      results = bench_capture(args)
+    elif section == "decode":
+      results = bench_decode(args)
+    elif section == "match":
+      results = bench_match(args, corpus)
+    elif section == "box":
+      results = bench_box(args)
+    else:
+      results = bench_parallel(args)
+    report["sections"][section] = results
+    print_section(titles[section], results)
+
+  out = args.out or Path("bench") / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+  out.parent.mkdir(parents=True, exist_ok=True)
+  out.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+  print(f"\n[LOG] 결과 저장: {out}")
+
+  if args.compare:
+    print_compare(report, args.compare)
+
+  print("\n✅ 벤치마크 완료")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+템플릿별 confidence 보정 도구
+
+녹화된 프레임(PNG 디렉토리)이나 runner 로그(scores 이벤트)에서 템플릿별 매칭 점수를 모아
+hit 묶음과 miss 묶음으로 나누고, 두 묶음 사이에 템플릿별 threshold 를 잡습니다.
+로그는 실행 당시 confidence 로 나눈 min_hit/best_miss 대신 점수 버킷 분포(SCORE_BUCKET 폭)로 나눕니다
+(경계가 버킷 단위라 프레임보다 거칩니다, 버킷 폭 이상의 --min-gap 필요).
+프레임이 있으면 그 threshold 로 PYRAMID 축소 배율을 작은 쪽으로 줄여 가며
+FULL 과 결과(hit/miss, 좌표)가 모든 프레임에서 같은 가장 작은 배율도 찾습니다.
+
+결과는 calibration.json 에 저장되고 runner 가 시작할 때 읽습니다 (CALIBRATION_FILE).
+
+사용법:
+  python scripts/calibrate.py <프레임_디렉토리 | 로그.json> [...] [--templates assets]
+                              [--out calibration.json] [--min-gap 0.1] [--hit-floor 0.8]
+                              [--position 0.5] [--scales 0.5,0.33,0.25,0.2,0.125] [--tolerance 2]
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+from detection import (  # noqa: E402
+  PYRAMID_MIN_TEMPLATE, SCORE_BUCKET, FramePyramid, match_in, match_pyramid,
+)
+from templates import TemplateRegistry  # noqa: E402
+
+DEFAULT_SCALES = "0.5,0.33,0.25,0.2,0.125"
+PYRAMID_MARGIN = 0.35
+
+
+def load_frames(frame_dir: Path):
+  """프레임 디렉토리의 PNG 를 이름순으로 로드"""
+  frames = []
+  for path in sorted(frame_dir.glob("*.png")):
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is not None:
+      frames.append((path.name, image))
+  return frames
+
+
+def load_log_buckets(log_file: Path):
+  """로그의 마지막 scores 이벤트 (실행 시작부터 누적) -> {템플릿: {버킷 번호: 횟수}}"""
+  templates = {}
+  for entry in binlog.iter_events(log_file):
+    if entry.get("event_type") == "scores":
+      templates = entry.get("details", {}).get("templates", {})
+  return {
+    name: {
+      int(round(float(low) / SCORE_BUCKET)): count
+      for low, count in (entry.get("buckets") or {}).items()
+    }
+    for name, entry in templates.items()
+  }
+
+
+def split_scores(scores, min_gap: float, hit_floor: float):
+  """
+  점수 목록을 가장 큰 간격에서 둘로 나눔 -> (최저 hit, 최고 miss)
+
+  hit 쪽 최저 점수가 hit_floor 이상인 간격만 후보 (비슷한 다른 팝업 점수를 hit 로 보지 않도록)
+  간격이 min_gap 보다 작으면 한 묶음으로 보고 None (전부 hit 또는 전부 miss)
+  """
+  ordered = sorted(scores)
+  best = None
+  for low, high in zip(ordered, ordered[1:]):
+    gap = high - low
+    if high >= hit_floor and gap >= min_gap and (best is None or gap > best[0] - best[1]):
+      best = (high, low)
+  return best
+
+
+def split_buckets(buckets: dict, min_gap: float, hit_floor: float):
+  """
+  버킷 분포를 가장 넓은 빈 구간에서 둘로 나눔 -> (최저 hit, 최고 miss, hit 수) 또는 None
+
+  miss 쪽은 버킷 상한, hit 쪽은 버킷 하한을 경계로 씀 (버킷 안의 실제 점수는 모름)
+  """
+  occupied = sorted(index for index, count in buckets.items() if count)
+  best = None
+  for low, high in zip(occupied, occupied[1:]):
+    min_hit = high * SCORE_BUCKET
+    best_miss = (low + 1) * SCORE_BUCKET
+    gap = min_hit - best_miss
+    if min_hit >= hit_floor and gap >= min_gap - 1e-9 and (best is None or gap > best[0] - best[1]):
+      best = (min_hit, best_miss, high)
+  if best is None:
+    return None
+  min_hit, best_miss, high = best
+  hits = sum(count for index, count in buckets.items() if index >= high)
+  return round(min_hit, 3), round(best_miss, 3), hits
+
+
+class TemplateScores:
+  """템플릿 1개의 hit/miss 경계 누적 (프레임과 로그를 합침)"""
+
+  def __init__(self, name: str):
+    self.name = name
+    self.samples = 0
+    self.hits = 0
+    self.min_hit = None
+    self.best_miss = None
+
+  def add_split(self, min_hit, best_miss, samples: int, hits: int):
+    self.samples += samples
+    self.hits += hits
+    if min_hit is not None:
+      self.min_hit = min_hit if self.min_hit is None else min(self.min_hit, min_hit)
+    if best_miss is not None:
+      self.best_miss = best_miss if self.best_miss is None else max(self.best_miss, best_miss)
+
+  def threshold(self, position: float, min_gap: float):
+    """최고 miss 와 최저 hit 사이 position 위치 (간격이 좁거나 한쪽이 없으면 None)"""
+    if self.min_hit is None or self.best_miss is None:
+      return None
+    if self.min_hit - self.best_miss < min_gap:
+      return None
+    return round(self.best_miss + (self.min_hit - self.best_miss) * position, 3)
+
+
+def frame_scores(frames, template):
+  """프레임별 FULL 매칭 결과 (confidence 와 무관한 최고 점수/위치)"""
+  return [match_in(frame, template, confidence=1.0) for _, frame in frames]
+
+
+def lowest_safe_scale(frames, template, results, confidence: float, scales, tolerance: int):
+  """
+  FULL 과 결과가 모든 프레임에서 같은 가장 작은 PYRAMID 배율
+
+  큰 배율부터 확인하고 처음 어긋나는 배율에서 멈춤 (그보다 작은 배율은 보지 않음)
+  """
+  safe = None
+  pyramid = FramePyramid()
+  w, h = template.size
+  for factor in sorted(scales, reverse=True):
+    if min(w, h) * factor < PYRAMID_MIN_TEMPLATE:
+      break
+    for (_, frame), full in zip(frames, results):
+      expected = full.box if full.score >= confidence else None
+      found = match_pyramid(
+        frame, template, confidence=confidence, factor=factor,
+        margin=PYRAMID_MARGIN, pyramid=pyramid,
+      ).found
+      if (expected is None) != (found is None):
+        return safe
+      if expected is not None and (
+          abs(expected.left - found.left) > tolerance or abs(expected.top - found.top) > tolerance):
+        return safe
+    safe = factor
+  return safe
+
+
+def main():
+  parser = argparse.ArgumentParser(description="템플릿별 confidence / PYRAMID 배율 보정")
+  parser.add_argument("sources", type=Path, nargs="+",
+                      help="녹화 프레임(PNG) 디렉토리 또는 runner 로그(.json/.rlog, scores 이벤트의 점수 분포)")
+  parser.add_argument("--templates", type=Path, default=Path("assets"), help="템플릿 디렉토리")
+  parser.add_argument("--out", type=Path, default=Path("calibration.json"), help="결과 파일")
+  parser.add_argument("--min-gap", type=float, default=0.1, help="hit/miss 로 나눌 최소 점수 간격")
+  parser.add_argument("--hit-floor", type=float, default=0.8, help="hit 로 볼 수 있는 최저 점수")
+  parser.add_argument("--position", type=float, default=0.5,
+                      help="threshold 위치 (0: 최고 miss 바로 위, 1: 최저 hit)")
+  parser.add_argument("--scales", default=DEFAULT_SCALES, help="확인할 PYRAMID 축소 배율 목록")
+  parser.add_argument("--tolerance", type=int, default=2, help="PYRAMID 좌표 허용 오차(px)")
+  args = parser.parse_args()
+
+  registry = TemplateRegistry()
+  for path in sorted(args.templates.glob("IMG_*.png")):
+    registry.load(path.stem.replace("IMG_", ""), str(path))
+
+  scales = [float(value) for value in args.scales.split(",") if value.strip()]
+  stats = {}
+  frame_results = {}
+  frames = []
+  log_buckets = {}
+
+  for source in args.sources:
+    if source.is_dir():
+      loaded = load_frames(source)
+      print(f"📂 {source}: 프레임 {len(loaded)}개")
+      frames.extend(loaded)
+    elif source.exists():
+      templates = load_log_buckets(source)
+      print(f"📄 {source}: scores 템플릿 {len(templates)}개")
+      for name, buckets in templates.items():
+        merged = log_buckets.setdefault(name, {})
+        for index, count in buckets.items():
+          merged[index] = merged.get(index, 0) + count
+    else:
+      print(f"[ERROR] 파일을 찾을 수 없음: {source}")
+
+  # 로그는 모든 파일의 분포를 합친 뒤 한 번에 나눔
+  for name, buckets in log_buckets.items():
+    split = split_buckets(buckets, args.min_gap, args.hit_floor)
+    min_hit, best_miss, hits = split if split is not None else (None, None, 0)
+    stats.setdefault(name, TemplateScores(name)).add_split(
+      min_hit, best_miss, sum(buckets.values()), hits
+    )
+
+  if frames:
+    if not registry.names():
+      print(f"❌ 템플릿이 없습니다: {args.templates}")
+      sys.exit(1)
+    for name in registry.names():
+      results = frame_scores(frames, registry.get(name))
+      frame_results[name] = results
+      values = [result.score for result in results]
+      split = split_scores(values, args.min_gap, args.hit_floor)
+      if split is None:
+        # 한 묶음: 템플릿이 보인 적이 없거나 항상 보임 -> 경계를 정할 수 없음
+        min_hit, best_miss, hits = None, None, 0
+      else:
+        min_hit, best_miss = split
+        hits = sum(1 for value in values if value >= min_hit)
+      stats.setdefault(name, TemplateScores(name)).add_split(min_hit, best_miss, len(values), hits)
+
+  if not stats:
+    print("❌ 보정할 점수가 없습니다.")
+    sys.exit(1)
+
+  calibrated = {}
+  print("\n| 템플릿 | 샘플 | hit | 최저 hit | 최고 miss | confidence | PYRAMID 배율 |")
+  print("|--------|------|-----|----------|-----------|------------|--------------|")
+  for name in sorted(stats):
+    entry = stats[name]
+    confidence = entry.threshold(args.position, args.min_gap)
+    scale = None
+    if confidence is not None and name in frame_results:
+      scale = lowest_safe_scale(
+        frames, registry.get(name), frame_results[name], confidence, scales, args.tolerance
+      )
+    if confidence is not None:
+      calibrated[name] = {
+        "confidence": confidence,
+        "min_hit": round(entry.min_hit, 3),
+        "best_miss": round(entry.best_miss, 3),
+        "samples": entry.samples,
+        "hits": entry.hits,
+        "pyramid_scale": scale,
+      }
+
+    def fmt(value):
+      return "-" if value is None else f"{value:.3f}"
+
+    print(
+      f"| `{name}` | {entry.samples} | {entry.hits} | {fmt(entry.min_hit)} | {fmt(entry.best_miss)} "
+      f"| {fmt(confidence)} | {'-' if scale is None else scale} |"
+    )
+
+  skipped = sorted(set(stats) - set(calibrated))
+  if skipped:
+    print(f"\n⚠️  hit/miss 경계를 찾지 못해 기본 CONFIDENCE 를 유지: {', '.join(skipped)}")
+
+  result = {
+    "created": datetime.now().isoformat(),
+    "sources": [str(source) for source in args.sources],
+    "min_gap": args.min_gap,
+    "position": args.position,
+    "templates": calibrated,
+  }
+  args.out.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+  print(f"\n✅ 저장: {args.out} (템플릿 {len(calibrated)}개)")
+
+
+if __name__ == "__main__":
+  main()
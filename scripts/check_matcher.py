@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+매칭 엔진 검증 도구 (FULL vs PYRAMID)
+
+녹화된 프레임(PNG) 모음에 대해 모든 템플릿을 두 엔진으로 매칭하고:
+- 결과 Box 일치 여부 (hit/miss 및 좌표)
+- 템플릿별 평균 매칭 시간과 속도 향상
+을 출력합니다. 하나라도 불일치하면 종료 코드 1.
+
+--synthetic (또는 프레임 디렉토리 생략): 녹화 없이 benchmark.py 의 합성 템플릿/프레임으로 검증.
+팝업은 프레임마다 번갈아 배치해서 hit/miss 가 모두 나오고, hit 가 한 번도 없는 템플릿이 있어도 종료 코드 1.
+PYRAMID 배율/후보 margin 기본값은 runner 설정(PYRAMID_SCALE, PYRAMID_MARGIN)과 같습니다.
+
+사용법:
+  python scripts/check_matcher.py <프레임_디렉토리> [--templates assets] [--confidence 0.88]
+                                  [--scale 0.25] [--tolerance 0]
+  python scripts/check_matcher.py --synthetic [--count 8] [--scale 0.25]
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark import SCREEN_SIZE, make_frame, make_templates  # noqa: E402
+from detection import Matcher  # noqa: E402
+from runner import PYRAMID_MARGIN, PYRAMID_SCALE  # noqa: E402
+from templates import TemplateRegistry  # noqa: E402
+
+# 합성 프레임에 번갈아 배치할 팝업 (START/EXIT 는 make_frame 이 항상 배치)
+SYNTHETIC_POPUPS = ("POPUP1", "POPUP2")
+
+
+def load_frames(frame_dir: Path):
+  """프레임 디렉토리의 PNG 를 이름순으로 로드"""
+  frames = []
+  for path in sorted(frame_dir.glob("*.png")):
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is not None:
+      frames.append((path.name, image))
+  return frames
+
+
+def synthetic_frames(templates, count: int):
+  """benchmark 합성 프레임 + 팝업 하나씩 번갈아 배치 (프레임마다 위치/배경 다름)"""
+  width, height = SCREEN_SIZE
+  frames = []
+  for seed in range(count):
+    frame = make_frame(width, height, templates, seed=seed)
+    popup = templates[SYNTHETIC_POPUPS[seed % len(SYNTHETIC_POPUPS)]].bgr
+    ph, pw = popup.shape[:2]
+    rng = np.random.default_rng(1000 + seed)
+    x, y = int(rng.integers(0, width - pw)), int(rng.integers(0, height - ph))
+    frame[y:y + ph, x:x + pw] = popup
+    frames.append((f"synthetic_{seed:02d}", frame))
+  return frames
+
+
+def load_templates(template_dir: Path, scale: float):
+  registry = TemplateRegistry()
+  for path in sorted(template_dir.glob("IMG_*.png")):
+    registry.load(path.stem.replace("IMG_", ""), str(path), pyramid=(scale,))
+  return {name: registry.get(name) for name in registry.names()}
+
+
+def same_box(a, b, tolerance: int) -> bool:
+  if a is None or b is None:
+    return a is None and b is None
+  return abs(a.left - b.left) <= tolerance and abs(a.top - b.top) <= tolerance
+
+
+def main():
+  parser = argparse.ArgumentParser(description="FULL vs PYRAMID 매칭 결과 비교")
+  parser.add_argument("frames", type=Path, nargs="?", help="녹화 프레임(PNG) 디렉토리 (생략하면 --synthetic)")
+  parser.add_argument("--templates", type=Path, default=Path("assets"), help="템플릿 디렉토리")
+  parser.add_argument("--confidence", type=float, default=0.88)
+  parser.add_argument("--scale", type=float, default=PYRAMID_SCALE, help="PYRAMID 축소 배율 (기본: runner 설정)")
+  parser.add_argument("--tolerance", type=int, default=0, help="좌표 허용 오차(px)")
+  parser.add_argument("--synthetic", action="store_true", help="합성 템플릿/프레임으로 검증")
+  parser.add_argument("--count", type=int, default=8, help="합성 프레임 수")
+  args = parser.parse_args()
+
+  synthetic = args.synthetic or args.frames is None
+  if synthetic:
+    templates = make_templates()
+    frames = synthetic_frames(templates, args.count)
+  else:
+    frames = load_frames(args.frames)
+    if not frames:
+      print(f"❌ 프레임이 없습니다: {args.frames}")
+      sys.exit(1)
+    templates = load_templates(args.templates, args.scale)
+    if not templates:
+      print(f"❌ 템플릿이 없습니다: {args.templates}")
+      sys.exit(1)
+
+  full = Matcher("FULL")
+  pyramid = Matcher("PYRAMID", pyramid_scale=args.scale, pyramid_margin=PYRAMID_MARGIN)
+
+  timings = defaultdict(lambda: {"FULL": 0.0, "PYRAMID": 0.0})
+  mismatches = []
+  hits = defaultdict(int)
+
+  source = "합성 프레임" if synthetic else "프레임"
+  print(f"📂 {source} {len(frames)}개 x 템플릿 {len(templates)}개 비교 중...\n")
+
+  for frame_name, frame in frames:
+    for name, template in templates.items():
+
+      started = time.perf_counter()
+      box_full = full.locate(frame, template, confidence=args.confidence)
+      timings[name]["FULL"] += time.perf_counter() - started
+
+      started = time.perf_counter()
+      box_pyr = pyramid.locate(frame, template, confidence=args.confidence)
+      timings[name]["PYRAMID"] += time.perf_counter() - started
+
+      if box_full:
+        hits[name] += 1
+      if not same_box(box_full, box_pyr, args.tolerance):
+        mismatches.append((frame_name, name, box_full, box_pyr))
+
+  print("| 템플릿 | hit | FULL(ms) | PYRAMID(ms) | 속도 향상 |")
+  print("|--------|-----|----------|-------------|-----------|")
+  for name in templates:
+    t_full = timings[name]["FULL"] / len(frames) * 1000
+    t_pyr = timings[name]["PYRAMID"] / len(frames) * 1000
+    speedup = t_full / t_pyr if t_pyr > 0 else 0.0
+    print(f"| `{name}` | {hits[name]} | {t_full:.2f} | {t_pyr:.2f} | x{speedup:.1f} |")
+
+  print()
+  if mismatches:
+    print(f"❌ 불일치 {len(mismatches)}건:")
+    for frame_name, name, box_full, box_pyr in mismatches:
+      print(f"  - {frame_name} {name}: FULL={box_full} PYRAMID={box_pyr}")
+    sys.exit(1)
+
+  if synthetic:
+    # 배치한 템플릿이 한 번도 안 잡히면 두 엔진이 같이 놓친 것 (일치해도 실패)
+    missing = [name for name in templates if not hits[name]]
+    if missing:
+      print(f"❌ 합성 프레임에서 hit 가 없는 템플릿: {', '.join(missing)}")
+      sys.exit(1)
+
+  print("✅ 모든 프레임에서 FULL/PYRAMID 결과 일치")
+
+
+if __name__ == "__main__":
+  main()
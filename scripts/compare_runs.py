@@ -7,103 +7,76 @@
 - 템플릿 감지 신뢰도 비교
 - 클릭 위치 분석
 - 개선 포인트 제안
+
+--db <저장소> 를 주면 로그 파일 대신 eventdb.py 저장소에서 읽습니다.
 """
 
-import json
 import sys
 from pathlib import Path
-from datetime import datetime
 from collections import defaultdict
 from typing import List, Dict, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+import logparse  # noqa: E402
+from eventdb import open_store  # noqa: E402
+from logparse import Event  # noqa: E402
+
 
 class LogAnalyzer:
   """로그 파일 분석 클래스"""
 
-  def __init__(self, log_file: Path):
+  def __init__(self, log_file: Path, store=None):
     self.log_file = log_file
+    self.store = store
     self.entries = []
     self.load()
 
   def load(self):
-    """JSON 라인 단위 로그 로드"""
+    """로그 로드 (JSONL / .rlog, 저장소가 있으면 저장소에서) -> Event 목록"""
     if not self.log_file.exists():
       print(f"[ERROR] 파일을 찾을 수 없음: {self.log_file}")
       return
 
-    with open(self.log_file, "r") as f:
-      for line in f:
-        try:
-          entry = json.loads(line.strip())
-          self.entries.append(entry)
-        except json.JSONDecodeError:
-          pass
-
-  def get_transitions(self) -> List[tuple]:
-    """상태 전환 목록 반환"""
-    transitions = []
-    for entry in self.entries:
-      if entry.get("event_type") == "state_transition":
-        details = entry.get("details", {})
-        transitions.append({
-          "timestamp": entry.get("timestamp"),
-          "from": details.get("from"),
-          "to": details.get("to"),
-          "reason": details.get("reason")
-        })
-    return transitions
-
-  def get_detections(self) -> List[Dict[str, Any]]:
-    """템플릿 감지 목록 반환"""
-    detections = []
-    for entry in self.entries:
-      if entry.get("event_type") == "detection":
-        details = entry.get("details", {})
-        detections.append({
-          "timestamp": entry.get("timestamp"),
-          "template": details.get("template"),
-          "hits": details.get("hits"),
-          "required_hits": details.get("required_hits"),
-          "center": details.get("center_logical")
-        })
-    return detections
-
-  def get_clicks(self) -> List[Dict[str, Any]]:
-    """클릭 이벤트 목록 반환"""
-    clicks = []
-    for entry in self.entries:
-      if entry.get("event_type") == "click":
-        details = entry.get("details", {})
-        clicks.append({
-          "timestamp": entry.get("timestamp"),
-          "label": details.get("label"),
-          "position": details.get("position"),
-          "method": details.get("method")
-        })
-    return clicks
-
-  def get_timeouts(self) -> List[Dict[str, Any]]:
-    """타임아웃 이벤트 목록 반환"""
-    timeouts = []
-    for entry in self.entries:
-      if entry.get("event_type") == "timeout":
-        details = entry.get("details", {})
-        timeouts.append({
-          "timestamp": entry.get("timestamp"),
-          "timeout_duration": details.get("timeout_duration"),
-          "elapsed": details.get("elapsed")
-        })
-    return timeouts
+    self.entries = logparse.load(self.log_file, store=self.store)
+
+  def of_type(self, *event_types) -> List[Event]:
+    """event_type 이 맞는 이벤트 (복사 없이 Event 그대로)"""
+    return [entry for entry in self.entries if entry.event_type in event_types]
+
+  def get_transitions(self) -> List[Event]:
+    """상태 전환 목록 반환 (details: from, to, reason)"""
+    return self.of_type("state_transition")
+
+  def get_detections(self) -> List[Event]:
+    """템플릿 감지 목록 반환 (details: template, hits, required_hits, center_logical)"""
+    return self.of_type("detection")
+
+  def get_clicks(self) -> List[Event]:
+    """클릭 이벤트 목록 반환 (details: label, position, method)"""
+    return self.of_type("click")
+
+  def get_timeouts(self) -> List[Event]:
+    """타임아웃 이벤트 목록 반환 (details: timeout_duration, elapsed)"""
+    return self.of_type("timeout")
 
   def count_by_template(self) -> Dict[str, int]:
     """템플릿별 감지 횟수 집계"""
     counts = defaultdict(int)
     for detection in self.get_detections():
-      template = detection.get("template")
+      template = detection.details.get("template")
       if template:
         counts[template] += 1
     return dict(counts)
 
+  def get_scores(self) -> Dict[str, Dict[str, Any]]:
+    """마지막 scores 이벤트의 템플릿별 점수 분포 (실행 시작부터 누적)"""
+    for entry in reversed(self.entries):
+      if entry.event_type == "scores":
+        return entry.details.get("templates", {})
+    return {}
+
   def get_state_timeline(self) -> List[str]:
     """상태 전환 타임라인 반환"""
     timeline = []
@@ -114,16 +87,23 @@ class LogAnalyzer:
     if not transitions:
       return timeline
 
-    first_timestamp = datetime.fromisoformat(transitions[0]["timestamp"])
-    for i, trans in enumerate(transitions):
-      ts = datetime.fromisoformat(trans["timestamp"])
-      elapsed = (ts - first_timestamp).total_seconds()
-      timeline.append(f"{elapsed:.1f}s: {trans['from']} -> {trans['to']}")
+    first_timestamp = transitions[0].ts
+    for trans in transitions:
+      elapsed = trans.ts - first_timestamp
+      timeline.append(f"{elapsed:.1f}s: {trans.details.get('from')} -> {trans.details.get('to')}")
 
     return timeline
 
 
-def compare_logs(success_log: Path, failure_log: Path):
+def _fmt_scores(stats) -> str:
+  if not stats:
+    return "-"
+  values = [stats.get("mean"), stats.get("min_hit"), stats.get("best_miss")]
+  text = " / ".join("-" if v is None else f"{v:.3f}" for v in values)
+  return f"{text} / {stats.get('near_misses', 0)}"
+
+
+def compare_logs(success_log: Path, failure_log: Path, store=None):
   """두 로그 파일 비교 및 리포트 생성"""
   print("=" * 70)
   print("자동화 실행 로그 비교 분석")
@@ -131,8 +111,8 @@ def compare_logs(success_log: Path, failure_log: Path):
   print()
 
   # 로그 로드
-  success = LogAnalyzer(success_log)
-  failure = LogAnalyzer(failure_log)
+  success = LogAnalyzer(success_log, store=store)
+  failure = LogAnalyzer(failure_log, store=store)
 
   if not success.entries:
     print(f"[ERROR] {success_log}에서 로그를 읽을 수 없습니다")
@@ -175,6 +155,14 @@ def compare_logs(success_log: Path, failure_log: Path):
     else:
       print()
 
+  print("\n  매칭 점수 (평균 / 최저 hit / 최고 miss / near miss):")
+  success_scores = success.get_scores()
+  failure_scores = failure.get_scores()
+  if not success_scores and not failure_scores:
+    print("  (scores 이벤트 없음)")
+  for template in sorted(set(success_scores) | set(failure_scores)):
+    print(f"  {template:12} | 성공: {_fmt_scores(success_scores.get(template))}  |  실패: {_fmt_scores(failure_scores.get(template))}")
+
   # 3. 클릭 비교
   print("\n" + "=" * 70)
   print("[3] 클릭 이벤트 분석")
@@ -185,11 +173,11 @@ def compare_logs(success_log: Path, failure_log: Path):
 
   print(f"\n성공: {len(success_clicks)}회 클릭")
   for click in success_clicks:
-    print(f"  - {click['label']:20} at {click['position']}")
+    print(f"  - {click.details.get('label'):20} at {click.details.get('position')}")
 
   print(f"\n실패: {len(failure_clicks)}회 클릭")
   for click in failure_clicks:
-    print(f"  - {click['label']:20} at {click['position']}")
+    print(f"  - {click.details.get('label'):20} at {click.details.get('position')}")
 
   # 4. 타임아웃 분석
   print("\n" + "=" * 70)
@@ -202,15 +190,15 @@ def compare_logs(success_log: Path, failure_log: Path):
   if success_timeouts:
     print(f"\n성공 중 타임아웃 발생: {len(success_timeouts)}회")
     for timeout in success_timeouts:
-      elapsed = timeout.get("elapsed", 0)
-      duration = timeout.get("timeout_duration", 0)
+      elapsed = timeout.details.get("elapsed", 0)
+      duration = timeout.details.get("timeout_duration", 0)
       print(f"  - {duration:.0f}초 제한 중 {elapsed:.1f}초 경과")
 
   if failure_timeouts:
     print(f"\n실패 중 타임아웃 발생: {len(failure_timeouts)}회")
     for timeout in failure_timeouts:
-      elapsed = timeout.get("elapsed", 0)
-      duration = timeout.get("timeout_duration", 0)
+      elapsed = timeout.details.get("elapsed", 0)
+      duration = timeout.details.get("timeout_duration", 0)
       print(f"  - {duration:.0f}초 제한 중 {elapsed:.1f}초 경과")
 
   if not success_timeouts and not failure_timeouts:
@@ -235,6 +223,15 @@ def compare_logs(success_log: Path, failure_log: Path):
         f"템플릿 품질을 점검하거나 CONFIDENCE 값을 조정해보세요."
       )
 
+  # 점수 제안: 실패 실행에서 confidence 바로 아래에서 놓친 템플릿
+  for template, stats in sorted(failure_scores.items()):
+    near = stats.get("near_misses", 0)
+    if near > success_scores.get(template, {}).get("near_misses", 0) and stats.get("best_miss") is not None:
+      suggestions.append(
+        f"• '{template}' 템플릿: 실패 실행에서 near miss {near}회 (최고 {stats['best_miss']:.3f}, "
+        f"CONFIDENCE {stats.get('confidence')}). threshold 가 조금 높을 수 있습니다."
+      )
+
   # 상태 전환 제안
   success_transitions = len(success.get_transitions())
   failure_transitions = len(failure.get_transitions())
@@ -257,7 +254,17 @@ def compare_logs(success_log: Path, failure_log: Path):
 
 
 def main():
-  if len(sys.argv) < 3:
+  args = sys.argv[1:]
+  store = None
+  if "--db" in args:
+    index = args.index("--db")
+    if index + 1 >= len(args):
+      print("[ERROR] --db 뒤에 저장소 경로가 필요합니다")
+      sys.exit(1)
+    store = open_store(Path(args[index + 1]))
+    del args[index:index + 2]
+
+  if not args or (args[0] != "--recent" and len(args) < 2):
     print("사용법: python compare_runs.py <성공_로그> <실패_로그>")
     print()
     print("예시:")
@@ -265,16 +272,19 @@ def main():
     print()
     print("또는 최근 로그 파일 자동 선택:")
     print("  python compare_runs.py --recent")
+    print()
+    print("이벤트 저장소에서 읽기 (eventdb.py):")
+    print("  python compare_runs.py --recent --db logs/events.db")
     sys.exit(1)
 
-  if sys.argv[1] == "--recent":
+  if args[0] == "--recent":
     # 최근 로그 2개 자동 선택
     log_dir = Path("logs")
     if not log_dir.exists():
       print("[ERROR] logs 디렉토리가 없습니다")
       sys.exit(1)
 
-    log_files = sorted(log_dir.glob("*.json"), reverse=True)[:2]
+    log_files = sorted(binlog.find_logs(log_dir), key=lambda p: p.stat().st_mtime, reverse=True)[:2]
     if len(log_files) < 2:
       print(f"[ERROR] 최소 2개의 로그 파일이 필요합니다 (현재: {len(log_files)}개)")
       sys.exit(1)
@@ -282,10 +292,10 @@ def main():
     success_log = log_files[1]  # 더 오래된 것
     failure_log = log_files[0]  # 더 최신
   else:
-    success_log = Path(sys.argv[1])
-    failure_log = Path(sys.argv[2])
+    success_log = Path(args[0])
+    failure_log = Path(args[1])
 
-  compare_logs(success_log, failure_log)
+  compare_logs(success_log, failure_log, store=store)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+로그 형식 변환 도구 (JSONL .json <-> 바이너리 .rlog)
+
+입력 형식은 파일 내용으로 판별하고, 출력 형식은 출력 파일 확장자로 정합니다
+(출력을 생략하면 반대 형식으로 같은 이름에 저장).
+같은 이름의 .json 과 .rlog 가 함께 있으면 분석 스크립트는 최근에 수정된 쪽 하나만 읽습니다.
+
+사용법:
+  python scripts/convert_log.py logs/run_20240101_120000.json            # -> .rlog
+  python scripts/convert_log.py logs/run_20240101_120000.rlog            # -> .json
+  python scripts/convert_log.py <입력> <출력.json | 출력.rlog>
+  python scripts/convert_log.py --all logs                               # logs/*.json -> .rlog
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+
+
+def convert(source: Path, target: Path = None):
+  """source -> target, (이벤트 수, 원본 크기, 결과 크기) 반환"""
+  if target is None:
+    to_binary = not binlog.is_binary(source)
+    target = source.with_suffix(binlog.SUFFIX if to_binary else ".json")
+  else:
+    to_binary = target.suffix == binlog.SUFFIX
+  if target.resolve() == source.resolve():
+    raise ValueError(f"입력과 출력이 같습니다: {source}")
+
+  events = binlog.iter_events(source)
+  count = binlog.write_binary(events, target) if to_binary else binlog.write_jsonl(events, target)
+  return target, count, source.stat().st_size, target.stat().st_size
+
+
+def load_time(path: Path) -> float:
+  """이벤트 전체를 읽는 데 걸린 시간(초)"""
+  start = time.perf_counter()
+  for _ in binlog.iter_events(path):
+    pass
+  return time.perf_counter() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description="runner 로그 JSONL <-> .rlog 변환")
+  parser.add_argument("source", type=Path, help="입력 로그 파일 (--all 이면 로그 디렉토리)")
+  parser.add_argument("target", type=Path, nargs="?", help="출력 파일 (.json 또는 .rlog)")
+  parser.add_argument("--all", action="store_true", help="디렉토리의 JSONL 로그를 모두 .rlog 로 변환")
+  parser.add_argument("--timing", action="store_true", help="변환 전후 로드 시간 비교")
+  args = parser.parse_args()
+
+  if args.all:
+    if not args.source.is_dir():
+      print(f"[ERROR] 디렉토리가 아닙니다: {args.source}")
+      sys.exit(1)
+    sources = sorted(path for path in args.source.glob("*.json") if not binlog.is_binary(path))
+    targets = [None] * len(sources)
+  else:
+    if not args.source.exists():
+      print(f"[ERROR] 파일을 찾을 수 없음: {args.source}")
+      sys.exit(1)
+    sources = [args.source]
+    targets = [args.target]
+
+  if not sources:
+    print("❌ 변환할 로그가 없습니다.")
+    sys.exit(1)
+
+  print("| 입력 | 출력 | 이벤트 | 입력 크기 | 출력 크기 | 비율 |")
+  print("|------|------|--------|-----------|-----------|------|")
+  total_in = total_out = 0
+  for source, target in zip(sources, targets):
+    target, count, size_in, size_out = convert(source, target)
+    total_in += size_in
+    total_out += size_out
+    ratio = size_out / size_in if size_in else 0.0
+    print(f"| `{source.name}` | `{target.name}` | {count} | {size_in:,} B | {size_out:,} B | {ratio:.2f} |")
+    if args.timing:
+      print(f"|   로드 시간 | | | {load_time(source) * 1000:.1f} ms | {load_time(target) * 1000:.1f} ms | |")
+
+  if len(sources) > 1 and total_in:
+    print(f"\n✅ {len(sources)}개 변환: {total_in:,} B -> {total_out:,} B ({total_out / total_in:.2f})")
+
+
+if __name__ == "__main__":
+  main()
@@ -4,56 +4,56 @@
 
 runner.py 실행 후 자동화가 조용히 멈췄을 때,
 최신 로그를 분석해 실패 원인과 설정값 조정을 제안합니다.
+
+사용법:
+  python scripts/diagnose.py [로그_파일] [--db logs/events.db]
 """
 
-import json
+import argparse
 import sys
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 from typing import List, Dict, Any, Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+import logparse  # noqa: E402
+from eventdb import open_store  # noqa: E402
+from logparse import Event  # noqa: E402
+
 
 class DiagnosticsAnalyzer:
   """최신 로그 분석 및 진단"""
 
-  def __init__(self, log_file: Path):
+  def __init__(self, log_file: Path, store=None):
     self.log_file = log_file
+    self.store = store
     self.entries = []
     self.load()
 
   def load(self):
-    """JSON 라인 단위 로그 로드"""
+    """로그 로드 (JSONL / .rlog, 저장소가 있으면 저장소에서) -> Event 목록"""
     if not self.log_file.exists():
       print(f"[ERROR] 파일을 찾을 수 없음: {self.log_file}")
       return
 
-    with open(self.log_file, "r") as f:
-      for line in f:
-        try:
-          entry = json.loads(line.strip())
-          self.entries.append(entry)
-        except json.JSONDecodeError:
-          pass
-
-  def get_errors(self) -> List[Dict[str, Any]]:
-    """에러 이벤트 목록"""
-    errors = []
-    for entry in self.entries:
-      if entry.get("event_type") in ["error", "timeout"]:
-        errors.append({
-          "timestamp": entry.get("timestamp"),
-          "type": entry.get("event_type"),
-          "message": entry.get("message"),
-          "details": entry.get("details", {})
-        })
-    return errors
+    self.entries = logparse.load(self.log_file, store=self.store)
+
+  def of_type(self, *event_types) -> List[Event]:
+    """event_type 이 맞는 이벤트 (복사 없이 Event 그대로)"""
+    return [entry for entry in self.entries if entry.event_type in event_types]
+
+  def get_errors(self) -> List[Event]:
+    """에러/타임아웃 이벤트 목록"""
+    return self.of_type("error", "timeout")
 
   def get_last_state(self) -> Optional[str]:
     """마지막 상태 반환"""
     for entry in reversed(self.entries):
-      if entry.get("event_type") == "state_transition":
-        details = entry.get("details", {})
+      if entry.event_type == "state_transition":
+        details = entry.details
         return details.get("to")
     return None
 
@@ -61,8 +61,8 @@ class DiagnosticsAnalyzer:
     """상태 전환 시퀀스"""
     sequence = []
     for entry in self.entries:
-      if entry.get("event_type") == "state_transition":
-        details = entry.get("details", {})
+      if entry.event_type == "state_transition":
+        details = entry.details
         to_state = details.get("to")
         if to_state and (not sequence or sequence[-1] != to_state):
           sequence.append(to_state)
@@ -74,8 +74,8 @@ class DiagnosticsAnalyzer:
     low_confidence_detections = []
 
     for entry in self.entries:
-      if entry.get("event_type") == "detection":
-        details = entry.get("details", {})
+      if entry.event_type == "detection":
+        details = entry.details
         template = details.get("template")
         hits = details.get("hits", 0)
         required = details.get("required_hits", 2)
@@ -100,14 +100,59 @@ class DiagnosticsAnalyzer:
 
     return issues
 
+  def get_score_summary(self) -> Dict[str, Dict[str, Any]]:
+    """마지막 scores 이벤트 (실행 시작부터 누적된 템플릿별 점수 분포)"""
+    for entry in reversed(self.entries):
+      if entry.event_type == "scores":
+        return entry.details.get("templates", {})
+    return {}
+
+  def analyze_score_issues(self) -> List[str]:
+    """매칭 점수 분포 분석 (near miss, hit/miss 점수 간격)"""
+    scores = self.get_score_summary()
+    if not scores:
+      return []
+
+    issues = ["**템플릿 매칭 점수:**\n"]
+    issues.append("| 템플릿 | 매칭 | hit | near miss | 최저 hit | 최고 miss | CONFIDENCE |")
+    issues.append("|--------|------|-----|-----------|----------|-----------|------------|")
+    advice = []
+    for template, stats in sorted(scores.items()):
+      min_hit = stats.get("min_hit")
+      best_miss = stats.get("best_miss")
+      confidence = stats.get("confidence")
+      issues.append(
+        f"| `{template}` | {stats.get('count', 0)} | {stats.get('hits', 0)} | {stats.get('near_misses', 0)} "
+        f"| {_fmt_score(min_hit)} | {_fmt_score(best_miss)} | {_fmt_score(confidence)} |"
+      )
+
+      if stats.get("near_misses", 0) > 0 and best_miss is not None:
+        advice.append(
+          f"  - `{template}`: confidence 바로 아래 miss {stats['near_misses']}회 (최고 {best_miss:.3f}) "
+          f"→ 화면에 있었는데 놓쳤다면 `CONFIDENCE` 를 {best_miss - 0.01:.2f} 근처로 낮추는 것을 검토"
+        )
+      if min_hit is not None and best_miss is not None:
+        gap = min_hit - best_miss
+        if gap < 0.1:
+          advice.append(
+            f"  - `{template}`: hit/miss 점수 간격 {gap:.3f} 로 좁음 → threshold 조정이나 PYRAMID 전환 시 오감지 위험"
+          )
+      if stats.get("hits", 0) == 0 and stats.get("count", 0) > 0:
+        advice.append(f"  - `{template}`: 한 번도 감지되지 않음 (최고 점수 {_fmt_score(stats.get('max'))}) → 템플릿 재캡처 검토")
+
+    if advice:
+      issues.append("\n  → **권장사항:**")
+      issues.extend(advice)
+    return issues
+
   def analyze_timeout_issues(self) -> List[str]:
     """타임아웃 문제 분석"""
     issues = []
     timeout_by_state = defaultdict(int)
 
     for entry in self.entries:
-      if entry.get("event_type") == "timeout":
-        details = entry.get("details", {})
+      if entry.event_type == "timeout":
+        details = entry.details
         state = details.get("state", "UNKNOWN")
         timeout_by_state[state] += 1
 
@@ -128,8 +173,9 @@ class DiagnosticsAnalyzer:
 
       issues.append("\n  → **권장사항:**")
       for state in sorted(timeout_by_state.keys()):
-        if state in recommendations:
-          issues.append(f"    - {state}: {recommendations[state]}")
+        short = state.split("_", 1)[0]
+        if short in recommendations:
+          issues.append(f"    - {state}: {recommendations[short]}")
 
     return issues
 
@@ -153,7 +199,7 @@ class DiagnosticsAnalyzer:
     if len(errors) > 0:
       recommendations.append(f"\n최근 에러 (최대 3개):")
       for err in errors[-3:]:
-        recommendations.append(f"  - [{err['type']}] {err['message']}")
+        recommendations.append(f"  - [{err.event_type}] {err.message}")
 
     return recommendations
 
@@ -175,6 +221,13 @@ class DiagnosticsAnalyzer:
         print(line)
       print()
 
+    # 매칭 점수
+    score_issues = self.analyze_score_issues()
+    if score_issues:
+      for line in score_issues:
+        print(line)
+      print()
+
     # 타임아웃 문제
     timeout_issues = self.analyze_timeout_issues()
     if timeout_issues:
@@ -185,7 +238,8 @@ class DiagnosticsAnalyzer:
     # 권장 설정값
     print("## 현재 권장 설정값 (runner.py)\n")
     print("```python")
-    print("CONFIDENCE = 0.85  # 기본값: 0.88")
+    if not self.get_score_summary():
+      print("CONFIDENCE = 0.85  # 기본값: 0.88")
     print("REQUIRE_HITS = 1   # 기본값: 2")
     print("S0_TIMEOUT = 15.0  # 기본값: 10.0")
     print("S2_TIMEOUT = 90.0  # 기본값: 60.0")
@@ -193,27 +247,41 @@ class DiagnosticsAnalyzer:
     print("S4_TIMEOUT = 90.0  # 기본값: 60.0")
     print("```\n")
 
+    if self.get_score_summary():
+      print("템플릿별 confidence 는 이 로그의 점수 분포로 보정하세요 (runner 가 calibration.json 을 읽음):\n")
+      print(f"  python scripts/calibrate.py {self.log_file} [녹화_프레임_디렉토리]\n")
+
     if not template_issues and not timeout_issues:
       print("✅ 특별한 이슈가 감지되지 않았습니다. 자동화가 정상 작동 중입니다.")
 
 
+def _fmt_score(value) -> str:
+  return "-" if value is None else f"{value:.3f}"
+
+
 def get_latest_log() -> Optional[Path]:
   """가장 최근 로그 파일 반환"""
   log_dir = Path("logs")
   if not log_dir.exists():
     return None
 
-  json_files = sorted(log_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+  json_files = sorted(binlog.find_logs(log_dir), key=lambda p: p.stat().st_mtime, reverse=True)
   return json_files[0] if json_files else None
 
 
 def main():
-  latest = get_latest_log()
+  parser = argparse.ArgumentParser(description="최신 로그 진단")
+  parser.add_argument("log_file", type=Path, nargs="?", help="진단할 로그 (기본: logs/ 의 최신 로그)")
+  parser.add_argument("--db", type=Path, help="이벤트 저장소 (새 로그는 먼저 적재)")
+  args = parser.parse_args()
+
+  latest = args.log_file or get_latest_log()
   if not latest:
     print("❌ 로그 파일이 없습니다. /run 으로 먼저 자동화를 실행하세요.")
     sys.exit(1)
 
-  analyzer = DiagnosticsAnalyzer(latest)
+  store = open_store(args.db) if args.db else None
+  analyzer = DiagnosticsAnalyzer(latest, store=store)
   analyzer.run()
 
 
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+로그 이벤트 SQLite 저장소
+
+logs/ 의 실행 로그(JSONL / .rlog)를 한 번 적재해 두고 인덱스로 조회합니다.
+- runs: 로그 파일 1개 = 실행 1개 (경로, 크기, mtime 으로 바뀐 파일만 다시 적재)
+- events: 실행별 이벤트 (실행/event_type/상태/템플릿 인덱스)
+- durations: 상태 체류 시간 (같은 실행에서 연속한 상태 전환 사이, 상태/시작 시각 인덱스)
+
+이벤트의 state 는 details 의 state, 없으면 그 시점에 머물던 상태(전환 이벤트는 떠나는 상태),
+template 은 details 의 template, 없으면 target (timeout/error), label (click) 입니다.
+is_timeout 은 timeout 이벤트와, timeout_next 가 없는 상태의 타임아웃으로 종료한 error 이벤트
+(details 에 timeout 이 있음, 예: S4 EXIT) 모두 1 이라서 --type timeout 조회는 둘 다 찾습니다.
+
+stats.py / compare_runs.py / diagnose.py 는 --db 를 주면 파일 대신 이 저장소에서 읽습니다.
+
+사용법:
+  python scripts/eventdb.py ingest [로그 ...] [--force]             # 기본: logs/ 전체
+  python scripts/eventdb.py durations [S2] [--since 7d]               # 상태별 체류 시간 p50/p95
+  python scripts/eventdb.py events [--type timeout] [--state S4] [--template EXIT] [--since 7d]
+  python scripts/eventdb.py runs
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+
+DEFAULT_DB = Path("logs/events.db")
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY,
+  path TEXT UNIQUE NOT NULL,
+  name TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  mtime_ns INTEGER NOT NULL,
+  started REAL,
+  ended REAL,
+  events INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS events (
+  run_id INTEGER NOT NULL,
+  seq INTEGER NOT NULL,
+  ts REAL,
+  event_type TEXT,
+  state TEXT,
+  template TEXT,
+  message TEXT,
+  details TEXT,
+  is_timeout INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_type ON events (event_type, ts);
+CREATE INDEX IF NOT EXISTS events_state ON events (state, event_type);
+CREATE INDEX IF NOT EXISTS events_template ON events (template, event_type);
+CREATE INDEX IF NOT EXISTS events_timeout ON events (is_timeout, template);
+CREATE TABLE IF NOT EXISTS durations (
+  run_id INTEGER NOT NULL,
+  state TEXT NOT NULL,
+  started REAL NOT NULL,
+  duration REAL NOT NULL,
+  reason TEXT
+);
+CREATE INDEX IF NOT EXISTS durations_state ON durations (state, started);
+CREATE INDEX IF NOT EXISTS durations_run ON durations (run_id);
+"""
+
+# 적재 시 executemany 한 번에 넘기는 행 수
+BATCH_ROWS = 5000
+
+
+def parse_since(text: Optional[str]) -> Optional[float]:
+  """'7d' / '12h' / '30m' (지금부터 이전) 또는 ISO 날짜/시각 -> epoch 초"""
+  if not text:
+    return None
+  units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+  if text[-1] in units and text[:-1].replace(".", "", 1).isdigit():
+    return time.time() - float(text[:-1]) * units[text[-1]]
+  return datetime.fromisoformat(text).timestamp()
+
+
+def percentile(sorted_samples, q: float) -> float:
+  """nearest-rank 백분위수"""
+  if not sorted_samples:
+    return 0.0
+  rank = max(1, int(round(q / 100.0 * len(sorted_samples))))
+  return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class EventStore:
+  """로그 이벤트 SQLite 저장소"""
+
+  def __init__(self, db_path: Path = DEFAULT_DB):
+    self.db_path = Path(db_path)
+    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+    self.conn = sqlite3.connect(str(self.db_path))
+    self.conn.row_factory = sqlite3.Row
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute("PRAGMA synchronous=NORMAL")
+    version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+      # 로그에서 다시 만들 수 있는 저장소이므로 스키마가 다르면 비우고 다시 적재
+      print(f"[WARN] {self.db_path}: schema v{version} -> v{SCHEMA_VERSION}, 다시 적재합니다")
+      self.conn.executescript("DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS durations; DROP TABLE IF EXISTS runs;")
+    self.conn.executescript(SCHEMA)
+    self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+  def close(self):
+    self.conn.close()
+
+  # ---- 적재 ----
+
+  def ingest(self, log_files, force: bool = False):
+    """로그 파일들 적재 (크기/mtime 이 그대로인 파일은 건너뜀) -> (적재, 건너뜀)"""
+    ingested = skipped = 0
+    for log_file in log_files:
+      log_file = Path(log_file)
+      stat = log_file.stat()
+      path = str(log_file.resolve())
+      row = self.conn.execute("SELECT id, size, mtime_ns FROM runs WHERE path = ?", (path,)).fetchone()
+      if row is not None and not force and (row["size"], row["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        skipped += 1
+        continue
+      with self.conn:
+        if row is None:
+          run_id = self.conn.execute(
+            "INSERT INTO runs (path, name, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            (path, log_file.name, stat.st_size, stat.st_mtime_ns),
+          ).lastrowid
+        else:
+          run_id = row["id"]
+          self.conn.execute("DELETE FROM events WHERE run_id = ?", (run_id,))
+          self.conn.execute("DELETE FROM durations WHERE run_id = ?", (run_id,))
+        self._ingest_run(run_id, log_file, stat)
+      ingested += 1
+    return ingested, skipped
+
+  def _ingest_run(self, run_id: int, log_file: Path, stat):
+    rows = []
+    durations = []
+    count = 0
+    started = ended = None
+    current = None
+    entered_at = None
+    for seq, (ts, message, event_type, details) in enumerate(binlog.iter_tuples(log_file)):
+      count += 1
+      if ts is not None:
+        started = ts if started is None else min(started, ts)
+        ended = ts if ended is None else max(ended, ts)
+      state = details.get("state")
+      if event_type == "state_transition":
+        state = details.get("from") or current
+        to_state = details.get("to")
+        if ts is not None and entered_at is not None and current is not None and ts - entered_at > 0:
+          durations.append((run_id, current, entered_at, ts - entered_at, details.get("reason")))
+        current = to_state
+        entered_at = ts
+      elif not isinstance(state, str):
+        state = current
+      template = details.get("template") or details.get("target") or details.get("label")
+      is_timeout = event_type == "timeout" or (event_type == "error" and "timeout" in details)
+      rows.append((
+        run_id, seq, ts, event_type, state, template if isinstance(template, str) else None, message,
+        json.dumps(details, ensure_ascii=False, separators=(",", ":"), default=str) if details else None,
+        int(is_timeout),
+      ))
+      if len(rows) >= BATCH_ROWS:
+        self.conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        rows = []
+    self.conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    self.conn.executemany("INSERT INTO durations VALUES (?, ?, ?, ?, ?)", durations)
+    self.conn.execute(
+      "UPDATE runs SET size = ?, mtime_ns = ?, started = ?, ended = ?, events = ? WHERE id = ?",
+      (stat.st_size, stat.st_mtime_ns, started, ended, count, run_id),
+    )
+
+  def prune(self, log_files, log_dir: Path):
+    """
+    log_dir 의 로그 목록(log_files)에 없는 실행 제거
+
+    log_dir 밖에서 따로 적재한 로그(분석 스크립트에 경로로 준 로그)는 파일이 지워졌을 때만 제거
+    """
+    keep = {str(Path(log_file).resolve()) for log_file in log_files}
+    scanned = Path(log_dir).resolve()
+    with self.conn:
+      for row in self.conn.execute("SELECT id, path FROM runs").fetchall():
+        path = Path(row["path"])
+        if row["path"] in keep or (path.parent != scanned and path.exists()):
+          continue
+        self.conn.execute("DELETE FROM events WHERE run_id = ?", (row["id"],))
+        self.conn.execute("DELETE FROM durations WHERE run_id = ?", (row["id"],))
+        self.conn.execute("DELETE FROM runs WHERE id = ?", (row["id"],))
+
+  # ---- 조회 ----
+
+  def runs(self, limit: int = None) -> List[sqlite3.Row]:
+    """실행 목록 (최근 시작 순)"""
+    sql = "SELECT * FROM runs ORDER BY started DESC, id DESC"
+    if limit:
+      sql += f" LIMIT {int(limit)}"
+    return self.conn.execute(sql).fetchall()
+
+  def run_id(self, run) -> Optional[int]:
+    """실행 id / 로그 경로 -> 실행 id (적재되지 않은 로그면 None)"""
+    if run is None or isinstance(run, int):
+      return run
+    row = self.conn.execute("SELECT id FROM runs WHERE path = ?", (str(Path(run).resolve()),)).fetchone()
+    return row["id"] if row else None
+
+  def load_run(self, path: Path) -> int:
+    """로그 파일을 (바뀌었으면) 적재하고 실행 id 반환"""
+    self.ingest([path])
+    return self.run_id(path)
+
+  def states(self, state: str) -> List[str]:
+    """'S2' 같은 짧은 이름 -> 저장된 전체 상태 이름들 (전체 이름이면 그대로)"""
+    rows = self.conn.execute("SELECT DISTINCT state FROM durations").fetchall()
+    names = [row["state"] for row in rows]
+    if state in names:
+      return [state]
+    return [name for name in names if name.split("_", 1)[0] == state]
+
+  def _where(self, run=None, event_type=None, state=None, template=None, since=None, until=None):
+    clauses = []
+    params = []
+    if run is not None:
+      run_id = self.run_id(run)
+      if run_id is None:
+        # run_id = NULL 은 아무것도 찾지 못하므로 조용히 빈 결과를 내지 않음
+        raise ValueError(f"저장소에 적재되지 않은 로그: {run} (store.load_run 으로 먼저 적재)")
+      clauses.append("run_id = ?")
+      params.append(run_id)
+    for column, value in (("event_type", event_type), ("template", template)):
+      if value is None:
+        continue
+      values = [value] if isinstance(value, str) else list(value)
+      clause = f"{column} IN ({', '.join('?' * len(values))})"
+      if column == "event_type" and "timeout" in values:
+        # 종료로 끝난 타임아웃(error)도 타임아웃으로
+        clause = f"({clause} OR is_timeout = 1)"
+      clauses.append(clause)
+      params.extend(values)
+    if state is not None:
+      names = self.states(state) or [state]
+      clauses.append(f"state IN ({', '.join('?' * len(names))})")
+      params.extend(names)
+    if since is not None:
+      clauses.append("ts >= ?")
+      params.append(since)
+    if until is not None:
+      clauses.append("ts < ?")
+      params.append(until)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+  def count(self, **filters) -> int:
+    where, params = self._where(**filters)
+    return self.conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+  def records(self, limit: int = None, **filters) -> Iterator[tuple]:
+    """
+    조건에 맞는 이벤트 -> (ts, message, event_type, details) (실행, 순서대로)
+
+    filters: run (id 또는 로그 경로), event_type, template (문자열 또는 목록), state, since, until (epoch 초)
+    event_type 에 "timeout" 이 있으면 is_timeout 인 error 도 포함
+    """
+    where, params = self._where(**filters)
+    sql = f"SELECT ts, message, event_type, details FROM events{where} ORDER BY run_id, seq"
+    if limit:
+      sql += f" LIMIT {int(limit)}"
+    decode = json.JSONDecoder().decode
+    for ts, message, event_type, details in self.conn.execute(sql, params):
+      yield ts, message, event_type, decode(details) if details else {}
+
+  def events(self, limit: int = None, **filters) -> Iterator[Dict[str, Any]]:
+    """records() 를 JSONL 과 같은 모양의 dict 로"""
+    for ts, message, event_type, details in self.records(limit, **filters):
+      yield {
+        "timestamp": binlog.format_timestamp(ts),
+        "message": message,
+        "event_type": event_type,
+        "details": details,
+      }
+
+  def durations(self, state: str, since: float = None, until: float = None) -> List[float]:
+    """상태 체류 시간 목록(초, 오름차순)"""
+    names = self.states(state) or [state]
+    sql = f"SELECT duration FROM durations WHERE state IN ({', '.join('?' * len(names))})"
+    params = list(names)
+    if since is not None:
+      sql += " AND started >= ?"
+      params.append(since)
+    if until is not None:
+      sql += " AND started < ?"
+      params.append(until)
+    return sorted(row[0] for row in self.conn.execute(sql, params))
+
+  def duration_stats(self, state: str, since: float = None, until: float = None) -> Dict[str, float]:
+    """상태 체류 시간 요약 (count, avg, p50, p95, max)"""
+    samples = self.durations(state, since, until)
+    if not samples:
+      return {"count": 0}
+    return {
+      "count": len(samples),
+      "avg": sum(samples) / len(samples),
+      "p50": percentile(samples, 50),
+      "p95": percentile(samples, 95),
+      "max": samples[-1],
+    }
+
+
+def open_store(db_path: Path, log_dir: Path = Path("logs")) -> EventStore:
+  """저장소를 열고 log_dir 의 새 로그/바뀐 로그를 적재 (분석 스크립트 --db 용)"""
+  store = EventStore(db_path)
+  if log_dir.exists():
+    log_files = binlog.find_logs(log_dir)
+    ingested, _ = store.ingest(sorted(log_files))
+    store.prune(log_files, log_dir)
+    if ingested:
+      print(f"🗄️  {db_path}: {ingested}개 로그 적재")
+  return store
+
+
+def main():
+  parser = argparse.ArgumentParser(description="로그 이벤트 SQLite 저장소")
+  parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="SQLite 파일")
+  commands = parser.add_subparsers(dest="command")
+
+  ingest = commands.add_parser("ingest", help="로그 적재 (바뀐 파일만)")
+  ingest.add_argument("logs", type=Path, nargs="*", help="로그 파일 (기본: logs/ 전체)")
+  ingest.add_argument("--force", action="store_true", help="바뀌지 않은 파일도 다시 적재")
+
+  durations = commands.add_parser("durations", help="상태별 체류 시간")
+  durations.add_argument("state", nargs="?", help="상태 (S2 또는 전체 이름, 생략하면 전체)")
+  durations.add_argument("--since", help="7d / 12h / ISO 날짜")
+
+  events = commands.add_parser("events", help="이벤트 조회")
+  events.add_argument("--type", dest="event_type", help="event_type (예: timeout, error)")
+  events.add_argument("--state", help="상태 (S4 또는 전체 이름)")
+  events.add_argument("--template", help="템플릿 (예: EXIT)")
+  events.add_argument("--since", help="7d / 12h / ISO 날짜")
+  events.add_argument("--limit", type=int, default=50, help="최대 출력 수 (0: 전체)")
+
+  commands.add_parser("runs", help="적재된 실행 목록")
+  args = parser.parse_args()
+
+  if args.command is None:
+    parser.print_help()
+    sys.exit(1)
+
+  store = EventStore(args.db)
+  start = time.perf_counter()
+
+  if args.command == "ingest":
+    log_files = args.logs or sorted(binlog.find_logs(Path("logs")))
+    if not log_files:
+      print("❌ 적재할 로그가 없습니다.")
+      sys.exit(1)
+    ingested, skipped = store.ingest(log_files, force=args.force)
+    if not args.logs:
+      store.prune(log_files, Path("logs"))
+    total = store.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    print(f"✅ 적재 {ingested}개, 변경 없음 {skipped}개 (전체 이벤트 {total:,}개, {time.perf_counter() - start:.2f}초)")
+
+  elif args.command == "durations":
+    since = parse_since(args.since)
+    if args.state:
+      names = [args.state]
+    else:
+      names = [row[0] for row in store.conn.execute("SELECT DISTINCT state FROM durations ORDER BY state")]
+    print("| 상태 | 횟수 | 평균(초) | p50(초) | p95(초) | 최대(초) |")
+    print("|------|------|----------|---------|---------|----------|")
+    for name in names:
+      stats = store.duration_stats(name, since=since)
+      if stats["count"]:
+        print(
+          f"| `{name}` | {stats['count']} | {stats['avg']:.2f} | {stats['p50']:.2f} "
+          f"| {stats['p95']:.2f} | {stats['max']:.2f} |"
+        )
+      else:
+        print(f"| `{name}` | 0 | - | - | - | - |")
+
+  elif args.command == "events":
+    filters = {
+      "event_type": args.event_type, "state": args.state, "template": args.template,
+      "since": parse_since(args.since),
+    }
+    total = store.count(**filters)
+    for entry in store.events(limit=args.limit, **filters):
+      print(f"{entry['timestamp']} [{entry['event_type']}] {entry['message']}")
+    shown = min(total, args.limit) if args.limit else total
+    print(f"\n{shown}/{total}개 표시")
+
+  elif args.command == "runs":
+    print("| 실행 | 시작 | 종료 | 이벤트 |")
+    print("|------|------|------|--------|")
+    for row in store.runs():
+      print(
+        f"| `{row['name']}` | {binlog.format_timestamp(row['started']) or '-'} "
+        f"| {binlog.format_timestamp(row['ended']) or '-'} | {row['events']} |"
+      )
+
+  print(f"\n⏱️  {(time.perf_counter() - start) * 1000:.1f} ms")
+  store.close()
+
+
+if __name__ == "__main__":
+  main()
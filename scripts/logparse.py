@@ -0,0 +1,124 @@
+"""
+분석 스크립트 공용 로그 파서
+
+JSONL / .rlog 로그(또는 eventdb 저장소)를 Event 객체로 읽습니다.
+- Event 는 __slots__ 객체 (dict 대비 이벤트당 메모리 절약)
+- ts 는 epoch 초 float 로 한 번만 파싱 (ISO 문자열은 필요할 때 timestamp 로)
+- event_type 과 상태/템플릿 이름(from, to, state, template)은 sys.intern 으로 같은 문자열 공유
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+
+# intern 하는 details 값 (반복되는 짧은 이름)
+INTERN_KEYS = binlog.SLOT_KEYS
+
+_intern = sys.intern
+
+
+class Event:
+  """로그 이벤트 1개"""
+
+  __slots__ = ("ts", "event_type", "message", "details")
+
+  def __init__(self, ts: Optional[float], event_type: Optional[str], message: str, details: dict):
+    self.ts = ts
+    self.event_type = event_type
+    self.message = message
+    self.details = details
+
+  @property
+  def timestamp(self) -> Optional[str]:
+    """로그 원래 형식의 ISO 문자열"""
+    return binlog.format_timestamp(self.ts)
+
+  def __repr__(self):
+    return f"Event({self.timestamp}, {self.event_type!r}, {self.message!r})"
+
+
+class TimestampParser:
+  """ISO 문자열 -> epoch 초 (초 단위 앞부분은 캐시, 소수부만 따로 더함)"""
+
+  def __init__(self, cache_size: int = 4096):
+    self.cache = {}
+    self.cache_size = cache_size
+
+  def __call__(self, text) -> Optional[float]:
+    if not text:
+      return None
+    head = text[:19]
+    base = self.cache.get(head)
+    if base is None:
+      try:
+        base = datetime.fromisoformat(head).timestamp()
+      except ValueError:
+        return binlog.parse_timestamp(text)
+      if len(self.cache) >= self.cache_size:
+        self.cache.clear()
+      self.cache[head] = base
+    if len(text) == 19:
+      return base
+    if text[19] == "." and text[20:].isdigit():
+      return base + int(text[20:]) / 10 ** (len(text) - 20)
+    # 시간대 등 다른 형식
+    return binlog.parse_timestamp(text)
+
+
+def intern_details(details: dict) -> dict:
+  for key in INTERN_KEYS:
+    value = details.get(key)
+    if type(value) is str:
+      details[key] = _intern(value)
+  return details
+
+
+def iter_jsonl(path) -> Iterator[Event]:
+  parse_ts = TimestampParser()
+  decode = json.JSONDecoder().decode
+  with open(path, "r", encoding="utf-8") as f:
+    for line in f:
+      try:
+        entry = decode(line)
+      except ValueError:
+        continue
+      event_type = entry.get("event_type")
+      yield Event(
+        parse_ts(entry.get("timestamp")),
+        _intern(event_type) if type(event_type) is str else event_type,
+        entry.get("message"),
+        intern_details(entry.get("details") or {}),
+      )
+
+
+def iter_file(path) -> Iterator[Event]:
+  """로그 파일 1개 -> Event (.rlog 는 문자열 테이블을 그대로 intern)"""
+  if not binlog.is_binary(path):
+    yield from iter_jsonl(path)
+    return
+
+  for ts, message, event_type, details in binlog.iter_records(path):
+    yield Event(
+      ts, _intern(event_type) if event_type else event_type, message, intern_details(details)
+    )
+
+
+def iter_store(store, **filters) -> Iterator[Event]:
+  """eventdb 저장소 -> Event (filters 는 EventStore.records 와 같음)"""
+  for ts, message, event_type, details in store.records(**filters):
+    yield Event(
+      ts, _intern(event_type) if event_type else event_type, message, intern_details(details)
+    )
+
+
+def load(path: Path, store=None) -> List[Event]:
+  """로그 1개 전체 (store 가 있으면 저장소에서, logs/ 밖의 로그나 새 로그는 먼저 적재)"""
+  if store is not None:
+    return list(iter_store(store, run=store.load_run(path)))
+  return list(iter_file(path))
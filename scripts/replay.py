@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+오프라인 리플레이 하네스
+
+녹화된 프레임 시퀀스(이미지 디렉토리 또는 동영상)로 runner.main() 상태 머신을
+화면/입력 장치 없이 실행합니다.
+- VirtualClock: SCAN_INTERVAL, 쿨다운, S2_TIMEOUT 등이 기다림 없이 즉시 진행
+- RecordingInput: 클릭/키 입력을 실제로 보내지 않고 기록
+- ReplayBackend: 가상 시각에 해당하는 프레임 제공 (frames.jsonl 로 프레임별 시각 지정 가능)
+
+몇 시간짜리 세션을 몇 초 만에 재생해서 사이클 처리량을 재고 회귀를 잡습니다.
+--check-gating: 같은 세션을 CHANGE_GATING 켜고/끄고 두 번 재생해서, 켠 쪽이 사이클이 적거나
+에러/타임아웃이 많으면(변화 감지가 팝업을 놓침) 종료 코드 1.
+
+사용법:
+  python scripts/replay.py <프레임_디렉토리|동영상> [--frame-interval 0.5] [--screen 1920x1243]
+                           [--log-dir logs/replay] [--expect-cycles N] [--json out.json] [--verbose]
+                           [--mode sync|async] [--check-gating]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+import runner  # noqa: E402
+from capture import get_backend  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from inputs import RecordingInput  # noqa: E402
+
+# 재현성을 위해 가상 시계는 고정 시각에서 시작 (2026-01-01 00:00:00 UTC)
+DEFAULT_START = 1767225600.0
+
+
+def parse_size(text: str):
+  w, h = text.lower().split("x")
+  return int(w), int(h)
+
+
+def read_events(log_file: Path):
+  events = []
+  if log_file is None or not log_file.exists():
+    return events
+  events.extend(binlog.iter_events(log_file))
+  return events
+
+
+def summarize(events, clock: VirtualClock, inputs: RecordingInput, wall: float, stop_reason: str):
+  transitions = [e["details"] for e in events if e.get("event_type") == "state_transition"]
+  cycles = sum(1 for t in transitions if t.get("from") == "S4_WAIT_EXIT" and t.get("to") == "S0_LIST_WAIT_START")
+  virtual = clock.elapsed()
+  return {
+    "stop_reason": stop_reason,
+    "virtual_seconds": virtual,
+    "wall_seconds": wall,
+    "speedup": virtual / wall if wall > 0 else 0.0,
+    "cycles": cycles,
+    "cycles_per_hour": cycles / (virtual / 3600) if virtual > 0 else 0.0,
+    "transitions": len(transitions),
+    "final_state": transitions[-1].get("to") if transitions else "S0_LIST_WAIT_START",
+    "clicks": inputs.count("click"),
+    "presses": inputs.count("press"),
+    "errors": sum(1 for e in events if e.get("event_type") == "error"),
+    "timeouts": sum(1 for e in events if e.get("event_type") == "timeout"),
+  }
+
+
+def run_replay(source: Path, frame_interval: float, screen, log_dir: Path, verbose: bool, start: float,
+               mode: str = "sync"):
+  """runner.main() 을 가상 시계/기록 입력/리플레이 캡처로 실행"""
+  clock = VirtualClock(start=start)
+  if screen is None:
+    # 첫 프레임 크기 = 논리 화면 크기 (배율 1.0 가정)
+    first = get_backend("replay", source=source).grab()
+    screen = (first.shape[1], first.shape[0])
+  inputs = RecordingInput(clock, screen_size=screen)
+
+  runner.CLOCK = clock
+  runner.INPUT = inputs
+  runner.CAPTURE_BACKEND = "replay"
+  runner.REPLAY_SOURCE = source
+  runner.REPLAY_LOOP = False
+  runner.REPLAY_FRAME_INTERVAL = frame_interval
+  runner.CAPTURE_THREAD = False
+  runner.RUNNER_MODE = mode
+  runner.LOG_DIR = log_dir
+  log_dir.mkdir(parents=True, exist_ok=True)
+
+  # 같은 시작 시각이면 로그 파일명이 같으므로 이전 리플레이 로그는 지움 (로그는 append 모드)
+  stale = runner.log_file_path(start)
+  if stale.exists():
+    stale.unlink()
+
+  stop_reason = "runner_exit"
+  out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+  started = time.perf_counter()
+  with out:
+    try:
+      runner.main()
+    except EOFError:
+      stop_reason = "replay_end"
+  wall = time.perf_counter() - started
+
+  events = read_events(runner.CURRENT_LOG_FILE)
+  return summarize(events, clock, inputs, wall, stop_reason), inputs
+
+
+def main():
+  parser = argparse.ArgumentParser(description="runner 상태 머신 오프라인 리플레이")
+  parser.add_argument("source", type=Path, help="프레임 디렉토리 또는 동영상 파일")
+  parser.add_argument("--frame-interval", type=float, default=0.5, help="frames.jsonl 이 없을 때 프레임 간격(초)")
+  parser.add_argument("--screen", type=parse_size, help="논리 화면 크기 (예: 1920x1243)")
+  parser.add_argument("--log-dir", type=Path, default=Path("logs/replay"), help="리플레이 JSON 로그 디렉토리")
+  parser.add_argument("--start", type=float, default=DEFAULT_START, help="가상 시계 시작 시각(epoch)")
+  parser.add_argument("--expect-cycles", type=int, help="최소 기대 사이클 수 (미달 시 종료 코드 1)")
+  parser.add_argument("--json", type=Path, help="요약 JSON 저장 경로")
+  parser.add_argument("--verbose", action="store_true", help="runner 콘솔 로그 출력")
+  parser.add_argument("--mode", choices=("sync", "async"), default="sync", help="runner 실행 방식 (RUNNER_MODE)")
+  parser.add_argument("--check-gating", action="store_true", help="CHANGE_GATING 켜고/끄고 결과 비교")
+  args = parser.parse_args()
+
+  if not args.source.exists():
+    print(f"❌ 리플레이 소스가 없습니다: {args.source}")
+    sys.exit(1)
+
+  if args.check_gating:
+    check_gating(args)
+    return
+
+  summary, inputs = run_replay(args.source, args.frame_interval, args.screen, args.log_dir, args.verbose, args.start,
+                                args.mode)
+
+  print(f"\n## 🔁 리플레이 결과: {args.source}\n")
+  print(f"**종료 사유**: {summary['stop_reason']}")
+  print(f"**가상 시간**: {summary['virtual_seconds']:.1f}초 (실제 {summary['wall_seconds']:.2f}초, x{summary['speedup']:.0f})")
+  print(f"**완료 사이클**: {summary['cycles']} ({summary['cycles_per_hour']:.1f}/시간)")
+  print(f"**상태 전환**: {summary['transitions']} / 마지막 상태: `{summary['final_state']}`")
+  print(f"**입력**: 클릭 {summary['clicks']}회, 키 {summary['presses']}회")
+  print(f"**에러/타임아웃**: {summary['errors']} / {summary['timeouts']}")
+  print(f"**로그**: {runner.CURRENT_LOG_FILE}")
+
+  if args.json:
+    summary["actions"] = [[a.time, a.kind, list(a.args)] for a in inputs.actions]
+    args.json.write_text(json.dumps(summary, ensure_ascii=False, indent=2))
+
+  if args.expect_cycles is not None and summary["cycles"] < args.expect_cycles:
+    print(f"\n❌ 사이클 {summary['cycles']} < 기대값 {args.expect_cycles}")
+    sys.exit(1)
+
+  print("\n✅ 리플레이 완료")
+
+
+def check_gating(args):
+  """CHANGE_GATING 켜고/끄고 재생해서 변화 감지가 감지를 놓치지 않는지 확인"""
+  summaries = {}
+  for gating in (True, False):
+    runner.CHANGE_GATING = gating
+    log_dir = args.log_dir / ("gating_on" if gating else "gating_off")
+    summaries[gating], _ = run_replay(
+      args.source, args.frame_interval, args.screen, log_dir, args.verbose, args.start, args.mode
+    )
+
+  print(f"\n## 🔁 변화 감지 확인: {args.source}\n")
+  print("| CHANGE_GATING | 사이클 | 상태 전환 | 에러 | 타임아웃 | 실제 시간 |")
+  print("|---------------|--------|-----------|------|----------|-----------|")
+  for gating, summary in summaries.items():
+    print(
+      f"| {'on' if gating else 'off'} | {summary['cycles']} | {summary['transitions']} | {summary['errors']} "
+      f"| {summary['timeouts']} | {summary['wall_seconds']:.2f}초 |"
+    )
+
+  on, off = summaries[True], summaries[False]
+  if on["cycles"] < off["cycles"] or on["errors"] + on["timeouts"] > off["errors"] + off["timeouts"]:
+    print("\n❌ 변화 감지를 켜면 감지를 놓칩니다 (CHANGE_SAMPLE_STEP / CHANGE_PIXEL_THRESHOLD 확인)")
+    sys.exit(1)
+  print("\n✅ 변화 감지를 켜도 결과 동일")
+
+
+if __name__ == "__main__":
+  main()
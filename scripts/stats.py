@@ -8,184 +8,400 @@ logs/ 폴더의 모든 JSON 로그를 분석하여:
 - 상태별 체류 시간
 - 타임아웃/에러 빈도
 등을 통계로 출력합니다.
+
+파일별 집계는 서로 독립이라 프로세스 풀에서 병렬로 만들고 합칩니다 (--workers 로 제한, 1 이면 순차).
+파일별 집계는 .cache/stats.json 에 (경로, 크기, mtime) 기준으로 저장해 두고,
+다음 실행에서는 새로 생기거나 바뀐 파일만 다시 읽습니다.
+--db 를 주면 파일 대신 eventdb.py 저장소(SQLite)에서 집계에 필요한 이벤트만 조회합니다.
+
+사용법:
+  python scripts/stats.py [--workers N] [--no-cache] [--db logs/events.db]
 """
 
+import argparse
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime
 from collections import defaultdict
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binlog  # noqa: E402
+import logparse  # noqa: E402
+from eventdb import open_store  # noqa: E402
+from logparse import Event  # noqa: E402
+
+
+CACHE_FILE = Path(".cache/stats.json")
+CACHE_VERSION = 2  # FileStats 필드가 바뀌면 올림 (이전 캐시는 무시)
+
+# FileStats 가 이벤트 수 외에 내용을 보는 event_type (저장소에서 이것만 조회)
+STATS_EVENTS = ("state_transition", "error", "timeout", "scores")
+
+# 완전한 사이클: S0 에서 시작해 S1→S2→S3→S4→S0 순서로 전환 (상태 이름의 "S<n>" 접두어로 비교)
+CYCLE_SEQUENCE = ["S1", "S2", "S3", "S4", "S0"]
+
+
+def state_prefix(state: Optional[str]) -> Optional[str]:
+  return state.split("_", 1)[0] if state else state
+
+
+class FileStats:
+  """
+  로그 파일 1개의 부분 집계
+
+  이벤트를 하나씩 add() 하면서 갱신하므로 이벤트 수와 무관하게 메모리가 일정합니다
+  (상태/에러 유형/템플릿 수만큼만 커짐).
+  """
+
+  def __init__(self, name: str):
+    self.name = name
+    self.total_events = 0
+    self.errors = 0
+    self.timeouts = 0
+    self.last_state = None
+    self.last_time = None
+    self.transitions = 0
+    self.cycles = 0
+    self.gap_total = 0.0
+    self.gap_count = 0
+    self.state_durations = {}
+    self.error_types = defaultdict(int)
+    self.scores = {}
+    self._sequence = 0
+    self._prev_time = None
+    self._prev_state = None
+
+  def to_dict(self) -> Dict[str, Any]:
+    """캐시 저장용 (파일을 끝까지 읽은 뒤의 집계만, 진행 중 상태는 저장하지 않음)"""
+    return {
+      "name": self.name,
+      "total_events": self.total_events,
+      "errors": self.errors,
+      "timeouts": self.timeouts,
+      "last_state": self.last_state,
+      "last_time": self.last_time,
+      "transitions": self.transitions,
+      "cycles": self.cycles,
+      "gap_total": self.gap_total,
+      "gap_count": self.gap_count,
+      # 상태 이름이 None 일 수 있어서 dict 대신 [상태, 합계, 최소, 최대, 횟수] 목록
+      "state_durations": [[state] + values for state, values in self.state_durations.items()],
+      "error_types": dict(self.error_types),
+      "scores": self.scores,
+    }
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, Any]) -> "FileStats":
+    stats = cls(data["name"])
+    for key in ("total_events", "errors", "timeouts", "last_state", "last_time", "transitions",
+                "cycles", "gap_total", "gap_count", "scores"):
+      setattr(stats, key, data[key])
+    stats.state_durations = {row[0]: row[1:] for row in data["state_durations"]}
+    stats.error_types.update(data["error_types"])
+    return stats
+
+  def add(self, entry: Event):
+    self.total_events += 1
+    event_type = entry.event_type
+    if event_type in ("error", "timeout"):
+      if event_type == "error":
+        self.errors += 1
+      else:
+        self.timeouts += 1
+      details = entry.details
+      error_key = f"{event_type}"
+      if "state" in details:
+        error_key += f":{details['state']}"
+      self.error_types[error_key] += 1
+    elif event_type == "state_transition":
+      self._add_transition(entry)
+    elif event_type == "scores":
+      # 누적값이므로 파일의 마지막 scores 이벤트만 유지
+      self.scores = entry.details.get("templates", {})
+
+  def _add_transition(self, entry: Event):
+    details = entry.details
+    to_state = details.get("to")
+    self.transitions += 1
+    self.last_state = to_state
+    self.last_time = entry.ts
+
+    # 사이클: 기대한 다음 상태가 아니면 처음부터 다시 (S1 이면 새 사이클의 첫 단계)
+    prefix = state_prefix(to_state)
+    if prefix == CYCLE_SEQUENCE[self._sequence]:
+      self._sequence += 1
+      if self._sequence == len(CYCLE_SEQUENCE):
+        self.cycles += 1
+        self._sequence = 0
+    else:
+      self._sequence = 1 if prefix == CYCLE_SEQUENCE[0] else 0
+
+    current_time = entry.ts
+    if current_time is not None and self._prev_time is not None:
+      duration = current_time - self._prev_time
+      self.gap_total += duration
+      self.gap_count += 1
+      if duration > 0:  # 음수 지속시간 제외
+        stats = self.state_durations.get(self._prev_state)
+        if stats is None:
+          self.state_durations[self._prev_state] = [duration, duration, duration, 1]
+        else:
+          stats[0] += duration
+          stats[1] = min(stats[1], duration)
+          stats[2] = max(stats[2], duration)
+          stats[3] += 1
+    self._prev_time = current_time
+    self._prev_state = to_state
+
+
+def summarize_file(log_file: Path) -> FileStats:
+  """로그 파일 1개 -> 부분 집계 (프로세스 풀 작업 단위)"""
+  stats = FileStats(log_file.name)
+  for entry in logparse.iter_file(log_file):
+    stats.add(entry)
+  return stats
+
+
+def default_workers() -> int:
+  return os.cpu_count() or 1
+
+
+def file_key(log_file: Path):
+  stat = log_file.stat()
+  return stat.st_size, stat.st_mtime_ns
+
+
+class StatsCache:
+  """파일별 FileStats 캐시 (경로 -> 크기, mtime, 집계)"""
+
+  def __init__(self, cache_file: Path = CACHE_FILE, enabled: bool = True):
+    self.cache_file = Path(cache_file)
+    self.enabled = enabled
+    self.entries = {}
+    self.dirty = False
+    if enabled:
+      self._read()
+
+  def _read(self):
+    try:
+      data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+      return
+    if data.get("version") == CACHE_VERSION:
+      self.entries = data.get("files", {})
+
+  def get(self, log_file: Path) -> Optional[FileStats]:
+    entry = self.entries.get(str(log_file.resolve()))
+    if entry is None or tuple(entry["key"]) != file_key(log_file):
+      return None
+    try:
+      return FileStats.from_dict(entry["stats"])
+    except (KeyError, TypeError, IndexError):
+      return None
+
+  def put(self, log_file: Path, key, stats: FileStats):
+    self.entries[str(log_file.resolve())] = {"key": list(key), "stats": stats.to_dict()}
+    self.dirty = True
+
+  def prune(self, log_files):
+    """지워진 로그 파일 항목 제거"""
+    keep = {str(log_file.resolve()) for log_file in log_files}
+    for path in [path for path in self.entries if path not in keep]:
+      del self.entries[path]
+      self.dirty = True
+
+  def save(self):
+    if not self.enabled or not self.dirty:
+      return
+    tmp_file = self.cache_file.with_suffix(".tmp")
+    try:
+      self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+      tmp_file.write_text(json.dumps({"version": CACHE_VERSION, "files": self.entries}), encoding="utf-8")
+      os.replace(tmp_file, self.cache_file)
+      self.dirty = False
+    except OSError as e:
+      print(f"[WARN] 통계 캐시 저장 실패: {e}")
 
 
 class StatsAnalyzer:
-  """전체 로그 통계 분석"""
+  """전체 로그 통계 분석 (파일을 한 번씩만 스트리밍으로 읽음)"""
 
-  def __init__(self):
+  def __init__(self, workers: int = 0, use_cache: bool = True, store=None):
     self.log_dir = Path("logs")
-    self.all_entries = []
-    self.load_all()
+    self.workers = workers if workers > 0 else default_workers()
+    self.cache = StatsCache(enabled=use_cache and store is None)
+    self.store = store
+    self.files = {}
+    if store is not None:
+      self.load_store()
+    else:
+      self.load_all()
+
+  @property
+  def total_events(self) -> int:
+    return sum(stats.total_events for stats in self.files.values())
+
+  def load_store(self):
+    """이벤트 저장소에서 실행별 집계 (전체 이벤트 수는 runs 테이블 값)"""
+    runs = self.store.runs()
+    print(f"🗄️  {len(runs)}개 실행 조회 중... ({self.store.db_path})")
+    for run in runs:
+      stats = FileStats(run["name"])
+      for entry in logparse.iter_store(self.store, run=run["id"], event_type=STATS_EVENTS):
+        stats.add(entry)
+      stats.total_events = run["events"]
+      self.files[stats.name] = stats
 
   def load_all(self):
-    """모든 JSON 로그 파일 로드"""
+    """모든 로그 파일을 한 이벤트씩 읽어 파일별 집계 (JSONL / .rlog)"""
     if not self.log_dir.exists():
       print(f"[ERROR] 로그 디렉토리가 없습니다: {self.log_dir}")
       return
 
-    json_files = sorted(self.log_dir.glob("*.json"))
+    json_files = sorted(binlog.find_logs(self.log_dir))
     if not json_files:
       print(f"[ERROR] 로그 파일이 없습니다: {self.log_dir}")
       return
 
-    print(f"📂 {len(json_files)}개 로그 파일 로딩 중...")
-
+    # 크기/mtime 이 캐시와 같은 파일은 다시 읽지 않음 (끝난 실행의 로그는 바뀌지 않음)
+    pending = []
     for log_file in json_files:
-      with open(log_file, "r") as f:
-        for line in f:
-          try:
-            entry = json.loads(line.strip())
-            entry["_file"] = log_file.name
-            self.all_entries.append(entry)
-          except json.JSONDecodeError:
-            pass
-
-  def get_transitions(self) -> List[Dict[str, Any]]:
-    """전체 상태 전환 목록"""
-    transitions = []
-    for entry in self.all_entries:
-      if entry.get("event_type") == "state_transition":
-        details = entry.get("details", {})
-        transitions.append({
-          "timestamp": entry.get("timestamp"),
-          "file": entry.get("_file"),
-          "from": details.get("from"),
-          "to": details.get("to"),
-          "reason": details.get("reason")
-        })
-    return transitions
+      stats = self.cache.get(log_file)
+      if stats is None:
+        pending.append((log_file, file_key(log_file)))
+      else:
+        self.files[stats.name] = stats
+
+    workers = min(self.workers, len(pending))
+    print(
+      f"📂 {len(json_files)}개 로그 파일 로딩 중... "
+      f"(캐시 {len(json_files) - len(pending)}개, 파싱 {len(pending)}개, workers={max(1, workers)})"
+    )
+
+    if workers <= 1:
+      results = map(summarize_file, [log_file for log_file, _ in pending])
+    else:
+      # 큰 파일부터 넘겨서 마지막에 큰 파일 하나만 남아 기다리는 일이 없도록
+      pending.sort(key=lambda item: item[1][0], reverse=True)
+      executor = ProcessPoolExecutor(max_workers=workers)
+      results = executor.map(summarize_file, [log_file for log_file, _ in pending])
 
-  def count_complete_cycles(self) -> int:
-    """완전한 사이클 (S0→S1→S2→S3→S4→S0) 횟수"""
-    transitions = self.get_transitions()
-    cycle_count = 0
-    expected_sequence = ["S1", "S2", "S3", "S4", "S0"]
-    current_sequence = []
+    try:
+      for (log_file, key), stats in zip(pending, results):
+        self.files[stats.name] = stats
+        self.cache.put(log_file, key, stats)
+    finally:
+      if workers > 1:
+        executor.shutdown()
 
-    for trans in transitions:
-      current_sequence.append(trans["to"])
+    self.cache.prune(json_files)
+    self.cache.save()
 
-      if current_sequence == expected_sequence:
-        cycle_count += 1
-        current_sequence = []
+  def count_transitions(self) -> int:
+    return sum(stats.transitions for stats in self.files.values())
 
-    return cycle_count
+  def count_complete_cycles(self) -> int:
+    """완전한 사이클 (S0→S1→S2→S3→S4→S0) 횟수"""
+    return sum(stats.cycles for stats in self.files.values())
+
+  def average_transition_time(self) -> Optional[float]:
+    """같은 파일 안에서 연속한 상태 전환 사이 평균 시간(초)"""
+    gap_count = sum(stats.gap_count for stats in self.files.values())
+    if not gap_count:
+      return None
+    return sum(stats.gap_total for stats in self.files.values()) / gap_count
 
   def analyze_state_durations(self) -> Dict[str, Dict[str, float]]:
     """상태별 체류 시간 분석 (평균, 최소, 최대)"""
-    transitions = self.get_transitions()
-
-    if not transitions:
-      return {}
-
-    state_durations = defaultdict(list)
-
-    for i in range(len(transitions) - 1):
-      current = transitions[i]
-      next_trans = transitions[i + 1]
-
-      # 같은 파일 내에서만 계산
-      if current["file"] != next_trans["file"]:
-        continue
-
-      try:
-        current_time = datetime.fromisoformat(current["timestamp"])
-        next_time = datetime.fromisoformat(next_trans["timestamp"])
-        duration = (next_time - current_time).total_seconds()
-
-        state = current["to"]
-        if duration > 0:  # 음수 지속시간 제외
-          state_durations[state].append(duration)
-      except (ValueError, TypeError):
-        pass
-
-    # 통계 계산
-    result = {}
-    for state, durations in sorted(state_durations.items()):
-      if durations:
-        result[state] = {
-          "avg": sum(durations) / len(durations),
-          "min": min(durations),
-          "max": max(durations),
-          "count": len(durations)
-        }
-
-    return result
+    merged = {}
+    for stats in self.files.values():
+      for state, (total, low, high, count) in stats.state_durations.items():
+        acc = merged.get(state)
+        if acc is None:
+          merged[state] = [total, low, high, count]
+        else:
+          acc[0] += total
+          acc[1] = min(acc[1], low)
+          acc[2] = max(acc[2], high)
+          acc[3] += count
+
+    return {
+      state: {"avg": total / count, "min": low, "max": high, "count": count}
+      for state, (total, low, high, count) in sorted(merged.items())
+    }
 
   def count_errors_and_timeouts(self) -> Dict[str, int]:
     """에러 및 타임아웃 빈도"""
     error_types = defaultdict(int)
-
-    for entry in self.all_entries:
-      if entry.get("event_type") in ["error", "timeout"]:
-        details = entry.get("details", {})
-        error_key = f"{entry.get('event_type')}"
-        if "state" in details:
-          error_key += f":{details['state']}"
-        error_types[error_key] += 1
-
+    for stats in self.files.values():
+      for error_key, count in stats.error_types.items():
+        error_types[error_key] += count
     return dict(error_types)
 
+  def aggregate_scores(self) -> Dict[str, Dict[str, Any]]:
+    """파일별 마지막 scores 이벤트(누적값)를 템플릿별로 합산"""
+    merged = {}
+    for file_stats in self.files.values():
+      for name, stats in file_stats.scores.items():
+        count = stats.get("count", 0)
+        if not count:
+          continue
+        acc = merged.setdefault(name, {
+          "count": 0, "hits": 0, "near_misses": 0, "total": 0.0,
+          "min_hit": None, "best_miss": None, "buckets": defaultdict(int)
+        })
+        acc["count"] += count
+        acc["hits"] += stats.get("hits", 0)
+        acc["near_misses"] += stats.get("near_misses", 0)
+        acc["total"] += (stats.get("mean") or 0.0) * count
+        if stats.get("min_hit") is not None:
+          acc["min_hit"] = stats["min_hit"] if acc["min_hit"] is None else min(acc["min_hit"], stats["min_hit"])
+        if stats.get("best_miss") is not None:
+          acc["best_miss"] = stats["best_miss"] if acc["best_miss"] is None else max(acc["best_miss"], stats["best_miss"])
+        for bucket, n in (stats.get("buckets") or {}).items():
+          acc["buckets"][bucket] += n
+
+    for acc in merged.values():
+      acc["mean"] = acc.pop("total") / acc["count"]
+      acc["buckets"] = dict(sorted(acc["buckets"].items()))
+    return merged
+
   def get_file_summary(self) -> Dict[str, Dict[str, Any]]:
     """파일별 요약 (실행 횟수, 성공률, 마지막 상태)"""
-    file_stats = defaultdict(lambda: {
-      "total_events": 0,
-      "errors": 0,
-      "timeouts": 0,
-      "last_state": None,
-      "last_time": None
-    })
-
-    for entry in self.all_entries:
-      file_name = entry.get("_file")
-      if not file_name:
-        continue
-
-      file_stats[file_name]["total_events"] += 1
-
-      if entry.get("event_type") == "error":
-        file_stats[file_name]["errors"] += 1
-      elif entry.get("event_type") == "timeout":
-        file_stats[file_name]["timeouts"] += 1
-      elif entry.get("event_type") == "state_transition":
-        details = entry.get("details", {})
-        file_stats[file_name]["last_state"] = details.get("to")
-        file_stats[file_name]["last_time"] = entry.get("timestamp")
-
-    return dict(file_stats)
+    return {
+      name: {
+        "total_events": stats.total_events,
+        "errors": stats.errors,
+        "timeouts": stats.timeouts,
+        "last_state": stats.last_state,
+        "last_time": binlog.format_timestamp(stats.last_time)
+      }
+      for name, stats in self.files.items()
+    }
 
   def print_summary(self):
     """전체 요약 출력"""
-    transitions = self.get_transitions()
+    transitions = self.count_transitions()
     complete_cycles = self.count_complete_cycles()
     state_durations = self.analyze_state_durations()
     errors_timeouts = self.count_errors_and_timeouts()
     file_summary = self.get_file_summary()
+    score_summary = self.aggregate_scores()
 
     print(f"\n## 📊 전체 통계\n")
 
     print(f"**로그 파일 수**: {len(file_summary)}")
-    print(f"**전체 이벤트**: {len(self.all_entries)}")
-    print(f"**상태 전환**: {len(transitions)}")
+    print(f"**전체 이벤트**: {self.total_events}")
+    print(f"**상태 전환**: {transitions}")
     print(f"**완전한 사이클 (S0→S1→S2→S3→S4→S0)**: {complete_cycles}")
 
-    if len(transitions) > 0:
-      avg_cycle_time = sum(
-        (datetime.fromisoformat(transitions[i + 1]["timestamp"]) -
-         datetime.fromisoformat(transitions[i]["timestamp"])).total_seconds()
-        for i in range(len(transitions) - 1)
-        if transitions[i]["file"] == transitions[i + 1]["file"]
-      ) / max(1, len(transitions) - 1)
-      print(f"**평균 전환 시간**: {avg_cycle_time:.2f}초")
+    avg_transition_time = self.average_transition_time()
+    if avg_transition_time is not None:
+      print(f"**평균 전환 시간**: {avg_transition_time:.2f}초")
 
     print(f"\n## ⏱️  상태별 체류 시간\n")
 
@@ -209,7 +425,22 @@ class StatsAnalyzer:
     else:
       print("(에러/타임아웃 없음)")
 
-    print(f"\n## 📁 파일별 요약\n")
+    print("\n## 🎯 템플릿 매칭 점수\n")
+
+    if score_summary:
+      print("| 템플릿 | 매칭 | hit | near miss | 평균 | 최저 hit | 최고 miss | 분포 (상위 3 버킷) |")
+      print("|--------|------|-----|-----------|------|----------|-----------|--------------------|")
+      for name in sorted(score_summary.keys()):
+        stats = score_summary[name]
+        top = sorted(stats["buckets"].items(), key=lambda x: -x[1])[:3]
+        dist = ", ".join(f"{bucket}: {n}" for bucket, n in top)
+        min_hit = "-" if stats["min_hit"] is None else f"{stats['min_hit']:.3f}"
+        best_miss = "-" if stats["best_miss"] is None else f"{stats['best_miss']:.3f}"
+        print(f"| `{name}` | {stats['count']} | {stats['hits']} | {stats['near_misses']} | {stats['mean']:.3f} | {min_hit} | {best_miss} | {dist} |")
+    else:
+      print("(데이터 없음)")
+
+    print("\n## 📁 파일별 요약\n")
 
     if file_summary:
       print("| 파일명 | 이벤트 | 에러 | 타임아웃 | 마지막 상태 |")
@@ -229,9 +460,17 @@ def main():
     print("❌ logs 디렉토리가 없습니다. /run 으로 먼저 자동화를 실행하세요.")
     sys.exit(1)
 
-  analyzer = StatsAnalyzer()
+  parser = argparse.ArgumentParser(description="전체 로그 통계")
+  parser.add_argument("--workers", type=int, default=0,
+                      help="파일 파싱 프로세스 수 (0: CPU 수, 1: 순차)")
+  parser.add_argument("--no-cache", action="store_true", help=f"{CACHE_FILE} 를 읽지도 쓰지도 않음")
+  parser.add_argument("--db", type=Path, help="이벤트 저장소 (새 로그는 먼저 적재)")
+  args = parser.parse_args()
+
+  store = open_store(args.db) if args.db else None
+  analyzer = StatsAnalyzer(workers=args.workers, use_cache=not args.no_cache, store=store)
 
-  if not analyzer.all_entries:
+  if not analyzer.total_events:
     print("❌ 분석할 로그가 없습니다.")
     sys.exit(1)
 
@@ -0,0 +1,350 @@
+"""
+선언형 상태 머신 엔진
+
+상태마다 감지할 템플릿, 필요한 연속 hit 수, 타임아웃, 동작, 다음 상태를 State 로 선언하면
+엔진이 tick 루프(tick 당 1회 캡처, 쿨다운 대기, 스캔 간격), hit 안정화,
+전환/타임아웃 이벤트 기록을 처리합니다.
+매칭 spec(템플릿, region, confidence)은 prepare() 에서 상태별로 한 번만 계산합니다.
+
+- StateMachine.run(): 동기 tick 루프
+- AsyncStateMachine.run_async(): asyncio tick 루프. 캡처/매칭은 executor 로,
+  입력 동작은 전용 입력 스레드로 넘겨서 이벤트 루프(로그 flush 등 다른 task)가 막히지 않음
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class State:
+    """
+    상태 선언
+
+    target: 연속 require_hits 회 감지되면 action 후 next_state 로 전환하는 템플릿
+            튜플이면 "first of": 먼저(선언 순서) 보이는 템플릿의 hit 를 세고,
+            next_state 를 {템플릿: 다음 상태} dict 로 주면 감지된 템플릿에 따라 분기
+            (None 이면 감지 없이 바로 action + 전환)
+    templates: target 과 함께 같은 프레임에서 매칭할 템플릿 (action 의 found 로 전달)
+    retries: tick 안에서 target 을 다시 캡처해 확인하는 횟수 (모두 miss 면 on_miss)
+    timeout: 상태 진입 후 제한 시간. timeout_next 가 없으면 종료, 있으면 그 상태로 건너뜀
+    action(box, found), on_hit(box, hits), on_miss() -> box 또는 None
+    """
+
+    __slots__ = (
+        "name", "targets", "templates", "require_hits", "retries", "action", "next_state",
+        "cooldown", "timeout", "timeout_next", "on_hit", "on_miss", "gated", "specs",
+    )
+
+    def __init__(self, name: str, target=None, templates=(), require_hits: int = 1,
+                 retries: int = 1, action=None, next_state=None, cooldown: float = 0.0,
+                 timeout: float = None, timeout_next: str = None, on_hit=None, on_miss=None,
+                 gated: bool = False):
+        self.name = name
+        if target is None:
+            self.targets = ()
+        elif isinstance(target, str):
+            self.targets = (target,)
+        else:
+            self.targets = tuple(target)
+        self.templates = tuple(templates)
+        self.require_hits = require_hits
+        self.retries = max(1, retries)
+        self.action = action
+        self.next_state = next_state
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.timeout_next = timeout_next
+        self.on_hit = on_hit
+        self.on_miss = on_miss
+        self.gated = gated
+        self.specs = {}
+
+    @property
+    def label(self) -> str:
+        """로그용 짧은 이름 (S0_LIST_WAIT_START -> S0)"""
+        return self.name.split("_", 1)[0]
+
+    @property
+    def target(self) -> str:
+        """로그용 대상 이름 (first of 면 A|B)"""
+        return "|".join(self.targets) if self.targets else None
+
+    def next_for(self, name: str):
+        if isinstance(self.next_state, dict):
+            return self.next_state.get(name)
+        return self.next_state
+
+    def next_names(self):
+        if isinstance(self.next_state, dict):
+            return list(self.next_state.values())
+        return [self.next_state]
+
+    def scan_names(self):
+        names = list(self.targets)
+        names += [name for name in self.templates if name not in names]
+        return names
+
+    def pick(self, found):
+        """found 에서 먼저 보이는 target -> (name, box)"""
+        for name in self.targets:
+            box = found.get(name)
+            if box:
+                return name, box
+        return None, None
+
+
+class StateMachine:
+    """
+    State 목록을 실행하는 tick 루프
+
+    next_frame() -> frame
+    match(frame, specs, gated) -> {name: box 또는 None}
+    log(msg, event_type=..., details=...)
+    scheduler: ScanScheduler (다음 tick 까지 쉴 시간)
+    on_tick(tick_started): tick 이 끝날 때마다 호출 (perf 기록 등)
+    """
+
+    def __init__(self, states, initial: str, next_frame, match, clock, log, scheduler,
+                 on_tick=None, verbose: bool = False):
+        self.states = {state.name: state for state in states}
+        for state in states:
+            for target in state.next_names() + [state.timeout_next]:
+                if target is not None and target not in self.states:
+                    raise ValueError(f"{state.name}: unknown next state {target}")
+        if initial not in self.states:
+            raise ValueError(f"unknown initial state: {initial}")
+
+        self.next_frame = next_frame
+        self.match = match
+        self.clock = clock
+        self.log = log
+        self.scheduler = scheduler
+        self.on_tick = on_tick
+        self.verbose = verbose
+        self.state = self.states[initial]
+        self.hits = 0
+        self.hit_name = None
+        self.entered_at = None
+        self.cooldown_until = 0.0
+        self.transitions = 0
+
+    def prepare(self, spec):
+        """상태별 매칭 spec 을 미리 계산 (spec(name) -> (template, region, confidence))"""
+        for state in self.states.values():
+            state.specs = {name: spec(name) for name in state.scan_names()}
+
+    def transition(self, to: str, reason: str = None, cooldown: float = 0.0):
+        prev = self.state
+        now = self.clock.time()
+        self.state = self.states[to]
+        self.hits = 0
+        self.hit_name = None
+        self.entered_at = now
+        self.cooldown_until = now + cooldown
+        self.transitions += 1
+
+        details = {"from": prev.name, "to": to}
+        msg = f"[STATE] {prev.label} -> {self.state.label}"
+        if reason is not None:
+            details["reason"] = reason
+            if reason == "timeout":
+                msg += " (skip)"
+        self.log(msg, event_type="state_transition", details=details)
+
+    def _scan_miss(self, state, attempt: int):
+        """retries 중 miss: hit 리셋 후 재확인까지 대기할 시간"""
+        self.hits = 0
+        if state.retries <= 1:
+            return 0.0
+        if self.verbose:
+            self.log(f"[{state.label}] precheck miss {attempt}/{state.retries}")
+        return self.scheduler.interval(state.name)
+
+    def _record(self, state, name, box):
+        """target hit 안정화 (다른 템플릿으로 바뀌면 1부터 다시)"""
+        if not state.targets:
+            return
+        if box:
+            self.hits = self.hits + 1 if name == self.hit_name else 1
+            self.hit_name = name
+            if state.on_hit is not None:
+                state.on_hit(box, self.hits)
+        else:
+            self.hits = 0
+            self.hit_name = None
+
+    def _confirmed(self, state, box) -> bool:
+        return not state.targets or (bool(box) and self.hits >= state.require_hits)
+
+    def _advance(self, state, name):
+        """action 이후 전환. 다음 tick 까지 쉴 시간 반환"""
+        to = state.next_for(name)
+        if to is None:
+            self.hits = 0
+            return self._next_delay()
+        self.transition(to, cooldown=state.cooldown)
+        if state.cooldown > 0:
+            # 쿨다운은 루프에서 한 번에 대기
+            return 0.0
+        return self._next_delay()
+
+    def _idle(self, state):
+        """전환이 없을 때: 타임아웃 처리 후 다음 tick 까지 쉴 시간 (종료면 None)"""
+        if state.timeout is not None:
+            elapsed = self.clock.time() - self.entered_at
+            if elapsed >= state.timeout:
+                if state.timeout_next is None:
+                    self.log(
+                        f"[ERROR] {state.name} timeout {elapsed:.1f}s: '{state.target}' not found -> exit",
+                        event_type="error",
+                        details={
+                            "state": state.name,
+                            "target": state.target,
+                            "elapsed": elapsed,
+                            "timeout": state.timeout,
+                        },
+                    )
+                    return None
+                skip_to = self.states[state.timeout_next]
+                msg = f"[{state.label}] {state.target} timeout {state.timeout:.0f}s -> skip to {skip_to.label}"
+                self.log(msg, event_type="timeout", details={
+                    "state": state.name,
+                    "target": state.target,
+                    "timeout_duration": state.timeout,
+                    "elapsed": elapsed
+                })
+                self.transition(skip_to.name, reason="timeout")
+        return self._next_delay()
+
+    def _next_delay(self):
+        # 확인 중인 감지가 있으면 burst, 없으면 상태별 간격(+back-off)
+        pending = 0 < self.hits < self.state.require_hits
+        delay = self.scheduler.next_delay(self.state.name, pending=pending)
+        timeout = self.state.timeout
+        if timeout is not None and self.entered_at is not None:
+            # 타임아웃 시각을 넘겨서 자지 않음
+            delay = min(delay, max(0.0, self.entered_at + timeout - self.clock.time()))
+        return delay
+
+    def _scan(self, state):
+        """target 확인 (retries 만큼 새 프레임으로 재확인). 반환: (name, box, found)"""
+        name, box, found = None, None, {}
+        for attempt in range(1, state.retries + 1):
+            frame = self.next_frame()
+            found = self.match(frame, state.specs, state.gated) if state.specs else {}
+            name, box = state.pick(found)
+            if not state.targets or box:
+                break
+            self.clock.sleep(self._scan_miss(state, attempt))
+        return name, box, found
+
+    def tick(self):
+        """1 tick 실행. 다음 tick 까지 쉴 시간(초), 종료면 None"""
+        state = self.state
+        name, box, found = self._scan(state)
+        if state.targets and not box and state.on_miss is not None:
+            box = state.on_miss()
+            name = state.targets[0] if box else None
+        self._record(state, name, box)
+
+        if self._confirmed(state, box):
+            if state.action is not None:
+                state.action(box, found)
+            return self._advance(state, name)
+        return self._idle(state)
+
+    def run(self):
+        """종료(타임아웃)까지 실행하고 마지막 상태 이름을 반환"""
+        self.entered_at = self.clock.time()
+        while True:
+            now = self.clock.time()
+            if now < self.cooldown_until:
+                # 쿨다운 끝까지 한 번에 대기
+                self.clock.sleep(self.cooldown_until - now)
+                continue
+
+            tick_started = time.perf_counter()
+            delay = self.tick()
+            if delay is None:
+                return self.state.name
+            if self.on_tick is not None:
+                self.on_tick(tick_started)
+            if delay > 0:
+                self.clock.sleep(delay)
+
+
+class AsyncStateMachine(StateMachine):
+    """
+    asyncio 버전 tick 루프
+
+    캡처/매칭은 executor(None 이면 루프 기본 executor)에서, action/on_miss(입력)는
+    순서가 섞이지 않도록 전용 입력 스레드 1개(input_executor 로 여러 머신이 공유 가능)에서 실행합니다.
+    clock 은 asleep(), join()/leave() 를 지원해야 합니다.
+    """
+
+    def __init__(self, *args, executor=None, input_executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+        # 흐름 여러 개가 입력 스레드를 공유하면 동작(이동+클릭+키)이 서로 끼어들지 않음
+        self.input_executor = input_executor
+        self._owns_input = input_executor is None
+
+    async def _offload(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _input(self, fn, *args):
+        if self.input_executor is None:
+            self.input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="input")
+        return await asyncio.get_running_loop().run_in_executor(self.input_executor, fn, *args)
+
+    def _grab_and_match(self, state):
+        frame = self.next_frame()
+        return self.match(frame, state.specs, state.gated) if state.specs else {}
+
+    async def _scan_async(self, state):
+        name, box, found = None, None, {}
+        for attempt in range(1, state.retries + 1):
+            found = await self._offload(self._grab_and_match, state)
+            name, box = state.pick(found)
+            if not state.targets or box:
+                break
+            await self.clock.asleep(self._scan_miss(state, attempt))
+        return name, box, found
+
+    async def tick_async(self):
+        state = self.state
+        name, box, found = await self._scan_async(state)
+        if state.targets and not box and state.on_miss is not None:
+            box = await self._input(state.on_miss)
+            name = state.targets[0] if box else None
+        self._record(state, name, box)
+
+        if self._confirmed(state, box):
+            if state.action is not None:
+                await self._input(state.action, box, found)
+            return self._advance(state, name)
+        return self._idle(state)
+
+    async def run_async(self):
+        """종료(타임아웃)까지 실행하고 마지막 상태 이름을 반환"""
+        self.entered_at = self.clock.time()
+        self.clock.join()
+        try:
+            while True:
+                now = self.clock.time()
+                if now < self.cooldown_until:
+                    await self.clock.asleep(self.cooldown_until - now)
+                    continue
+
+                tick_started = time.perf_counter()
+                delay = await self.tick_async()
+                if delay is None:
+                    return self.state.name
+                if self.on_tick is not None:
+                    self.on_tick(tick_started)
+                await self.clock.asleep(delay)
+        finally:
+            self.clock.leave()
+            if self._owns_input and self.input_executor is not None:
+                self.input_executor.shutdown(wait=True)
+                self.input_executor = None
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+멀티 세션 supervisor
+
+세션 N개를 각자의 가상 디스플레이(Xvfb)에서 runner.py 로 실행합니다.
+- 세션마다 DISPLAY, 로그 파일(run_<시각>_<세션>.json 또는 .rlog), 출력 파일을 분리
+- 호스트 코어를 세션별로 나눠 CPU affinity 를 고정하고, 매칭/OpenCV 스레드 수도
+  세션당 코어 수로 제한해서 세션끼리 코어를 뺏지 않음
+- runner 가 종료(타임아웃 등)되면 다시 시작
+- 주기적으로 세션별 사이클/지연 시간과 전체 시간당 사이클을 출력
+
+사용법:
+  python supervisor.py --sessions 4 [--display-base 101] [--screen 1920x1243x24]
+                       [--app "chromium --kiosk https://..."] [--log-dir logs/sessions]
+                       [--duration 3600] [--report-interval 60] [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import binlog
+
+ROOT = Path(__file__).resolve().parent
+CYCLE_FROM = "S4_WAIT_EXIT"
+CYCLE_TO = "S0_LIST_WAIT_START"
+CYCLE_START = "S1_PLAYER_FOCUS"
+RESTART_DELAY = 5.0  # runner 종료 후 재시작까지 대기(초)
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cpus(cpus, sessions: int):
+    """코어를 세션별로 분배 (세션이 코어보다 많으면 코어를 돌아가며 공유)"""
+    if sessions <= len(cpus):
+        per = len(cpus) // sessions
+        return [cpus[i * per:(i + 1) * per] for i in range(sessions)]
+    return [[cpus[i % len(cpus)]] for i in range(sessions)]
+
+
+def wait_for_display(number: int, timeout: float = 10.0) -> bool:
+    socket = Path(f"/tmp/.X11-unix/X{number}")
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if socket.exists():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def terminate(proc, sig=signal.SIGTERM, timeout: float = 5.0):
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        proc.send_signal(sig)
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def session_logs(log_dir: Path, name: str):
+    """세션의 로그 파일들 (RUNNER_LOG_FORMAT 에 따라 .json / .rlog)"""
+    return sorted(
+        list(log_dir.glob(f"run_*_{name}.json")) + list(log_dir.glob(f"run_*_{name}{binlog.SUFFIX}"))
+    )
+
+
+class SessionStats:
+    """세션 로그(JSONL / .rlog)를 이어 읽으며 사이클/지연 시간 집계"""
+
+    def __init__(self):
+        self.offsets = {}
+        self.readers = {}
+        self.cycles = 0
+        self.cycle_times = []
+        self.errors = 0
+        self.timeouts = 0
+        self.last_start = None
+        self.last_perf = {}
+
+    def update(self, log_files):
+        for path in log_files:
+            if path.suffix == binlog.SUFFIX:
+                self._update_binary(path)
+                continue
+            offset = self.offsets.get(path, 0)
+            try:
+                with open(path, "r") as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith("\n"):
+                            # 아직 쓰는 중인 줄은 다음에 다시 읽음
+                            break
+                        offset += len(line.encode("utf-8"))
+                        self._feed(line)
+            except OSError:
+                continue
+            self.offsets[path] = offset
+
+    def _update_binary(self, path):
+        reader = self.readers.get(path)
+        if reader is None:
+            reader = self.readers[path] = binlog.RecordReader(path)
+        try:
+            records = reader.read_new()
+        except (OSError, ValueError):
+            return
+        for ts, _, event_type, details in records:
+            self._feed_event(ts, event_type, details)
+
+    def _feed(self, line: str):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        self._feed_event(
+            _parse_ts(entry.get("timestamp")), entry.get("event_type"), entry.get("details") or {}
+        )
+
+    def _feed_event(self, ts, event_type, details):
+        if event_type == "state_transition":
+            if details.get("to") == CYCLE_START:
+                if ts is not None:
+                    if self.last_start is not None:
+                        self.cycle_times.append(ts - self.last_start)
+                    self.last_start = ts
+            elif details.get("from") == CYCLE_FROM and details.get("to") == CYCLE_TO:
+                self.cycles += 1
+        elif event_type == "error":
+            self.errors += 1
+        elif event_type == "timeout":
+            self.timeouts += 1
+        elif event_type == "perf" and details.get("scope") == "window":
+            self.last_perf = details.get("spans") or {}
+
+    def summary(self):
+        times = sorted(self.cycle_times)
+        tick = self.last_perf.get("tick", {})
+        capture = self.last_perf.get("capture", {})
+        return {
+            "cycles": self.cycles,
+            "cycle_mean_s": sum(times) / len(times) if times else None,
+            "cycle_p95_s": times[min(len(times) - 1, int(len(times) * 0.95))] if times else None,
+            "tick_p95_ms": tick.get("p95_ms"),
+            "capture_p95_ms": capture.get("p95_ms"),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+def _parse_ts(text):
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+class Session:
+    """Xvfb + (선택) 앱 + runner 한 세트"""
+
+    def __init__(self, index: int, display: int, cpus, args):
+        self.index = index
+        self.name = f"s{index}"
+        self.display = display
+        self.cpus = cpus
+        self.args = args
+        self.xvfb = None
+        self.app = None
+        self.runner = None
+        self.restarts = 0
+        self.started_at = None
+        self.exited_at = None
+        self.stats = SessionStats()
+
+    @property
+    def env(self):
+        env = dict(os.environ)
+        threads = str(len(self.cpus))
+        env.update({
+            "DISPLAY": f":{self.display}",
+            "RUNNER_SESSION": self.name,
+            "RUNNER_LOG_DIR": str(self.args.log_dir),
+            "RUNNER_MATCH_WORKERS": threads,
+            "RUNNER_CV_THREADS": threads,
+            "OMP_NUM_THREADS": threads,
+        })
+        return env
+
+    def _pin(self, proc):
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(proc.pid, self.cpus)
+            except OSError:
+                pass
+
+    def start(self):
+        if not self.args.no_xvfb:
+            self.xvfb = subprocess.Popen(
+                ["Xvfb", f":{self.display}", "-screen", "0", self.args.screen, "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            if not wait_for_display(self.display):
+                raise RuntimeError(f"Xvfb :{self.display} did not start")
+        if self.args.app:
+            self.app = subprocess.Popen(
+                shlex.split(self.args.app), env=self.env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            self._pin(self.app)
+        self.start_runner()
+
+    def start_runner(self):
+        out = open(self.args.log_dir / f"{self.name}.out", "a")
+        self.runner = subprocess.Popen(
+            [sys.executable, str(self.args.runner)], cwd=str(ROOT), env=self.env,
+            stdout=out, stderr=subprocess.STDOUT,
+        )
+        out.close()
+        self._pin(self.runner)
+        self.started_at = time.time()
+
+    def poll(self):
+        """runner 가 종료됐으면 RESTART_DELAY 후 재시작 (restart=False 면 그대로 둠)"""
+        if self.runner is not None and self.runner.poll() is not None and self.args.restart:
+            now = time.time()
+            if self.exited_at is None:
+                self.exited_at = now
+            elif now - self.exited_at >= RESTART_DELAY:
+                self.exited_at = None
+                self.restarts += 1
+                self.start_runner()
+        self.stats.update(session_logs(self.args.log_dir, self.name))
+
+    @property
+    def alive(self) -> bool:
+        return self.runner is not None and self.runner.poll() is None
+
+    def stop(self):
+        # runner 는 SIGINT 로 멈춰야 KeyboardInterrupt 처리에서 로그를 flush
+        terminate(self.runner, signal.SIGINT)
+        terminate(self.app)
+        terminate(self.xvfb)
+
+
+def build_report(sessions, elapsed: float):
+    rows = []
+    total_cycles = 0
+    for session in sessions:
+        summary = session.stats.summary()
+        summary.update({
+            "session": session.name,
+            "display": f":{session.display}",
+            "cpus": session.cpus,
+            "restarts": session.restarts,
+            "alive": session.alive,
+            "cycles_per_hour": summary["cycles"] / (elapsed / 3600) if elapsed > 0 else 0.0,
+        })
+        total_cycles += summary["cycles"]
+        rows.append(summary)
+    return {
+        "elapsed_s": elapsed,
+        "sessions": rows,
+        "total_cycles": total_cycles,
+        "cycles_per_hour": total_cycles / (elapsed / 3600) if elapsed > 0 else 0.0,
+    }
+
+
+def _fmt(value, spec: str = ".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(report):
+    print(f"\n## 📊 세션 현황 ({report['elapsed_s'] / 60:.1f}분)\n")
+    print("| 세션 | display | 코어 | 사이클 | 시간당 | 평균 사이클(s) | p95 사이클(s) | tick p95(ms) | capture p95(ms) | 에러 | 재시작 |")
+    print("|------|---------|------|--------|--------|----------------|---------------|--------------|-----------------|------|--------|")
+    for row in report["sessions"]:
+        status = "" if row["alive"] else " ⛔"
+        print(
+            f"| {row['session']}{status} | {row['display']} | {','.join(map(str, row['cpus']))} "
+            f"| {row['cycles']} | {row['cycles_per_hour']:.1f} | {_fmt(row['cycle_mean_s'])} "
+            f"| {_fmt(row['cycle_p95_s'])} | {_fmt(row['tick_p95_ms'])} | {_fmt(row['capture_p95_ms'])} "
+            f"| {row['errors']} | {row['restarts']} |"
+        )
+    print(f"\n**전체**: {report['total_cycles']} 사이클, 시간당 {report['cycles_per_hour']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runner 멀티 세션 supervisor (Xvfb)")
+    parser.add_argument("--sessions", type=int, default=2, help="세션 수")
+    parser.add_argument("--display-base", type=int, default=101, help="첫 세션 디스플레이 번호")
+    parser.add_argument("--screen", default="1920x1243x24", help="Xvfb 화면 (WxHxDepth)")
+    parser.add_argument("--app", help="세션마다 실행할 앱 명령 (DISPLAY 지정됨)")
+    parser.add_argument("--runner", type=Path, default=ROOT / "runner.py", help="세션마다 실행할 runner")
+    parser.add_argument("--log-dir", type=Path, default=Path("logs/sessions"), help="세션 로그 디렉토리")
+    parser.add_argument("--duration", type=float, help="실행 시간(초), 없으면 Ctrl+C 까지")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="현황 출력 간격(초)")
+    parser.add_argument("--no-restart", dest="restart", action="store_false", help="종료된 runner 재시작 안 함")
+    parser.add_argument("--no-xvfb", action="store_true", help="Xvfb 를 띄우지 않음 (이미 떠 있는 디스플레이 사용)")
+    parser.add_argument("--json", type=Path, help="마지막 현황 JSON 저장 경로")
+    args = parser.parse_args()
+
+    args.log_dir = args.log_dir.resolve()
+    args.log_dir.mkdir(parents=True, exist_ok=True)
+
+    cpus = split_cpus(available_cpus(), args.sessions)
+    sessions = [Session(i, args.display_base + i, cpus[i], args) for i in range(args.sessions)]
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    started = time.time()
+    report = None
+    try:
+        for session in sessions:
+            session.start()
+            print(f"[SUPERVISOR] {session.name} display=:{session.display} cpus={session.cpus} pid={session.runner.pid}")
+
+        next_report = started + args.report_interval
+        while not stopping:
+            now = time.time()
+            if args.duration is not None and now - started >= args.duration:
+                break
+            for session in sessions:
+                session.poll()
+            if not args.restart and not any(session.alive for session in sessions):
+                break
+            if now >= next_report:
+                print_report(build_report(sessions, now - started))
+                next_report = now + args.report_interval
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for session in sessions:
+            session.stop()
+        for session in sessions:
+            session.stats.update(session_logs(args.log_dir, session.name))
+        report = build_report(sessions, time.time() - started)
+        print_report(report)
+        if args.json:
+            args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+템플릿 레지스트리
+
+시작 시 템플릿 PNG 를 한 번만 읽어서 매칭에 바로 쓸 수 있는 NumPy 배열
+(BGR, alpha mask, 배율별 리사이즈본, 피라미드 축소본)로 보관합니다.
+PNG 디코드+리사이즈가 1ms 안팎이라 디스크 캐시는 두지 않습니다 (.npz 로드가 더 느림).
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+class Template:
+    """매칭 준비가 끝난 템플릿 1개 (특정 배율)"""
+
+    __slots__ = ("name", "path", "scale", "bgr", "mask", "levels")
+
+    def __init__(self, name, path, scale, bgr, mask):
+        self.name = name
+        self.path = path
+        self.scale = scale
+        self.bgr = bgr
+        self.mask = mask
+        self.levels = {}
+
+    @property
+    def size(self):
+        h, w = self.bgr.shape[:2]
+        return w, h
+
+    def level(self, factor: float):
+        """피라미드 축소본 (bgr, mask) - 처음 요청될 때 한 번만 계산"""
+        key = scale_key(factor)
+        if key not in self.levels:
+            w, h = self.size
+            size = (max(1, int(round(w * factor))), max(1, int(round(h * factor))))
+            bgr = cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA)
+            mask = None
+            if self.mask is not None:
+                mask = cv2.resize(self.mask, size, interpolation=cv2.INTER_NEAREST)
+            self.levels[key] = (bgr, mask)
+        return self.levels[key]
+
+
+def scale_key(scale: float) -> str:
+    return f"{scale:.3f}"
+
+
+def preprocess(rgba: np.ndarray, scale: float):
+    """디코드된 이미지 -> 매칭용 배열 (bgr, mask)"""
+    if rgba.ndim == 2:
+        rgba = cv2.cvtColor(rgba, cv2.COLOR_GRAY2BGR)
+
+    if scale != 1.0:
+        h, w = rgba.shape[:2]
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        rgba = cv2.resize(rgba, size, interpolation=interp)
+
+    bgr = np.ascontiguousarray(rgba[:, :, :3])
+    mask = None
+    if rgba.shape[2] == 4:
+        alpha = rgba[:, :, 3]
+        # 완전 불투명이면 mask 없이 매칭 (pyscreeze 와 같은 결과)
+        if alpha.min() < 255:
+            mask = np.ascontiguousarray(
+                cv2.cvtColor((alpha > 0).astype(np.uint8) * 255, cv2.COLOR_GRAY2BGR)
+            )
+    return bgr, mask
+
+
+class TemplateRegistry:
+    """이름 -> 배율별 Template"""
+
+    def __init__(self):
+        self.templates = {}
+        self.paths = {}
+
+    def names(self):
+        return list(self.paths)
+
+    def load(self, name: str, path: str, scales=(1.0,), pyramid=()) -> bool:
+        """템플릿 로드 (파일이 없으면 False)"""
+        p = Path(path)
+        if not p.exists():
+            return False
+
+        rgba = cv2.imread(str(p), cv2.IMREAD_UNCHANGED)
+        if rgba is None:
+            raise IOError(f"template load failed: {path}")
+        for scale in scales:
+            template = Template(name, str(p), scale, *preprocess(rgba, scale))
+            for factor in pyramid:
+                template.level(factor)
+            self.templates[(name, scale_key(scale))] = template
+
+        self.paths[name] = str(p)
+        return True
+
+    def get(self, name: str, scale: float = 1.0):
+        return self.templates.get((name, scale_key(scale)))
@@ -1,12 +1,17 @@
+import sys
 import time
 from pathlib import Path
 
 import cv2
-import numpy as np
 import pyautogui
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capture import get_backend  # noqa: E402
+
 IMG_START = "assets/IMG_START.png"
 OUT_DIR = Path("assets")
+CAPTURE_BACKEND = "pyautogui"  # pyautogui | mss
 
 
 def clamp(v: int, low: int, high: int) -> int:
@@ -30,8 +35,8 @@ def main():
     cx, cy = map(int, pyautogui.position())
     left = clamp(cx - tw // 2, 0, sw - tw)
     top = clamp(cy - th // 2, 0, sh - th)
-    patch_img = pyautogui.screenshot(region=(left, top, tw, th))
-    patch_bgr = cv2.cvtColor(np.array(patch_img), cv2.COLOR_RGB2BGR)
+    backend = get_backend(CAPTURE_BACKEND)
+    patch_bgr = backend.grab(region=(left, top, tw, th))
 
     OUT_DIR.mkdir(parents=True, exist_ok=True)
     candidate = OUT_DIR / "IMG_START_candidate.png"
@@ -10,6 +10,10 @@ IMG_POPUP2 = "assets/IMG_POPUP2.png"
 IMG_EXIT = "assets/IMG_EXIT.png"
 IMG_PLAYER = "assets/IMG_PLAYER.png"  # optional
 
+# 캡처 백엔드: pyautogui | mss | replay (replay 는 REPLAY_SOURCE 에 프레임 디렉토리/동영상)
+CAPTURE_BACKEND = "pyautogui"
+REPLAY_SOURCE = None
+
 # 탐지/동작 파라미터
 CONFIDENCE = 0.88
 PLAYER_CONFIDENCE = 0.88
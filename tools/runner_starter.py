@@ -1,9 +1,18 @@
+import sys
 import time
 from collections import deque
+from pathlib import Path
 
 import pyautogui
 import pyscreeze
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capture import get_backend  # noqa: E402
+from clock import SystemClock  # noqa: E402
+from scheduler import ScanScheduler  # noqa: E402
+from statemachine import State, StateMachine  # noqa: E402
+
 try:
     import config as cfg
 except ImportError:
@@ -12,8 +21,21 @@ except ImportError:
 SCALE_X = 1.0
 SCALE_Y = 1.0
 
+BACKEND = get_backend(
+    getattr(cfg, "CAPTURE_BACKEND", "pyautogui"), source=getattr(cfg, "REPLAY_SOURCE", None)
+)
+
+TEMPLATE_PATHS = {
+    "START": cfg.IMG_START,
+    "PLAYER": cfg.IMG_PLAYER,
+    "POPUP1": cfg.IMG_POPUP1,
+    "POPUP2": cfg.IMG_POPUP2,
+    "EXIT": cfg.IMG_EXIT,
+}
+HISTORY = deque(maxlen=cfg.DEBUG_HISTORY_SIZE)
 
-def log(msg: str):
+
+def log(msg: str, event_type: str = "log", details: dict = None):
     print(msg)
 
 
@@ -27,8 +49,7 @@ def scaled_point():
 def detect_display_scale():
     global SCALE_X, SCALE_Y
     sw, sh = pyautogui.size()
-    shot = pyautogui.screenshot()
-    iw, ih = shot.size
+    ih, iw = BACKEND.grab().shape[:2]
     if sw > 0 and sh > 0:
         SCALE_X = iw / sw
         SCALE_Y = ih / sh
@@ -74,14 +95,28 @@ def click_center(box, label: str):
     pyautogui.click()
 
 
-def locate(path: str, region=None, confidence=None):
+def locate(path: str, frame, region=None, confidence=None):
+    """region 은 이미지 좌표"""
     conf = cfg.CONFIDENCE if confidence is None else confidence
     try:
-        return pyautogui.locateOnScreen(path, confidence=conf, region=to_image_region(region))
+        return pyscreeze.locate(path, frame, confidence=conf, region=region)
     except (pyautogui.ImageNotFoundException, pyscreeze.ImageNotFoundException):
         return None
 
 
+def template_spec(name: str):
+    region = resolve_start_region() if name == "START" else None
+    confidence = cfg.PLAYER_CONFIDENCE if name == "PLAYER" else cfg.CONFIDENCE
+    return TEMPLATE_PATHS[name], to_image_region(region), confidence
+
+
+def match_specs(frame, specs, gated: bool = False):
+    return {
+        name: locate(path, frame, region=region, confidence=confidence)
+        for name, (path, region, confidence) in specs.items()
+    }
+
+
 def left_half_region():
     w, h = pyautogui.size()
     return (0, 0, w // 2, h)
@@ -93,115 +128,73 @@ def resolve_start_region():
     return left_half_region()
 
 
+def on_start_hit(box, hits: int):
+    cx, cy = center_logical(box)
+    HISTORY.append((cx, cy))
+    log(f"[S0] START {hits}/{cfg.REQUIRE_HITS} at ({cx},{cy})")
+
+
+def scroll_to_end():
+    log("[S0] START miss -> End")
+    pyautogui.press("end")
+    time.sleep(1.0)
+    return None
+
+
+def focus_player(box, found):
+    box_player = found.get("PLAYER")
+    if box_player:
+        click_center(box_player, "PLAYER(template)")
+    else:
+        click_scaled("PLAYER(fixed)")
+
+
+def press_enter(box, found):
+    pyautogui.press("enter")
+
+
+def exit_to_list(box, found):
+    click_center(box, "EXIT")
+    click_scaled("LIST_FOCUS")
+
+
+def build_states():
+    player = ("PLAYER",) if cfg.S1_CLICK_MODE == "TEMPLATE" else ()
+    return [
+        State(
+            "S0", target="START", require_hits=cfg.REQUIRE_HITS, retries=cfg.START_PRECHECK_TRIES,
+            on_hit=on_start_hit, on_miss=scroll_to_end,
+            action=lambda box, found: click_center(box, "START"),
+            next_state="S1", cooldown=cfg.CLICK_COOLDOWN,
+        ),
+        State("S1", templates=player, action=focus_player, next_state="S2", cooldown=cfg.CLICK_COOLDOWN),
+        State(
+            "S2", target="POPUP1", require_hits=cfg.REQUIRE_HITS, action=press_enter,
+            next_state="S3", cooldown=cfg.ENTER_COOLDOWN,
+        ),
+        State(
+            "S3", target="POPUP2", require_hits=cfg.REQUIRE_HITS, action=press_enter,
+            next_state="S4", cooldown=cfg.ENTER_COOLDOWN, timeout=cfg.S3_TIMEOUT, timeout_next="S4",
+        ),
+        State(
+            "S4", target="EXIT", require_hits=cfg.REQUIRE_HITS, action=exit_to_list,
+            next_state="S0", cooldown=cfg.CLICK_COOLDOWN,
+        ),
+    ]
+
+
 def main():
     pyautogui.FAILSAFE = True
     log("3초 후 시작")
     time.sleep(3)
     detect_display_scale()
 
-    hits = {"START": 0, "POPUP1": 0, "POPUP2": 0, "EXIT": 0}
-    state = "S0"
-    cooldown_until = 0.0
-    s3_entered_at = None
-    history = deque(maxlen=cfg.DEBUG_HISTORY_SIZE)
-
-    while True:
-        now = time.time()
-        if now < cooldown_until:
-            time.sleep(cfg.SCAN_INTERVAL)
-            continue
-
-        if state == "S0":
-            start_region = resolve_start_region()
-            box_start = None
-            for _ in range(cfg.START_PRECHECK_TRIES):
-                box_start = locate(cfg.IMG_START, region=start_region)
-                if box_start:
-                    hits["START"] += 1
-                    cx, cy = center_logical(box_start)
-                    history.append((cx, cy))
-                    log(f"[S0] START {hits['START']}/{cfg.REQUIRE_HITS} at ({cx},{cy})")
-                    break
-                hits["START"] = 0
-                time.sleep(cfg.SCAN_INTERVAL)
-
-            if box_start and hits["START"] >= cfg.REQUIRE_HITS:
-                click_center(box_start, "START")
-                for k in hits:
-                    hits[k] = 0
-                cooldown_until = time.time() + cfg.CLICK_COOLDOWN
-                state = "S1"
-                log("[STATE] S0 -> S1")
-                continue
-
-            if not box_start:
-                log("[S0] START miss -> End")
-                pyautogui.press("end")
-                time.sleep(1.0)
-
-        elif state == "S1":
-            if cfg.S1_CLICK_MODE == "TEMPLATE":
-                box_player = locate(cfg.IMG_PLAYER, confidence=cfg.PLAYER_CONFIDENCE)
-                if box_player:
-                    click_center(box_player, "PLAYER(template)")
-                else:
-                    click_scaled("PLAYER(fixed)")
-            else:
-                click_scaled("PLAYER(fixed)")
-
-            cooldown_until = time.time() + cfg.CLICK_COOLDOWN
-            state = "S2"
-            log("[STATE] S1 -> S2")
-
-        elif state == "S2":
-            if locate(cfg.IMG_POPUP1):
-                hits["POPUP1"] += 1
-            else:
-                hits["POPUP1"] = 0
-
-            if hits["POPUP1"] >= cfg.REQUIRE_HITS:
-                pyautogui.press("enter")
-                for k in hits:
-                    hits[k] = 0
-                cooldown_until = time.time() + cfg.ENTER_COOLDOWN
-                s3_entered_at = time.time()
-                state = "S3"
-                log("[STATE] S2 -> S3")
-
-        elif state == "S3":
-            if locate(cfg.IMG_POPUP2):
-                hits["POPUP2"] += 1
-            else:
-                hits["POPUP2"] = 0
-
-            if hits["POPUP2"] >= cfg.REQUIRE_HITS:
-                pyautogui.press("enter")
-                cooldown_until = time.time() + cfg.ENTER_COOLDOWN
-                for k in hits:
-                    hits[k] = 0
-                state = "S4"
-                log("[STATE] S3 -> S4")
-            elif s3_entered_at and (time.time() - s3_entered_at) >= cfg.S3_TIMEOUT:
-                log(f"[S3] timeout {cfg.S3_TIMEOUT:.0f}s -> skip S4")
-                state = "S4"
-
-        elif state == "S4":
-            box_exit = locate(cfg.IMG_EXIT)
-            if box_exit:
-                hits["EXIT"] += 1
-            else:
-                hits["EXIT"] = 0
-
-            if hits["EXIT"] >= cfg.REQUIRE_HITS:
-                click_center(box_exit, "EXIT")
-                click_scaled("LIST_FOCUS")
-                cooldown_until = time.time() + cfg.CLICK_COOLDOWN
-                for k in hits:
-                    hits[k] = 0
-                state = "S0"
-                log("[STATE] S4 -> S0")
-
-        time.sleep(cfg.SCAN_INTERVAL)
+    machine = StateMachine(
+        build_states(), "S0", next_frame=BACKEND.grab, match=match_specs,
+        clock=SystemClock(), log=log, scheduler=ScanScheduler(cfg.SCAN_INTERVAL),
+    )
+    machine.prepare(template_spec)
+    machine.run()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,21 @@
+import sys
 import time
+from pathlib import Path
 
 import cv2
-import numpy as np
 import pyautogui
 import pyscreeze
 from PIL import Image
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from capture import get_backend  # noqa: E402
+
 IMG_START = "assets/IMG_START.png"
 CONFIDENCE_LEVELS = [0.96, 0.93, 0.90, 0.88, 0.85]
 QUALITY_THRESHOLD = 0.90
+CAPTURE_BACKEND = "pyautogui"  # pyautogui | mss | replay
+REPLAY_SOURCE = None
 
 
 def left_half_region():
@@ -16,9 +23,9 @@ def left_half_region():
     return (0, 0, w // 2, h)
 
 
-def locate_all(path: str, confidence: float, region=None):
+def locate_all(path: str, frame, confidence: float, region=None):
     try:
-        return list(pyautogui.locateAllOnScreen(path, confidence=confidence, region=region))
+        return list(pyscreeze.locateAll(path, frame, confidence=confidence, region=region))
     except (pyautogui.ImageNotFoundException, pyscreeze.ImageNotFoundException):
         return []
 
@@ -34,16 +41,18 @@ def main():
     print("left_region:", region_left)
     print("template:", template.size, template.mode)
 
+    # 한 번 캡처한 프레임으로 모든 confidence/region 조합을 검사
+    backend = get_backend(CAPTURE_BACKEND, source=REPLAY_SOURCE)
+    screen_bgr = backend.grab()
+
     left_match_090 = False
     for conf in CONFIDENCE_LEVELS:
-        full_boxes = locate_all(IMG_START, confidence=conf, region=None)
-        left_boxes = locate_all(IMG_START, confidence=conf, region=region_left)
+        full_boxes = locate_all(IMG_START, screen_bgr, confidence=conf, region=None)
+        left_boxes = locate_all(IMG_START, screen_bgr, confidence=conf, region=region_left)
         print(f"conf={conf} full={len(full_boxes)} left={len(left_boxes)}")
         if conf >= 0.90 and left_boxes:
             left_match_090 = True
 
-    screenshot = pyautogui.screenshot()
-    screen_bgr = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
     tpl_rgba = cv2.imread(IMG_START, cv2.IMREAD_UNCHANGED)
     template_bgr = tpl_rgba[:, :, :3]
 